@@ -0,0 +1,123 @@
+"""
+
+Compares the array-based Holt-Winters initialisation in forecasting/smoothing.py
+with the former row-by-row implementation.
+
+Run from app/flask:
+$ python benchmarks/smoothing_init.py
+
+"""
+
+import os
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "flaskr"))
+
+from forecasting.smoothing import centered_moving_average, initialize
+
+
+def centered_moving_average_rows(D: pd.DataFrame, year_size):
+    # former implementation, DataFrame.append replaced by pd.concat
+
+    estimated_levels = pd.DataFrame()
+
+    D = D.iloc[0 : 4 * year_size, :]
+    for i in range(3 * year_size):
+
+        series = (
+            D.iloc[i : i + year_size, :].mean()
+            + D.iloc[i + 1 : i + year_size + 1, :].mean()
+        ) / 2
+        estimated_levels = pd.concat(
+            [estimated_levels, series.to_frame().T], ignore_index=True
+        )
+
+    return estimated_levels
+
+
+def initialize_rows(data: pd.DataFrame, year_size):
+    # former implementation, DataFrame.append replaced by pd.concat
+
+    estimated_levels = centered_moving_average_rows(data, year_size)
+
+    X = data.iloc[int(year_size / 2) : int(year_size / 2 + 3 * year_size), :]
+
+    X = X.reset_index(drop=True)
+
+    temp = (
+        X.iloc[0 : int(3 * year_size), :]
+        - estimated_levels.iloc[0 : int(3 * year_size), :]
+    )
+
+    S0 = pd.DataFrame()
+
+    for i in range(year_size):
+        S0 = pd.concat(
+            [
+                S0,
+                (
+                    (
+                        temp.iloc[i, :]
+                        + temp.iloc[i + year_size, :]
+                        + temp.iloc[i + 2 * year_size, :]
+                    )
+                    / 3
+                )
+                .to_frame()
+                .T,
+            ],
+            ignore_index=True,
+        )
+
+    temp = S0.iloc[int(year_size / 2) : year_size, :]
+    temp = pd.concat([temp, S0.iloc[0 : int(year_size / 2), :]], ignore_index=True)
+    S0 = temp
+    temp = pd.DataFrame()
+    for i in range(year_size):
+        temp = pd.concat(
+            [temp, (S0.iloc[i, :] - S0.mean()).to_frame().T], ignore_index=True
+        )
+    S0 = temp
+
+    T0 = (
+        estimated_levels.iloc[2 * year_size : 3 * year_size].mean()
+        - estimated_levels.iloc[year_size - 1 : 2 * year_size - 1].mean()
+    ) / year_size
+
+    L0 = data.iloc[0, :]
+
+    return L0, T0, S0
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+
+    for year_size, n_rows in ((2, 40), (4, 40), (12, 120), (24, 400)):
+        data = pd.DataFrame(rng.normal(loc=100, scale=10, size=(n_rows, year_size)))
+
+        for reference, result in zip(
+            (
+                centered_moving_average_rows(data, year_size),
+                *initialize_rows(data, year_size),
+            ),
+            (centered_moving_average(data, year_size), *initialize(data, year_size)),
+        ):
+            assert np.allclose(
+                reference.to_numpy(dtype="float64"),
+                result.to_numpy(dtype="float64"),
+                equal_nan=True,
+            )
+
+        n = 20
+        rows = timeit.timeit(lambda: initialize_rows(data, year_size), number=n) / n
+        arrays = timeit.timeit(lambda: initialize(data, year_size), number=n) / n
+
+        print(
+            f"year_size={year_size:>3} rows={n_rows:>4}: "
+            f"row-by-row {rows * 1000:8.2f} ms, arrays {arrays * 1000:6.3f} ms, "
+            f"{rows / arrays:6.1f}x"
+        )
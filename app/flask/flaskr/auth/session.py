@@ -6,7 +6,7 @@ import uuid
 import time
 from typing import Tuple
 
-from extensions import mongo
+from extensions import mongo, dataset_cache, forecast_jobs, model_cache
 
 
 def get_session() -> Tuple[str, str]:
@@ -53,6 +53,9 @@ def get_session() -> Tuple[str, str]:
         if session is not None:
             mongo.db.drop_collection(session + ".chunks")
             mongo.db.drop_collection(session + ".files")
+            dataset_cache.invalidate(session)
+            model_cache.invalidate(session)
+            forecast_jobs.drop_session(session)
 
         expiration = datetime.timedelta(days=7)
         session = str(uuid.uuid1())
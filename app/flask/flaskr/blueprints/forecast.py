@@ -1,42 +1,90 @@
-from typing import List
+from typing import Iterator, List
+import datetime
+import hashlib
+import json
 import pandas as pd
-import pycountry
 
+from concurrent.futures import TimeoutError
 from itertools import repeat
-from multiprocessing import Pool
+from prophet.serialize import model_from_json
 
 from flask import (
     Blueprint,
+    Response,
+    current_app,
     request,
+    stream_with_context,
 )
 from flask_jwt_extended import get_jwt_identity, jwt_required
+from extensions import cache, forecast_jobs, forecast_pool, model_cache
+from forecasting.batched import (
+    TIMEDELTAS,
+    VarFit,
+    stack_countries,
+    var_fit_and_predict_batched,
+)
 from forecasting.models import (
     var_fit_and_predict_multi,
     hw_es_fit_and_predict_multi,
     prophet_fit_and_predict_n,
-    prophet_fit_and_predict,
+    prophet_fit_and_predict_serialized,
+    prophet_fit_n_serialized,
+)
+from forecasting.pool import ForecastPoolBusy
+from forecasting.shared import FrameSlice, SharedFrames, fit_and_predict_shared
+from preprocessing.countries import get_country_code
+from preprocessing.parse import (
+    get_processed_version,
+    make_unique_features,
+    parse_dataset,
 )
-from preprocessing.parse import parse_dataset, make_unique_features
-from preprocessing.states import germany_federal
-
 
 bp = Blueprint("forecast", __name__, url_prefix="/forecast")
 
 
-@bp.route("/multivariate/<model>", methods=["POST"])
-@jwt_required()
-def forecastVAR(model):
+def _dataset_versions(session: str, datasets: List[dict]) -> tuple:
+    return tuple(
+        (dataset["id"], get_processed_version(session, dataset["id"]))
+        for dataset in datasets
+    )
+
+
+def _var_fit_key(
+    kind: str,
+    session: str,
+    versions: tuple,
+    country: str,
+    features: List[str],
+    max_lags: float,
+    ic: str,
+) -> str:
+    # endpoints prepare the series differently (padded merge, dropped missing values),
+    # a model fitted on the data of one endpoint must not be served to another
+    key = (kind, session, versions, country, tuple(features), max_lags, ic)
+
+    return "var_fit/" + hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+
+
+def forecast_var(session: str, model: str, data: dict):
+    """Forecasts the selected features of one country with a VAR or HW model
+
+    Args:
+        session (str): id of the session
+        model (str): "var" or "hwes"
+        data (dict): request data
+
+    Returns:
+        dict: response data or an error message and status code
+    """
+
     if model not in ("var", "hwes"):
         return ("Unknown model.", 400)
 
-    data = request.get_json()
-
     datasets = data["datasets"]
 
-    if data["country"] in germany_federal.keys():
-        selected_country = germany_federal.get(data["country"])
-    else:
-        selected_country = pycountry.countries.get(name=data["country"]).alpha_3
+    selected_country = get_country_code(data["country"])
+    if selected_country is None:
+        return ("Unknown country.", 400)
 
     if datasets is None:
         return ("Empty request", 400)
@@ -46,8 +94,6 @@ def forecastVAR(model):
     filtered_dfs = []
     frequencies = []
 
-    session = get_jwt_identity()
-
     response_data = {}
     for dataset in datasets:
         varFeatures_selected = (
@@ -112,6 +158,18 @@ def forecastVAR(model):
     filtered_dfs, feature_columns = make_unique_features(filtered_dfs, feature_columns)
 
     if model == "var":
+        ic = current_app.config.get("VAR_INFORMATION_CRITERION", "aic")
+
+        var_fit_key = _var_fit_key(
+            "multivariate",
+            session,
+            _dataset_versions(session, datasets),
+            selected_country,
+            feature_columns,
+            data["maxLags"],
+            ic,
+        )
+
         forecast = var_fit_and_predict_multi(
             filtered_dfs,
             time_columns,
@@ -119,6 +177,14 @@ def forecastVAR(model):
             max_lags=data["maxLags"],
             periods=data["periods"],
             frequency=freq,
+            ic=ic,
+            var_fit=cache.get(var_fit_key),
+        )
+
+        cache.set(
+            var_fit_key,
+            forecast.attrs["var_fit"],
+            timeout=current_app.config.get("VAR_FIT_CACHE_TIMEOUT"),
         )
 
     elif model == "hwes":
@@ -146,17 +212,22 @@ def forecastVAR(model):
     return response_data
 
 
-@bp.route("prophet", methods=["POST"])
-@jwt_required()
-def forecastProphet():
-    data = request.get_json()
+def forecast_prophet(session: str, data: dict):
+    """Forecasts the dependent feature of one country with Prophet and the scenarios of its regressors
+
+    Args:
+        session (str): id of the session
+        data (dict): request data
+
+    Returns:
+        dict: response data or an error message and status code
+    """
 
     predictions = data["predictions"] if "predictions" in data else None
     datasets = data["datasets"]
-    if data["country"] in germany_federal.keys():
-        selected_country = germany_federal.get(data["country"])
-    else:
-        selected_country = pycountry.countries.get(name=data["country"]).alpha_3
+    selected_country = get_country_code(data["country"])
+    if selected_country is None:
+        return ("Unknown country.", 400)
     dependent_df = data["dependentDataset"]
     scenarios = data["scenarios"]
 
@@ -170,8 +241,6 @@ def forecastProphet():
 
     y_feature_index = None
 
-    session = get_jwt_identity()
-
     for i, dataset in enumerate(datasets):
         if dataset["id"] in scenarios.keys():
             reshape_selected = (
@@ -213,6 +282,25 @@ def forecastProphet():
             if dataset_id == dependent_df:
                 y_feature_index = i
 
+    if len(set(frequencies)) != 1:
+        print("Frequencies of datasets do not match.")
+        return ("Frequencies do not match.", 400)
+
+    frequency = set(frequencies).pop()
+
+    model_key = (
+        session,
+        _dataset_versions(session, datasets),
+        selected_country,
+        feature_columns[y_feature_index],
+        tuple(
+            feature
+            for i, feature in enumerate(feature_columns)
+            if i != y_feature_index
+        ),
+        frequency,
+    )
+
     if predictions is None:
         scenarios_data = [
             [
@@ -223,36 +311,89 @@ def forecastProphet():
             for dataset in data["scenarios"]
             if dataset != dependent_df
         ]
-    else:
 
-        scenarios_data = []
-        for i, dataset in enumerate(datasets):
-            if datasets[i]["id"] != dependent_df:
-                forecast, _ = prophet_fit_and_predict(
-                    filtered_dfs[i],
-                    time_columns[i],
-                    feature_columns[i],
-                    predictions,
-                    frequencies[i],
+        model = model_cache.get(model_key)
+    else:
+        # forecast the regressors and fit the dependent model at the same time
+        model_json = model_cache.get_serialized(model_key)
+        futures = []
+
+        try:
+            if model_json is None:
+                dependent_future = forecast_pool.submit(
+                    prophet_fit_n_serialized,
+                    filtered_dfs,
+                    time_columns,
+                    feature_columns,
+                    y_feature_index,
                 )
+                futures.append(dependent_future)
+
+            regressors = []
+            for i, dataset in enumerate(datasets):
+                if datasets[i]["id"] != dependent_df:
+                    regressor_key = (
+                        session,
+                        _dataset_versions(session, [dataset]),
+                        selected_country,
+                        feature_columns[i],
+                        (),
+                        frequencies[i],
+                    )
+                    regressor_json = model_cache.get_serialized(regressor_key)
+
+                    future = forecast_pool.submit(
+                        prophet_fit_and_predict_serialized,
+                        filtered_dfs[i],
+                        time_columns[i],
+                        feature_columns[i],
+                        predictions,
+                        frequencies[i],
+                        regressor_json,
+                    )
+                    futures.append(future)
+                    regressors.append((regressor_key, regressor_json, future))
+
+            scenarios_data = []
+            for regressor_key, regressor_json, future in regressors:
+                forecast, fitted_json = forecast_pool.result(future)
                 scenarios_data.append(forecast["yhat"])
 
-    if len(set(frequencies)) != 1:
-        print("Frequencies of datasets do not match.")
-        return ("Frequencies do not match.", 400)
+                if regressor_json is None:
+                    model_cache.set_serialized(regressor_key, fitted_json)
+
+            if model_json is None:
+                model_json = forecast_pool.result(dependent_future)
+                model_cache.set_serialized(model_key, model_json)
+
+        except ForecastPoolBusy as e:
+            for future in futures:
+                future.cancel()
+            return (str(e), 503)
+        except TimeoutError:
+            for future in futures:
+                future.cancel()
+            return ("Forecast timed out.", 504)
+
+        model = model_from_json(model_json)
 
     response_data = {}
     response_data["future"] = {}
     response_data["merge"] = {}
     response_data["forecast"] = {}
-    forecast, merged_df, future_df, y_feature = prophet_fit_and_predict_n(
+    forecast, merged_df, future_df, y_feature, fitted_model = prophet_fit_and_predict_n(
         filtered_dfs,
         time_columns,
         feature_columns,
         scenarios=scenarios_data,
-        frequency=set(frequencies).pop(),
+        frequency=frequency,
         y_feature_index=y_feature_index,
+        model=model,
     )
+
+    if model is None:
+        model_cache.set(model_key, fitted_model)
+
     time_range = []
 
     for df_key, df in zip(response_data, (future_df, merged_df, forecast)):
@@ -280,25 +421,146 @@ def forecastProphet():
     return response_data
 
 
-@bp.route("map/<model>", methods=["POST"])
-@jwt_required()
-def var_forecast_map(model):
+def _var_forecast_map_batched(
+    session: str,
+    datasets: List[dict],
+    filtered_dfs: List[pd.DataFrame],
+    countries: List[str],
+    max_lags: float,
+    periods: int,
+):
+    """Forecasts all countries with one batched VAR estimation if they share the same time steps and features
+
+    Args:
+        session (str): id of the session
+        datasets (List[dict]): selected datasets of the request
+        filtered_dfs (List[pd.DataFrame]): parsed datasets without missing values
+        countries (List[str]): countries available in all datasets
+        max_lags (float): maximum lag order
+        periods (int): number of forecasts to perform
+
+    Returns:
+        dict: response data or None if the countries have to be forecast one by one
+    """
+
+    feature_columns = [
+        dataset["varmapFeaturesSelected"]
+        if "varmapFeaturesSelected" in dataset
+        else [dataset["featureSelected"]]
+        for dataset in datasets
+    ]
+
+    if len(countries) == 0 or sum(map(len, feature_columns)) < 2:
+        return None
+
+    stacked = stack_countries(
+        filtered_dfs,
+        [dataset["geoSelected"] for dataset in datasets],
+        [dataset["timeSelected"] for dataset in datasets],
+        feature_columns,
+        countries,
+    )
+
+    if stacked is None:
+        return None
+
+    times, values = stacked
+
+    frequency = pd.infer_freq(times) if len(times) > 2 else None
+
+    if frequency not in TIMEDELTAS:
+        return None
+
+    features = [feature for features in feature_columns for feature in features]
+
+    ic = current_app.config.get("VAR_INFORMATION_CRITERION", "aic")
+    versions = _dataset_versions(session, datasets)
+
+    var_fit_keys = [
+        _var_fit_key("map/batched", session, versions, country, features, max_lags, ic)
+        for country in countries
+    ]
+
+    times, forecasts, var_fits = var_fit_and_predict_batched(
+        values,
+        times,
+        periods,
+        frequency,
+        max_lags=max_lags,
+        ic=ic,
+        var_fits=[cache.get(key) for key in var_fit_keys],
+    )
+
+    for key, var_fit in zip(var_fit_keys, var_fits):
+        cache.set(
+            key, var_fit, timeout=current_app.config.get("VAR_FIT_CACHE_TIMEOUT")
+        )
+
+    response_data = {"x": times.dt.strftime("%Y-%m-%d").tolist()}
+
+    for country, forecast in zip(countries, forecasts):
+        response_data[country] = {
+            feature: forecast[:, i].tolist() for i, feature in enumerate(features)
+        }
+
+    return response_data
 
-    data = request.get_json()
+
+def _ndjson_response(records: Iterator[dict]) -> Response:
+    lines = (json.dumps(record) + "\n" for record in records)
+
+    return Response(stream_with_context(lines), mimetype="application/x-ndjson")
+
+
+def _map_records(response_data: dict) -> Iterator[dict]:
+    # one record per country of a complete map response
+    for country, features in response_data.items():
+        if country != "x":
+            yield {"country": country, "x": response_data["x"], "features": features}
+
+
+def _forecast_records(results: Iterator[tuple]) -> Iterator[dict]:
+    # one record per country in the order the forecasts finish, errors end the stream
+    try:
+        for _, country, features, time_column, forecast in results:
+            yield {
+                "country": country,
+                "x": forecast[time_column].dt.strftime("%Y-%m-%d").tolist(),
+                "features": {
+                    feature: forecast[feature].tolist() for feature in features
+                },
+            }
+    except ForecastPoolBusy as e:
+        yield {"error": str(e), "code": 503}
+    except TimeoutError:
+        yield {"error": "Forecast timed out.", "code": 504}
+
+
+def forecast_map(session: str, model: str, data: dict, stream: bool = False):
+    """Forecasts the selected features of all countries with a VAR or HW model
+
+    Args:
+        session (str): id of the session
+        model (str): "var" or "hwes"
+        data (dict): request data
+        stream (bool, optional): respond with one NDJSON record per country as soon as it is forecast.
+            Defaults to False.
+
+    Returns:
+        dict: response data or an error message and status code
+    """
+
+    if model not in ("var", "hwes"):
+        return ("Unknown model.", 400)
 
     datasets = data["datasets"]
 
     if datasets is None:
         return ("Empty request", 400)
 
-    time_columns = []
-    feature_columns = []
     filtered_dfs = []
-    frequencies = []
     countries = []
 
-    session = get_jwt_identity()
-
     response_data = {}
     for dataset in datasets:
 
@@ -333,15 +595,91 @@ def var_forecast_map(model):
 
         countries.append(set(filtered_df[geo_selected].unique()))
 
-    filtered_dfs_by_country = []
+    countries = set.intersection(*countries)
+
+    if model == "var":
+        batched_response = _var_forecast_map_batched(
+            session,
+            datasets,
+            filtered_dfs,
+            sorted(countries),
+            data["maxLags"],
+            data["periods"],
+        )
+
+        if batched_response is not None:
+            if stream:
+                return _ndjson_response(_map_records(batched_response))
+
+            return batched_response
 
-    countries = list(set.intersection(*countries))
+    if stream:
+        return _ndjson_response(
+            _forecast_records(
+                _forecast_countries(
+                    session, model, data, datasets, filtered_dfs, countries
+                )
+            )
+        )
+
+    try:
+        results = sorted(
+            _forecast_countries(
+                session, model, data, datasets, filtered_dfs, countries
+            ),
+            key=lambda result: result[0],
+        )
+    except ForecastPoolBusy as e:
+        return (str(e), 503)
+    except TimeoutError:
+        return ("Forecast timed out.", 504)
+
+    _, _, _, time_column, forecast = results[0]
+
+    response_data["x"] = forecast[time_column].dt.strftime("%Y-%m-%d").tolist()
+
+    for _, country, features, _, forecast in results:
+        response_data[country] = {}
+
+        for feature in features:
+            response_data[country][feature] = forecast[feature].tolist()
+
+    return response_data
+
+
+def _forecast_countries(
+    session: str,
+    model: str,
+    data: dict,
+    datasets: List[dict],
+    filtered_dfs: List[pd.DataFrame],
+    countries: set,
+) -> Iterator[tuple]:
+    """Forecasts every country in a forecast worker, results are yielded as soon as they are available
+
+    Args:
+        session (str): id of the session
+        model (str): "var" or "hwes"
+        data (dict): request data
+        datasets (List[dict]): selected datasets of the request
+        filtered_dfs (List[pd.DataFrame]): parsed datasets without missing values
+        countries (set): countries available in all datasets
+
+    Raises:
+        ForecastPoolBusy: no forecast worker became available in time
+        TimeoutError: a forecast did not finish in time
+
+    Yields:
+        Iterator[tuple]: index of the country, country, its features, name of its time column, forecast data
+    """
+
+    time_columns = []
+    feature_columns = []
+    frequencies = []
+
+    with SharedFrames() as shared_frames:
+        published = []
 
-    for country in countries:
-        dfs = []
-        features = []
-        time = []
-        k = 0
         for i, df in enumerate(datasets):
             geo_col = df["geoSelected"]
             time_selected = df["timeSelected"]
@@ -351,71 +689,215 @@ def var_forecast_map(model):
                 if "varmapFeaturesSelected" in df
                 else [df["featureSelected"]]
             )
-            for feature in varmapFeatures_selected:
-                feature_selected = feature
 
-                if country not in filtered_dfs[i][geo_col].unique():
-                    break
+            path, rows = shared_frames.publish(
+                filtered_dfs[i],
+                geo_col,
+                [time_selected, *varmapFeatures_selected],
+            )
 
-                dfs.append(
-                    filtered_dfs[i][filtered_dfs[i][geo_col] == country][
-                        [time_selected, feature_selected]
-                    ]
+            frequencies_by_country = {
+                country: pd.infer_freq(times)
+                for country, times in filtered_dfs[i].groupby(geo_col)[time_selected]
+                if country in countries
+            }
+
+            published.append((path, rows, frequencies_by_country))
+
+        frame_slices_by_country = []
+        forecast_countries = []
+
+        for country in countries:
+            frame_slices = []
+            features = []
+            time = []
+            for i, df in enumerate(datasets):
+                time_selected = df["timeSelected"]
+                path, rows, frequencies_by_country = published[i]
+
+                varmapFeatures_selected = (
+                    df["varmapFeaturesSelected"]
+                    if "varmapFeaturesSelected" in df
+                    else [df["featureSelected"]]
                 )
+                for feature in varmapFeatures_selected:
+                    feature_selected = feature
 
-                freq = pd.infer_freq(dfs[k][time_selected])
-                frequencies.append(freq)
+                    if country not in rows:
+                        break
 
-                time.append(time_selected)
-                features.append(feature_selected)
-                k = k + 1
-        if len(dfs) > 1:
-            filtered_dfs_by_country.append(dfs)
-            feature_columns.append(features)
-            time_columns.append(time)
+                    offset, length = rows[country]
+                    frame_slices.append(
+                        FrameSlice(
+                            path, offset, length, [time_selected, feature_selected]
+                        )
+                    )
 
-    n_countries = len(countries)
+                    frequencies.append(frequencies_by_country[country])
 
-    frequencies = [
-        frequency for frequency in list(set(frequencies)) if frequency is not None
-    ]
+                    time.append(time_selected)
+                    features.append(feature_selected)
+            if len(frame_slices) > 1:
+                frame_slices_by_country.append(frame_slices)
+                feature_columns.append(features)
+                time_columns.append(time)
+                forecast_countries.append(country)
 
-    pool = Pool(4)
-    if model == "var":
-        result: List[pd.DataFrame] = pool.starmap(
-            var_fit_and_predict_multi,
-            zip(
-                filtered_dfs_by_country,
-                time_columns,
-                feature_columns,
-                repeat(data["maxLags"], n_countries),
-                repeat(data["periods"], n_countries),
-                repeat(frequencies[0], n_countries),
-            ),
-        )
-    elif model == "hwes":
-        result: List[pd.DataFrame] = pool.starmap(
-            hw_es_fit_and_predict_multi,
-            zip(
-                filtered_dfs_by_country,
-                time_columns,
-                feature_columns,
-                repeat(frequencies[0], n_countries),
-                repeat(data["periods"], n_countries),
-                repeat(data["maxLags"], n_countries),
-            ),
+        n_countries = len(forecast_countries)
+
+        frequencies = [
+            frequency for frequency in list(set(frequencies)) if frequency is not None
+        ]
+
+        ic = current_app.config.get("VAR_INFORMATION_CRITERION", "aic")
+
+        if model == "var":
+            versions = _dataset_versions(session, datasets)
+            var_fit_keys = [
+                _var_fit_key(
+                    "map", session, versions, country, features, data["maxLags"], ic
+                )
+                for country, features in zip(forecast_countries, feature_columns)
+            ]
+            var_fits = [cache.get(key) for key in var_fit_keys]
+        else:
+            var_fits = repeat(None, n_countries)
+
+        tasks = zip(
+            repeat(model, n_countries),
+            frame_slices_by_country,
+            time_columns,
+            feature_columns,
+            repeat(data["maxLags"], n_countries),
+            repeat(data["periods"], n_countries),
+            repeat(frequencies[0], n_countries),
+            repeat(ic, n_countries),
+            var_fits,
         )
-    pool.close()
-    pool.join()
 
-    response_data["x"] = (
-        result[0][time_columns[-1][-1]].dt.strftime("%Y-%m-%d").tolist()
+        for i, forecast in forecast_pool.imap_unordered(fit_and_predict_shared, tasks):
+            if model == "var":
+                cache.set(
+                    var_fit_keys[i],
+                    forecast.attrs["var_fit"],
+                    timeout=current_app.config.get("VAR_FIT_CACHE_TIMEOUT"),
+                )
+
+            yield (
+                i,
+                forecast_countries[i],
+                feature_columns[i],
+                time_columns[i][-1],
+                forecast,
+            )
+
+
+@bp.route("/multivariate/<model>", methods=["POST"])
+@jwt_required()
+def forecastVAR(model):
+    return forecast_var(get_jwt_identity(), model, request.get_json())
+
+
+@bp.route("prophet", methods=["POST"])
+@jwt_required()
+def forecastProphet():
+    return forecast_prophet(get_jwt_identity(), request.get_json())
+
+
+@bp.route("map/<model>", methods=["POST"])
+@jwt_required()
+def var_forecast_map(model):
+    return forecast_map(
+        get_jwt_identity(),
+        model,
+        request.get_json(),
+        stream=request.args.get("format") == "ndjson",
     )
 
-    for i, (country, features) in enumerate(zip(countries, feature_columns)):
-        response_data[country] = {}
 
-        for feature in features:
-            response_data[country][feature] = result[i][feature].tolist()
+def _job_response(job: dict) -> dict:
+    return {
+        key: value.isoformat() + "Z" if isinstance(value, datetime.datetime) else value
+        for key, value in job.items()
+    }
 
-    return response_data
+
+@bp.route("/jobs/multivariate/<model>", methods=["POST"])
+@jwt_required()
+def submit_var_job(model):
+    session = get_jwt_identity()
+
+    job = forecast_jobs.submit(
+        session,
+        f"multivariate/{model}",
+        forecast_var,
+        session,
+        model,
+        request.get_json(),
+    )
+
+    return (_job_response(job), 202)
+
+
+@bp.route("/jobs/prophet", methods=["POST"])
+@jwt_required()
+def submit_prophet_job():
+    session = get_jwt_identity()
+
+    job = forecast_jobs.submit(
+        session, "prophet", forecast_prophet, session, request.get_json()
+    )
+
+    return (_job_response(job), 202)
+
+
+@bp.route("/jobs/map/<model>", methods=["POST"])
+@jwt_required()
+def submit_map_job(model):
+    session = get_jwt_identity()
+
+    job = forecast_jobs.submit(
+        session, f"map/{model}", forecast_map, session, model, request.get_json()
+    )
+
+    return (_job_response(job), 202)
+
+
+@bp.route("/jobs/<job_id>", methods=["GET"])
+@jwt_required()
+def get_job(job_id):
+    job = forecast_jobs.get(get_jwt_identity(), job_id)
+
+    if job is None:
+        return ("Unknown job.", 404)
+
+    return _job_response(job)
+
+
+@bp.route("/jobs/<job_id>/result", methods=["GET"])
+@jwt_required()
+def get_job_result(job_id):
+    session = get_jwt_identity()
+
+    job = forecast_jobs.get(session, job_id)
+
+    if job is None:
+        return ("Unknown job.", 404)
+
+    if job["status"] == "failed":
+        return (job["error"], job["code"])
+
+    if job["status"] != "done":
+        return (_job_response(job), 202)
+
+    return Response(
+        forecast_jobs.read_result(session, job_id), mimetype="application/json"
+    )
+
+
+@bp.route("/jobs/<job_id>", methods=["DELETE"])
+@jwt_required()
+def delete_job(job_id):
+    forecast_jobs.delete(get_jwt_identity(), job_id)
+
+    return ("", 204)
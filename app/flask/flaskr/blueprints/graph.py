@@ -1,6 +1,7 @@
+from typing import List, Tuple
+
 import numpy as np
 import pandas as pd
-import pycountry
 
 from flask import (
     Blueprint,
@@ -8,8 +9,8 @@ from flask import (
     request,
 )
 from flask_jwt_extended import get_jwt_identity, jwt_required
+from preprocessing.countries import get_country_code, get_country_name
 from preprocessing.parse import parse_dataset, merge_dataframes_multi
-from preprocessing.states import germany_federal
 
 from extensions import mongo
 
@@ -51,6 +52,43 @@ def get_selected_data():
     return response_data
 
 
+def _group_by_country(
+    df: pd.DataFrame, geo_column: str, time_column: str, feature_column: str
+) -> Tuple[list, List[list], List[list]]:
+    """Splits the time and feature column by country in one pass
+
+    Args:
+        df (pd.DataFrame): dataset
+        geo_column (str): name of the column with geo data
+        time_column (str): name of the time column
+        feature_column (str): name of the feature column
+
+    Returns:
+        Tuple[list, List[list], List[list]]: countries in order of appearance, times and values of each country,
+            rows without a country are left out
+    """
+
+    codes, countries = pd.factorize(df[geo_column])
+
+    # rows without a country get the code -1 and are left out
+    rows = np.flatnonzero(codes >= 0)
+    codes = codes[rows]
+
+    # stable sort keeps the original order of rows within a country
+    order = rows[np.argsort(codes, kind="stable")]
+    ends = np.cumsum(np.bincount(codes, minlength=len(countries))).tolist()
+    starts = [0, *ends[:-1]]
+
+    times = df[time_column].iloc[order].to_list()
+    values = df[feature_column].iloc[order].to_list()
+
+    return (
+        countries.tolist(),
+        [times[start:end] for start, end in zip(starts, ends)],
+        [values[start:end] for start, end in zip(starts, ends)],
+    )
+
+
 @bp.route("/history", methods=["GET", "POST"])
 @bp.route("/map", methods=["GET", "POST"])
 @bp.route("/statistics", methods=["GET", "POST"])
@@ -82,25 +120,21 @@ def get_selected_feature_data():
     response_data = {}
 
     if geo_selected is not None:
-        countries = df[geo_selected].unique().tolist()
-        for country in countries:
-
-            response_data[country] = {}
-
-            response_data[country][time_selected] = df[df[geo_selected] == country][
-                time_selected
-            ].to_list()
-            response_data[country][feature_selected] = df[df[geo_selected] == country][
-                feature_selected
-            ].to_list()
-
-            if "statistics" in request.path:
-                if set(countries).isdisjoint(germany_federal.values()):
-                    country_full = pycountry.countries.get(alpha_3=country).name
-                    response_data[country_full] = response_data.pop(country)
-                else:
-                    country_full = pycountry.subdivisions.get(code=country).name
-                    response_data[country_full] = response_data.pop(country)
+        countries, times, values = _group_by_country(
+            df, geo_selected, time_selected, feature_selected
+        )
+
+        if "statistics" in request.path:
+            countries = [get_country_name(country) for country in countries]
+
+        if request.args.get("format") == "columnar":
+            return {"countries": countries, "times": times, "values": values}
+
+        for country, country_times, country_values in zip(countries, times, values):
+            response_data[country] = {
+                time_selected: country_times,
+                feature_selected: country_values,
+            }
 
     else:
         response_data[time_selected] = (
@@ -122,10 +156,9 @@ def get_heatmap():
     datasets = data["datasets"]
 
     if "country" in data:
-        if data["country"] in germany_federal.keys():
-            selected_country = germany_federal.get(data["country"])
-        else:
-            selected_country = pycountry.countries.get(name=data["country"]).alpha_3
+        selected_country = get_country_code(data["country"])
+        if selected_country is None:
+            return ("Unknown country.", 400)
     else:
         selected_country = None
 
@@ -232,10 +265,9 @@ def get_correlation_lines():
     datasets = data["datasets"]
 
     if "country" in data:
-        if data["country"] in germany_federal.keys():
-            selected_country = germany_federal.get(data["country"])
-        else:
-            selected_country = pycountry.countries.get(name=data["country"]).alpha_3
+        selected_country = get_country_code(data["country"])
+        if selected_country is None:
+            return ("Unknown country.", 400)
     else:
         selected_country = None
 
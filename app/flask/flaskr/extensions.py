@@ -4,8 +4,19 @@ from flask_cors import CORS
 from flask_session import Session
 from flask_jwt_extended import JWTManager
 
+from forecasting.jobs import ForecastJobs
+from forecasting.model_cache import ModelCache
+from forecasting.pool import ForecastPool
+from preprocessing.cache import DatasetCache
+from preprocessing.demo import DemoCatalogue
+
 mongo = PyMongo()
 cache = Cache(config={"CACHE_TYPE": "SimpleCache"})
 cors = CORS(resources={r"/*": {"origins": "http://localhost:4200"}})
 session = Session()
 jwt = JWTManager()
+dataset_cache = DatasetCache()
+demo_catalogue = DemoCatalogue()
+forecast_pool = ForecastPool()
+model_cache = ModelCache()
+forecast_jobs = ForecastJobs(mongo)
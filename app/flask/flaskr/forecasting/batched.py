@@ -0,0 +1,482 @@
+"""
+
+VAR forecasts for many countries at once
+
+var_fit_and_predict_multi fits one VAR model per country. If all countries
+share the same time steps and features, their series are stacked into a
+country x time x feature array instead, and the same steps (normalisation,
+differencing, ADF tests, lag order selection, VAR estimation and
+forecasting) run as batched array operations: a VAR with a fixed lag order is
+ordinary least squares, so the models of all countries of the same order are
+estimated by one stacked least-squares solve.
+
+The fitted models (lag order, parameters and differencing) are returned as
+VarFit tuples, so that callers can reuse them for other forecast horizons.
+
+"""
+
+import datetime
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from statsmodels.tsa.adfvalues import mackinnonp
+
+TIMEDELTAS = {"AS-JAN": {"days": 365}, "MS": {"days": 30}}
+
+
+def _least_squares(
+    exog: np.ndarray, endog: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    # stacked OLS via the pseudo inverse, as statsmodels' OLS does for a single model
+    pinv_exog = np.linalg.pinv(exog)
+    params = pinv_exog @ endog
+
+    return params, pinv_exog
+
+
+def _adf_design(
+    x: np.ndarray, xdiff: np.ndarray, n_lags: int, n_rows: int
+) -> np.ndarray:
+    # columns: level, lagged differences 1..n_lags (the same layout as adfuller's xdall)
+    n_diff = xdiff.shape[1]
+
+    columns = [x[:, -n_rows - 1 : -1]]
+    columns += [
+        xdiff[:, n_diff - n_rows - lag : n_diff - lag] for lag in range(1, n_lags + 1)
+    ]
+
+    return np.stack(columns, axis=-1)
+
+
+def adf_pvalues(series: np.ndarray) -> np.ndarray:
+    """Augmented Dickey-Fuller tests of many series of the same length at once
+
+    Gives the p-values of statsmodels' adfuller(x) with its defaults (constant, lag length
+    chosen by AIC from the same candidate lags) for every row of the input.
+
+    Args:
+        series (np.ndarray): one series per row
+
+    Raises:
+        ValueError: a series is constant or too short for the test
+
+    Returns:
+        np.ndarray: p-value of each series
+    """
+
+    x = np.asarray(series, dtype="float64")
+    n_series, nobs = x.shape
+
+    if (x.max(axis=1) == x.min(axis=1)).any():
+        raise ValueError("Invalid input, x is constant")
+
+    # maximum lag from Greene referencing Schwert 1989, -1 for the diff
+    max_lag = min(nobs // 2 - 2, int(np.ceil(12.0 * np.power(nobs / 100.0, 1 / 4.0))))
+
+    if max_lag < 0:
+        raise ValueError(
+            "sample size is too short to use selected regression component"
+        )
+
+    xdiff = np.diff(x, axis=1)
+
+    # select the lag length with the smallest AIC, all candidates use the same observations
+    n_rows = xdiff.shape[1] - max_lag
+    endog = xdiff[:, -n_rows:, np.newaxis]
+    design = _adf_design(x, xdiff, max_lag, n_rows)
+    design = np.concatenate([np.ones((n_series, n_rows, 1)), design], axis=-1)
+
+    aic = np.empty((max_lag + 1, n_series))
+
+    for n_lags in range(max_lag + 1):
+        exog = design[:, :, : n_lags + 2]
+        params, _ = _least_squares(exog, endog)
+        ssr = ((endog - exog @ params) ** 2).sum(axis=(1, 2))
+        # terms that are equal for all candidates are left out
+        aic[n_lags] = n_rows * np.log(ssr / n_rows) + 2 * (n_lags + 2)
+
+    # argmin picks the shortest lag on ties, like adfuller
+    best_lags = aic.argmin(axis=0)
+
+    # rerun with the best lag length on all available observations
+    statistics = np.empty(n_series)
+
+    for n_lags in np.unique(best_lags):
+        selected = best_lags == n_lags
+        n_rows = xdiff.shape[1] - n_lags
+
+        endog = xdiff[selected, -n_rows:, np.newaxis]
+        exog = _adf_design(x[selected], xdiff[selected], n_lags, n_rows)
+        exog = np.concatenate([exog, np.ones((exog.shape[0], n_rows, 1))], axis=-1)
+
+        params, pinv_exog = _least_squares(exog, endog)
+        ssr = ((endog - exog @ params) ** 2).sum(axis=(1, 2))
+        scale = ssr / (n_rows - exog.shape[-1])
+        level_variance = scale * (pinv_exog[:, 0, :] ** 2).sum(axis=-1)
+
+        statistics[selected] = params[:, 0, 0] / np.sqrt(level_variance)
+
+    return np.array(
+        [mackinnonp(statistic, regression="c", N=1) for statistic in statistics]
+    )
+
+
+class VarFit(NamedTuple):
+    order: int
+    # constant followed by the coefficients of lags 1..order, one column per feature
+    params: np.ndarray
+    # features that are differenced twice
+    second_diff: np.ndarray
+
+
+INFORMATION_CRITERIA = ("aic", "bic")
+
+
+def stationary_diff(
+    normalized: np.ndarray, second_diff: np.ndarray = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Differences normalized series until they are stationary and removes their volatility
+
+    Args:
+        normalized (np.ndarray): country x time x feature array of normalized values
+        second_diff (np.ndarray, optional): country x feature mask of series to difference twice.
+            Defaults to deciding by ADF tests.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: differenced series, country x feature mask of second order differences
+    """
+
+    n_countries, n_steps, n_features = normalized.shape
+
+    # first order difference
+    diff = np.diff(normalized, axis=1).astype("float32")
+
+    # take second order difference if needed, series are tested as rows
+    series = diff.transpose(0, 2, 1).reshape(-1, n_steps - 1)
+
+    second_diffs = np.zeros_like(series)
+    second_diffs[:, 1:] = np.diff(series, axis=1)
+
+    if second_diff is None:
+        second_diff = np.zeros(series.shape[0], dtype=bool)
+
+        p_stationary = adf_pvalues(series)
+        candidates = np.flatnonzero(p_stationary > 0.05)
+
+        if candidates.size:
+            second_diff[candidates] = (
+                adf_pvalues(second_diffs[candidates]) < p_stationary[candidates]
+            )
+    else:
+        second_diff = np.asarray(second_diff, dtype=bool).reshape(-1)
+
+    series[second_diff] = second_diffs[second_diff]
+
+    diff = series.reshape(n_countries, n_features, n_steps - 1).transpose(0, 2, 1)
+
+    # remove volatility across given frequency
+    volatility = diff.std(axis=1, ddof=1, keepdims=True, dtype="float64")
+
+    return diff / volatility, second_diff.reshape(n_countries, n_features)
+
+
+def _lagged_design(diff: np.ndarray, order: int, n_rows: int) -> np.ndarray:
+    # constant followed by lags 1..order of all features for the last n_rows time steps
+    n_steps = diff.shape[1]
+
+    columns = [np.ones((diff.shape[0], n_rows, 1))]
+    columns += [
+        diff[:, n_steps - n_rows - lag : n_steps - lag] for lag in range(1, order + 1)
+    ]
+
+    return np.concatenate(columns, axis=-1)
+
+
+def max_var_order(max_lags: float, n_steps: int, n_features: int) -> int:
+    """Largest lag order to consider, bounded by max_lags and the length of the series
+
+    Args:
+        max_lags (float): requested maximum lag order
+        n_steps (int): number of time steps of the differenced series
+        n_features (int): number of features
+
+    Returns:
+        int: maximum lag order, at least 1
+    """
+
+    if max_lags is None:
+        return 1
+
+    # the largest candidate order p must leave at least as many residual rows as
+    # features, n_steps - p - (1 + p * n_features) >= n_features, otherwise the
+    # residual covariance is singular and the criteria always pick it
+    max_estimable = (n_steps - n_features - 1) // (n_features + 1)
+
+    return max(1, min(int(max_lags), max_estimable))
+
+
+def select_var_order(diff: np.ndarray, max_lags: float, ic: str = "aic") -> np.ndarray:
+    """Selects the lag order of each country's VAR model by an information criterion
+
+    All candidate orders 1..max_lags are estimated on the same observations, as in
+    VAR.select_order, from column slices of one lagged design matrix.
+
+    Args:
+        diff (np.ndarray): country x time x feature array of stationary series
+        max_lags (float): maximum lag order
+        ic (str, optional): "aic" or "bic". Defaults to "aic".
+
+    Raises:
+        ValueError: unknown information criterion
+
+    Returns:
+        np.ndarray: lag order of each country
+    """
+
+    if ic not in INFORMATION_CRITERIA:
+        raise ValueError(f"Unknown information criterion '{ic}'.")
+
+    n_countries, n_steps, n_features = diff.shape
+    max_order = max_var_order(max_lags, n_steps, n_features)
+
+    if max_order == 1:
+        return np.ones(n_countries, dtype=int)
+
+    n_rows = n_steps - max_order
+    endog = diff[:, max_order:]
+    design = _lagged_design(diff, max_order, n_rows)
+
+    criteria = np.empty((max_order, n_countries))
+
+    for order in range(1, max_order + 1):
+        exog = design[:, :, : 1 + order * n_features]
+        params, _ = _least_squares(exog, endog)
+        resid = endog - exog @ params
+
+        _, logdet = np.linalg.slogdet(resid.transpose(0, 2, 1) @ resid / n_rows)
+        free_params = order * n_features**2 + n_features
+
+        if ic == "aic":
+            criteria[order - 1] = logdet + 2 / n_rows * free_params
+        else:
+            criteria[order - 1] = logdet + np.log(n_rows) / n_rows * free_params
+
+    # argmin picks the smallest order on ties
+    return criteria.argmin(axis=0) + 1
+
+
+def fit_var(diff: np.ndarray, orders: np.ndarray) -> List[np.ndarray]:
+    """Estimates VAR models with a constant by least squares, countries of the same order in one solve
+
+    Args:
+        diff (np.ndarray): country x time x feature array of stationary series
+        orders (np.ndarray): lag order of each country
+
+    Returns:
+        List[np.ndarray]: parameters of each country, constant first
+    """
+
+    params = [None] * diff.shape[0]
+
+    for order in np.unique(orders):
+        selected = np.flatnonzero(orders == order)
+        n_rows = diff.shape[1] - order
+
+        exog = _lagged_design(diff[selected], order, n_rows)
+        selected_params, _ = _least_squares(exog, diff[selected, order:])
+
+        for i, country_params in zip(selected, selected_params):
+            params[i] = country_params
+
+    return params
+
+
+def forecast_var(history: np.ndarray, var_fit: VarFit, periods: int) -> np.ndarray:
+    """Forecasts a fitted VAR model recursively
+
+    Args:
+        history (np.ndarray): time x feature array of stationary series
+        var_fit (VarFit): fitted model
+        periods (int): number of forecasts to perform
+
+    Returns:
+        np.ndarray: forecasts with one row per period
+    """
+
+    order, n_features = var_fit.order, history.shape[1]
+    intercept = var_fit.params[0]
+    coefs = var_fit.params[1:].reshape(order, n_features, n_features)
+
+    lags = list(history[-order:][::-1])
+    forecast = np.empty((periods, n_features))
+
+    for h in range(periods):
+        forecast[h] = intercept + sum(lag @ coef for lag, coef in zip(lags, coefs))
+        lags = [forecast[h], *lags[:-1]]
+
+    return forecast
+
+
+def var_forecast_batched(
+    values: np.ndarray,
+    periods: int,
+    max_lags: float = None,
+    ic: str = "aic",
+    var_fits: List[Optional[VarFit]] = None,
+) -> Tuple[np.ndarray, List[VarFit]]:
+    """Fits a VAR model to every country and forecasts it, like var_fit_and_predict_multi
+
+    Args:
+        values (np.ndarray): country x time x feature array without missing values
+        periods (int): number of forecasts to perform
+        max_lags (float, optional): maximum lag order. Defaults to VAR(1).
+        ic (str, optional): information criterion selecting the lag order. Defaults to "aic".
+        var_fits (List[Optional[VarFit]], optional): previously fitted models of the countries,
+            None for countries to fit. Defaults to fitting all countries.
+
+    Returns:
+        Tuple[np.ndarray, List[VarFit]]: country x (time + periods) x feature array of history and forecasts,
+            fitted model of each country
+    """
+
+    values = np.asarray(values, dtype="float64")
+    n_countries = values.shape[0]
+
+    if var_fits is None:
+        var_fits = [None] * n_countries
+
+    # induce stationarity in time series
+    # normalize
+    mean = values.mean(axis=1, keepdims=True)
+    std = values.std(axis=1, ddof=1, keepdims=True)
+
+    normalized = (values - mean) / std
+
+    missing = [i for i, var_fit in enumerate(var_fits) if var_fit is None]
+    fitted = [i for i, var_fit in enumerate(var_fits) if var_fit is not None]
+
+    diff = np.empty((n_countries, values.shape[1] - 1, values.shape[2]))
+    var_fits = list(var_fits)
+
+    if fitted:
+        diff[fitted], _ = stationary_diff(
+            normalized[fitted], np.stack([var_fits[i].second_diff for i in fitted])
+        )
+
+    if missing:
+        diff[missing], second_diff = stationary_diff(normalized[missing])
+
+        orders = select_var_order(diff[missing], max_lags, ic)
+        params = fit_var(diff[missing], orders)
+
+        for j, i in enumerate(missing):
+            var_fits[i] = VarFit(int(orders[j]), params[j], second_diff[j])
+
+    forecast = np.stack(
+        [forecast_var(diff[i], var_fits[i], periods) for i in range(n_countries)]
+    )
+
+    # integrate forecasts from the last observation and denormalize
+    forecast = normalized[:, -1:, :] + np.cumsum(forecast, axis=1)
+
+    result = np.concatenate([normalized, forecast], axis=1) * std + mean
+
+    return np.nan_to_num(result, nan=0.0), var_fits
+
+
+def stack_countries(
+    dataframes: List[pd.DataFrame],
+    geo_columns: List[str],
+    time_columns: List[str],
+    feature_columns: List[List[str]],
+    countries: List[str],
+) -> Optional[Tuple[pd.Series, np.ndarray]]:
+    """Stacks the selected features of all countries into one country x time x feature array
+
+    Args:
+        dataframes (List[pd.DataFrame]): available datasets
+        geo_columns (List[str]): selected geo column of each dataset
+        time_columns (List[str]): selected time column of each dataset
+        feature_columns (List[List[str]]): selected features of each dataset
+        countries (List[str]): countries to stack
+
+    Returns:
+        Optional[Tuple[pd.Series, np.ndarray]]: sorted timestamps, stacked values or None if the countries
+            do not share the same time steps and features
+    """
+
+    features = [feature for features in feature_columns for feature in features]
+
+    if len(set(features)) != len(features):
+        return None
+
+    wide_dfs = []
+
+    for df, geo_column, time_column, dataset_features in zip(
+        dataframes, geo_columns, time_columns, feature_columns
+    ):
+        df = df[df[geo_column].isin(countries)]
+
+        if df.duplicated(subset=[geo_column, time_column]).any():
+            return None
+
+        wide_dfs.append(
+            df.pivot(index=time_column, columns=geo_column, values=dataset_features)
+        )
+
+    wide_df = pd.concat(wide_dfs, axis=1, join="outer").sort_index()
+
+    # columns are (feature, country) pairs
+    wide_df = wide_df.reindex(columns=pd.MultiIndex.from_product([features, countries]))
+
+    # a missing value means a country lacks a time step the others have
+    if wide_df.isna().to_numpy().any():
+        return None
+
+    values = wide_df.to_numpy(dtype="float64").reshape(
+        len(wide_df), len(features), len(countries)
+    )
+
+    return pd.Series(wide_df.index), values.transpose(2, 0, 1)
+
+
+def var_fit_and_predict_batched(
+    values: np.ndarray,
+    times: pd.Series,
+    periods: int,
+    frequency: str,
+    max_lags: float = None,
+    ic: str = "aic",
+    var_fits: List[Optional[VarFit]] = None,
+) -> Tuple[pd.Series, np.ndarray, List[VarFit]]:
+    """Fit and forecast using one Vector Auto Regression model per country, estimated together
+
+    Args:
+        values (np.ndarray): country x time x feature array without missing values
+        times (pd.Series): sorted timestamps shared by all countries
+        periods (int): number of forecasts to perform
+        frequency (str): frequency of timestamps
+        max_lags (float, optional): maximum lag order. Defaults to VAR(1).
+        ic (str, optional): information criterion selecting the lag order. Defaults to "aic".
+        var_fits (List[Optional[VarFit]], optional): previously fitted models of the countries,
+            None for countries to fit. Defaults to fitting all countries.
+
+    Returns:
+        Tuple[pd.Series, np.ndarray, List[VarFit]]: timestamps of history and forecasts, forecast data per country,
+            fitted model of each country
+    """
+
+    times = pd.Series(pd.to_datetime(times)).reset_index(drop=True)
+
+    future = pd.Series(
+        pd.date_range(
+            start=times.iloc[-1] + datetime.timedelta(**TIMEDELTAS[frequency]),
+            periods=periods,
+            freq=frequency,
+        )
+    )
+
+    forecasts, var_fits = var_forecast_batched(values, periods, max_lags, ic, var_fits)
+
+    return pd.concat([times, future], ignore_index=True), forecasts, var_fits
@@ -0,0 +1,211 @@
+"""
+
+Background forecast jobs
+
+Forecasts submitted as jobs run on a thread pool inside the server process,
+no external broker is needed. Every job is "queued", "running", "done" or
+"failed". Its state is kept in the "<session>.jobs" collection and its
+result, the same JSON the synchronous route would have returned, in the
+"<session>.results" GridFS bucket. Clients poll the state of a job and fetch
+the result once it is done.
+
+"""
+
+import atexit
+import datetime
+import threading
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+import gridfs
+
+
+class ForecastJobs:
+    def __init__(self, mongo, app=None):
+        """
+        Queue of forecast jobs executed in background threads
+
+        Args:
+            mongo (PyMongo): database the job states and results are stored in
+            app (Flask, optional): application the jobs run in. Defaults to None.
+        """
+
+        self.mongo = mongo
+        self.app = None
+        self.workers: int = 2
+
+        self._executor: ThreadPoolExecutor = None
+        self._lock = threading.Lock()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Reads FORECAST_JOB_WORKERS from the app config
+
+        Args:
+            app (Flask): application
+        """
+
+        self.app = app
+        self.workers = app.config.get("FORECAST_JOB_WORKERS", self.workers)
+
+        atexit.register(self.shutdown)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="forecast_job"
+                )
+
+            return self._executor
+
+    def _jobs(self, session_id: str):
+        return self.mongo.db[session_id + ".jobs"]
+
+    def _results(self, session_id: str) -> gridfs.GridFS:
+        return gridfs.GridFS(self.mongo.db, session_id + ".results")
+
+    def submit(self, session_id: str, kind: str, fn: Callable, *args) -> dict:
+        """Queues a forecast
+
+        Args:
+            session_id (str): id of the session the job belongs to
+            kind (str): name of the forecast, e.g. "map/var"
+            fn (Callable): function computing the response data or an error message and status code
+            *args: arguments of the function
+
+        Returns:
+            dict: state of the new job
+        """
+
+        job = {
+            "id": str(uuid.uuid4()),
+            "kind": kind,
+            "status": "queued",
+            "submitted": datetime.datetime.utcnow(),
+        }
+
+        self._jobs(session_id).insert_one(dict(job))
+
+        self._get_executor().submit(self._run, session_id, job["id"], fn, args)
+
+        return job
+
+    def _update(self, session_id: str, job_id: str, **fields):
+        self._jobs(session_id).update_one({"id": job_id}, {"$set": fields})
+
+    def _run(self, session_id: str, job_id: str, fn: Callable, args: tuple):
+        with self.app.app_context():
+            self._update(
+                session_id,
+                job_id,
+                status="running",
+                started=datetime.datetime.utcnow(),
+            )
+
+            try:
+                result = fn(*args)
+            except Exception as e:
+                traceback.print_exc()
+                self._update(
+                    session_id,
+                    job_id,
+                    status="failed",
+                    error=str(e),
+                    code=500,
+                    finished=datetime.datetime.utcnow(),
+                )
+                return
+
+            # routes signal errors by returning a message and a status code
+            if isinstance(result, tuple):
+                message, code = result
+                self._update(
+                    session_id,
+                    job_id,
+                    status="failed",
+                    error=message,
+                    code=code,
+                    finished=datetime.datetime.utcnow(),
+                )
+                return
+
+            self._results(session_id).put(
+                self.app.json.dumps(result).encode("utf-8"), id=job_id
+            )
+
+            self._update(
+                session_id,
+                job_id,
+                status="done",
+                finished=datetime.datetime.utcnow(),
+            )
+
+    def get(self, session_id: str, job_id: str) -> Optional[dict]:
+        """State of a job
+
+        Args:
+            session_id (str): id of the session
+            job_id (str): id of the job
+
+        Returns:
+            Optional[dict]: state of the job or None if the session has no such job
+        """
+
+        return self._jobs(session_id).find_one({"id": job_id}, {"_id": 0})
+
+    def read_result(self, session_id: str, job_id: str) -> Optional[bytes]:
+        """Result of a finished job
+
+        Args:
+            session_id (str): id of the session
+            job_id (str): id of the job
+
+        Returns:
+            Optional[bytes]: JSON response data or None if the job has no result
+        """
+
+        result = self._results(session_id).find_one({"id": job_id})
+
+        if result is None:
+            return None
+
+        return result.read()
+
+    def delete(self, session_id: str, job_id: str):
+        """Removes the state and the result of a job
+
+        Args:
+            session_id (str): id of the session
+            job_id (str): id of the job
+        """
+
+        bucket = self._results(session_id)
+
+        for result in bucket.find({"id": job_id}):
+            bucket.delete(result._id)
+
+        self._jobs(session_id).delete_one({"id": job_id})
+
+    def drop_session(self, session_id: str):
+        """Removes the states and results of all jobs of a session
+
+        Args:
+            session_id (str): id of the session
+        """
+
+        self.mongo.db.drop_collection(session_id + ".jobs")
+        self.mongo.db.drop_collection(session_id + ".results.files")
+        self.mongo.db.drop_collection(session_id + ".results.chunks")
+
+    def shutdown(self):
+        """Stops the job threads, queued jobs are cancelled"""
+
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
@@ -0,0 +1,144 @@
+"""
+
+On-disk LRU cache for fitted Prophet models
+
+Fitting a Prophet model takes seconds, while forecasting a different horizon
+or scenario with an already fitted model only needs make_future_dataframe
+and predict. Models are stored serialised as JSON in a local directory, so
+every worker process of the server shares them, and are laid out as
+<session>/<key>.json to allow invalidating all models of a session at once.
+
+"""
+
+import os
+import tempfile
+from typing import Optional
+
+from prophet import Prophet
+from prophet.serialize import model_from_json, model_to_json
+
+from preprocessing.disk_cache import DiskLRU, digest
+
+
+class ModelCache:
+    def __init__(self, app=None):
+        """
+        Cache of fitted forecasting models shared by all processes on this machine
+
+        Args:
+            app (Flask, optional): application to read the configuration from. Defaults to None.
+        """
+
+        self._store = DiskLRU(".json")
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Reads MODEL_CACHE_DIR and MODEL_CACHE_MAX_BYTES from the app config
+
+        Args:
+            app (Flask): application
+        """
+
+        self._store.configure(
+            app.config.get(
+                "MODEL_CACHE_DIR",
+                os.path.join(tempfile.gettempdir(), "dt_society_models"),
+            ),
+            app.config.get("MODEL_CACHE_MAX_BYTES", 256 * 1024**2),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self._store.enabled
+
+    def _path(self, key: tuple) -> str:
+        return self._store.path((digest(key[0]),), key)
+
+    def get(self, key: tuple) -> Optional[Prophet]:
+        """Looks up a fitted model
+
+        Args:
+            key (tuple): session id followed by everything the model was fitted on
+                (dataset versions, country, features, regressors, frequency)
+
+        Returns:
+            Optional[Prophet]: fitted model or None on a miss
+        """
+
+        model_json = self.get_serialized(key)
+
+        if model_json is None:
+            return None
+
+        try:
+            return model_from_json(model_json)
+        except ValueError as e:
+            print(f"Cached model could not be restored: {e}")
+            return None
+
+    def get_serialized(self, key: tuple) -> Optional[str]:
+        """Looks up a fitted model without restoring it, e.g. to pass it to a forecast worker
+
+        Args:
+            key (tuple): session id followed by everything the model was fitted on
+
+        Returns:
+            Optional[str]: model serialised as JSON or None on a miss
+        """
+
+        if not self.enabled:
+            return None
+
+        path = self._path(key)
+
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                model_json = file.read()
+        except FileNotFoundError:
+            return None
+
+        self._store.touch(path)
+
+        return model_json
+
+    def set(self, key: tuple, model: Prophet):
+        """Stores a fitted model and evicts the least recently used models above the size limit
+
+        Args:
+            key (tuple): session id followed by everything the model was fitted on
+                (dataset versions, country, features, regressors, frequency)
+            model (Prophet): fitted model
+        """
+
+        if not self.enabled:
+            return
+
+        self.set_serialized(key, model_to_json(model))
+
+    def set_serialized(self, key: tuple, model_json: str):
+        """Stores a model serialised with prophet.serialize.model_to_json
+
+        Args:
+            key (tuple): session id followed by everything the model was fitted on
+            model_json (str): serialised model
+        """
+
+        if not self.enabled:
+            return
+
+        def write(path: str):
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(model_json)
+
+        self._store.write(self._path(key), write)
+
+    def invalidate(self, session_id: str):
+        """Removes all models of a session
+
+        Args:
+            session_id (str): id of the session
+        """
+
+        self._store.invalidate(digest(session_id))
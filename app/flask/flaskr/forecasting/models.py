@@ -2,15 +2,22 @@ import datetime
 import numpy as np
 import pandas as pd
 from prophet import Prophet
+from prophet.serialize import model_from_json, model_to_json
 from sklearn.linear_model import LinearRegression
 from sklearn.tree import DecisionTreeRegressor
 from sklearn.neighbors import KNeighborsRegressor
 from sklearn.metrics import mean_squared_error
-from statsmodels.tsa.api import VAR
-from statsmodels.tsa.stattools import adfuller
 from typing import Tuple, List
 
-from .smoothing import multivariate_ES
+from .batched import (
+    TIMEDELTAS,
+    VarFit,
+    fit_var,
+    forecast_var,
+    select_var_order,
+    stationary_diff,
+)
+from .smoothing import multivariate_es_forecast
 from preprocessing.parse import merge_dataframes_multi
 
 
@@ -20,7 +27,8 @@ def prophet_fit_and_predict(
     feature_column: str,
     periods: int,
     frequency: str,
-) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    model: Prophet = None,
+) -> Tuple[pd.DataFrame, pd.DataFrame, Prophet]:
     """Fits a Prophet model to given dataframe and returns predictions for set amount of periods
 
     Args:
@@ -28,9 +36,10 @@ def prophet_fit_and_predict(
         time_column (str): name of the column that contains time data
         feature_column (str): name of the column that contains feature data
         periods (int): amount of future periods to make predictions for
+        model (Prophet, optional): model already fitted to the dataset, skips fitting. Defaults to None.
 
     Returns:
-        Tuple[pd.DataFrame, pd.DataFrame]: Dataframe with forecast data and original dataframe
+        Tuple[pd.DataFrame, pd.DataFrame, Prophet]: Dataframe with forecast data, original dataframe and fitted model
     """
 
     df = df.rename(columns={time_column: "ds", feature_column: "y"})
@@ -41,9 +50,10 @@ def prophet_fit_and_predict(
 
     df["ds"] = df["ds"].replace(to_replace=time, value=time_range)
 
-    model = Prophet()
+    if model is None:
+        model = Prophet()
 
-    model.fit(df)
+        model.fit(df)
 
     future = model.make_future_dataframe(periods=periods, freq=frequency)
 
@@ -56,7 +66,7 @@ def prophet_fit_and_predict(
     forecast["error"] = (
         predictions["yhat_upper"][len(df) :] - predictions["yhat_lower"][len(df) :]
     )
-    return forecast, df
+    return forecast, df, model
 
 
 def fit_and_predict(
@@ -144,6 +154,8 @@ def var_fit_and_predict_multi(
     max_lags: float,
     periods: int,
     frequency: str,
+    ic: str = "aic",
+    var_fit: VarFit = None,
 ) -> pd.DataFrame:
     """Fit and forecast using a Vector Auto Regression model
 
@@ -151,16 +163,17 @@ def var_fit_and_predict_multi(
         dataframes (List[pd.DataFrame]): available dataframes
         time_columns (List[str]): selected time columns
         feature_columns (List[str]): selected features
-        max_lags (float): number of lags to consider while forecasting (max_lags parameter)
+        max_lags (float): maximum lag order, the order is selected by the information criterion
         periods (int): number of forecasts to perform
         frequency (str): frequency of timestamps
+        ic (str, optional): information criterion selecting the lag order, "aic" or "bic". Defaults to "aic".
+        var_fit (VarFit, optional): model fitted by a previous call on the same data,
+            skips lag order selection and fitting. Defaults to None.
 
     Returns:
-        Tuple[pd.DataFrame, dict]: forecast data, marks dict for slider
+        pd.DataFrame: forecast data, the fitted model is stored in attrs["var_fit"]
     """
 
-    timedeltas = {"AS-JAN": {"days": 365}, "MS": {"days": 30}}
-
     if len(dataframes) == 1:
         merged_df, time = dataframes[0], time_columns[0]
     else:
@@ -176,44 +189,24 @@ def var_fit_and_predict_multi(
     for feature in feature_columns:
         merged_df[feature] = (merged_df[feature] - mean[feature]) / std[feature]
 
-    # first order difference
-    merged_df_diff = merged_df[feature_columns].diff().astype("float32").dropna()
-
-    merged_df_diff[time] = merged_df[time]
-
-    merged_df_diff.set_index(time, inplace=True)
-
-    # take second order difference if needed
-    for feature in feature_columns:
-        p_stationary = adfuller(merged_df_diff[feature])[1]
-
-        print(f"{feature} p: ", p_stationary)
-        if p_stationary > 0.05:
-            second_diff = merged_df_diff[feature].diff().fillna(0)
-
-            if adfuller(second_diff)[1] < p_stationary:
-                merged_df_diff[feature] = second_diff
-                merged_df_diff[feature].fillna(0, inplace=True)
-                print("second p:", p_stationary)
-
-    # remove volatility across given frequency
-    volatility = merged_df_diff.std()
-    merged_df_diff[feature_columns] = merged_df_diff[feature_columns] / volatility
-
-    merged_df_diff.dropna(inplace=True)
-
-    model = VAR(merged_df_diff)
+    # difference until stationary and remove volatility
+    diff, second_diff = stationary_diff(
+        merged_df[feature_columns].to_numpy(dtype="float64")[np.newaxis],
+        None if var_fit is None else var_fit.second_diff[np.newaxis],
+    )
 
-    # model.select_order()
+    if var_fit is None:
+        orders = select_var_order(diff, max_lags, ic)
+        var_fit = VarFit(int(orders[0]), fit_var(diff, orders)[0], second_diff[0])
 
-    result = model.fit()
+        print(f"VAR order ({ic}): ", var_fit.order)
 
-    forecast = result.forecast(merged_df_diff[-result.k_ar :].values, periods)
+    forecast = forecast_var(diff[0], var_fit, periods)
 
     forecast_df = pd.DataFrame()
 
     forecast_df[time] = pd.date_range(
-        start=merged_df[time].iloc[-1] + datetime.timedelta(**timedeltas[frequency]),
+        start=merged_df[time].iloc[-1] + datetime.timedelta(**TIMEDELTAS[frequency]),
         periods=periods,
         freq=frequency,
     )
@@ -232,6 +225,8 @@ def var_fit_and_predict_multi(
 
     df_final.fillna(0, inplace=True)
 
+    df_final.attrs["var_fit"] = var_fit
+
     return df_final
 
 
@@ -268,13 +263,9 @@ def hw_es_fit_and_predict_multi(
         .rename(columns={feature: i for i, feature in enumerate(feature_columns)})
     )
 
-    forecast = []
-
-    for t in range(periods):
-        test = multivariate_ES(
-            df_features, len(df_features), t + 1, len(feature_columns), alpha
-        )
-        forecast.append(test[-1])
+    forecast = multivariate_es_forecast(
+        df_features.to_numpy(), periods, len(feature_columns), alpha
+    )
 
     forecast_df = pd.DataFrame()
 
@@ -283,13 +274,67 @@ def hw_es_fit_and_predict_multi(
     )
 
     for i, feature in enumerate(sorted(feature_columns)):
-        forecast_df[feature] = [x[i] for x in forecast]
+        forecast_df[feature] = forecast[:, i]
 
     df_final = pd.concat([merged_df, forecast_df], ignore_index=True)
 
     return df_final
 
 
+def _merge_prophet_frames(
+    dataframes: List[pd.DataFrame],
+    time_columns: List[str],
+    feature_columns: List[str],
+    y_feature_index: int,
+) -> pd.DataFrame:
+    merged_df, time = merge_dataframes_multi(dataframes, time_columns)
+
+    # if feature_column_1 == feature_column_2:
+    #     feature_column_1 += "_x"
+    #     feature_column_2 += "_y"
+
+    merged_df = merged_df.rename(
+        columns={time: "ds", feature_columns[y_feature_index]: "y"}
+    )
+
+    merged_df["ds"] = pd.to_datetime(merged_df["ds"].astype(str))
+
+    return merged_df
+
+
+def prophet_fit_n(
+    dataframes: List[pd.DataFrame],
+    time_columns: List[str],
+    feature_columns: List[str],
+    y_feature_index: int,
+) -> Prophet:
+    """Fits a Prophet model with all features except the dependent one as regressors
+
+    Args:
+        dataframes (List[pd.DataFrame]): available dataframes
+        time_columns (List[str]): selected time columns
+        feature_columns (List[str]): selected features
+        y_feature_index (int): index/id of the dependent feature
+
+    Returns:
+        Prophet: fitted model
+    """
+
+    merged_df = _merge_prophet_frames(
+        dataframes, time_columns, feature_columns, y_feature_index
+    )
+
+    model = Prophet()
+
+    for i, feature in enumerate(feature_columns):
+        if i != y_feature_index:
+            model.add_regressor(feature)
+
+    model.fit(merged_df)
+
+    return model
+
+
 def prophet_fit_and_predict_n(
     dataframes: List[pd.DataFrame],
     time_columns: List[str],
@@ -297,7 +342,8 @@ def prophet_fit_and_predict_n(
     scenarios: List[List[float]],
     frequency: str,
     y_feature_index: int,
-) -> Tuple[pd.DataFrame, str]:
+    model: Prophet = None,
+) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, str, Prophet]:
     """Fit and forecast using the Prophet model with additional scenarios
 
     Args:
@@ -307,30 +353,25 @@ def prophet_fit_and_predict_n(
         scenarios (List[List[float]]): specified scenarios
         frequency (str): frequency of time stamps
         y_feature_index (int): index/id of the dependent feature
+        model (Prophet, optional): model already fitted to the dataframes with the same regressors,
+            only the scenarios are predicted. Defaults to None.
 
     Returns:
-        Tuple[pd.DataFrame, str]: forecast, intitial and future dataframe, name of dependent feature
+        Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, str, Prophet]: forecast, intitial and future dataframe,
+            name of dependent feature, fitted model
     """
 
-    merged_df, time = merge_dataframes_multi(dataframes, time_columns)
+    if model is None:
+        model = prophet_fit_n(
+            dataframes, time_columns, feature_columns, y_feature_index
+        )
 
-    # if feature_column_1 == feature_column_2:
-    #     feature_column_1 += "_x"
-    #     feature_column_2 += "_y"
+    merged_df = _merge_prophet_frames(
+        dataframes, time_columns, feature_columns, y_feature_index
+    )
 
     y_feature = feature_columns.pop(y_feature_index)
 
-    merged_df = merged_df.rename(columns={time: "ds", y_feature: "y"})
-
-    merged_df["ds"] = pd.to_datetime(merged_df["ds"].astype(str))
-
-    model = Prophet()
-
-    for feature in feature_columns:
-        model.add_regressor(feature)
-
-    model.fit(merged_df)
-
     scenario_min_len = len(min(scenarios, key=len))
     future = model.make_future_dataframe(periods=scenario_min_len, freq=frequency)
 
@@ -348,4 +389,58 @@ def prophet_fit_and_predict_n(
 
     future_df = future[len(merged_df) - 1 :][["ds", *feature_columns]]
 
-    return forecast, merged_df, future_df, y_feature
+    return forecast, merged_df, future_df, y_feature, model
+
+
+def prophet_fit_and_predict_serialized(
+    df: pd.DataFrame,
+    time_column: str,
+    feature_column: str,
+    periods: int,
+    frequency: str,
+    model_json: str = None,
+) -> Tuple[pd.DataFrame, str]:
+    """Runs prophet_fit_and_predict inside a forecast worker, models are passed as JSON
+
+    Args:
+        df (pd.DataFrame): Dataset
+        time_column (str): name of the column that contains time data
+        feature_column (str): name of the column that contains feature data
+        periods (int): amount of future periods to make predictions for
+        frequency (str): frequency of time stamps
+        model_json (str, optional): serialised model already fitted to the dataset. Defaults to None.
+
+    Returns:
+        Tuple[pd.DataFrame, str]: Dataframe with forecast data, serialised fitted model
+    """
+
+    model = model_from_json(model_json) if model_json is not None else None
+
+    forecast, _, model = prophet_fit_and_predict(
+        df, time_column, feature_column, periods, frequency, model=model
+    )
+
+    return forecast, model_json if model_json is not None else model_to_json(model)
+
+
+def prophet_fit_n_serialized(
+    dataframes: List[pd.DataFrame],
+    time_columns: List[str],
+    feature_columns: List[str],
+    y_feature_index: int,
+) -> str:
+    """Runs prophet_fit_n inside a forecast worker
+
+    Args:
+        dataframes (List[pd.DataFrame]): available dataframes
+        time_columns (List[str]): selected time columns
+        feature_columns (List[str]): selected features
+        y_feature_index (int): index/id of the dependent feature
+
+    Returns:
+        str: serialised fitted model
+    """
+
+    return model_to_json(
+        prophet_fit_n(dataframes, time_columns, feature_columns, y_feature_index)
+    )
@@ -0,0 +1,305 @@
+"""
+
+Process pool shared by all forecast endpoints
+
+The pool is created once on first use and keeps its workers alive between
+requests, with the forecasting libraries already imported. The number of
+queued and running tasks is bounded: new tasks wait for a free slot and are
+rejected if none becomes available in time, instead of oversubscribing the
+machine. A task that runs longer than FORECAST_TASK_TIMEOUT can not be
+cancelled, so its workers are terminated and the pool is started again; other
+tasks that ran in the terminated workers are submitted once more.
+
+"""
+
+import atexit
+import importlib
+import multiprocessing
+import threading
+import weakref
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    TimeoutError,
+    wait,
+)
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+WARM_MODULES = (
+    "numpy",
+    "pandas",
+    "prophet",
+    "sklearn.linear_model",
+    "statsmodels.tsa.api",
+    "forecasting.models",
+)
+
+
+class ForecastPoolBusy(Exception):
+    """Raised if no slot for a new forecast task became available in time"""
+
+
+def _warm_up(modules: Iterable[str]):
+    for module in modules:
+        try:
+            importlib.import_module(module)
+        except ImportError as e:
+            print(f"Forecast worker could not preload '{module}': {e}")
+
+
+class ForecastPool:
+    def __init__(self, app=None):
+        """
+        Application wide pool of forecasting worker processes
+
+        Args:
+            app (Flask, optional): application to read the configuration from. Defaults to None.
+        """
+
+        self.processes: int = 4
+        self.max_queue: int = 16
+        self.task_timeout: float = 120
+        self.start_method: str = None
+
+        self._executor: ProcessPoolExecutor = None
+        self._slots: threading.BoundedSemaphore = None
+        self._lock = threading.Lock()
+
+        # executor, function, arguments and attempt of every submitted task
+        self._tasks: "weakref.WeakKeyDictionary[Future, tuple]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._recycled: "weakref.WeakSet[ProcessPoolExecutor]" = weakref.WeakSet()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Reads FORECAST_POOL_PROCESSES, FORECAST_POOL_MAX_QUEUE, FORECAST_TASK_TIMEOUT
+        and FORECAST_POOL_START_METHOD from the app config
+
+        Args:
+            app (Flask): application
+        """
+
+        self.processes = app.config.get("FORECAST_POOL_PROCESSES", self.processes)
+        self.max_queue = app.config.get("FORECAST_POOL_MAX_QUEUE", self.max_queue)
+        self.task_timeout = app.config.get("FORECAST_TASK_TIMEOUT", self.task_timeout)
+        self.start_method = app.config.get(
+            "FORECAST_POOL_START_METHOD", self.start_method
+        )
+
+        self._slots = threading.BoundedSemaphore(self.max_queue)
+
+        atexit.register(self.shutdown)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context(self.start_method),
+                    initializer=_warm_up,
+                    initargs=(WARM_MODULES,),
+                )
+                print(f"Started forecast pool with {self.processes} workers.")
+
+            return self._executor
+
+    def submit(self, fn: Callable, *args) -> Future:
+        """Schedules a task in the pool
+
+        Args:
+            fn (Callable): picklable function to run in a worker
+            *args: arguments of the function
+
+        Raises:
+            ForecastPoolBusy: the maximum number of queued tasks stayed reached for FORECAST_TASK_TIMEOUT seconds
+
+        Returns:
+            Future: future of the task's result
+        """
+
+        return self._submit(fn, args, 0)
+
+    def _submit(self, fn: Callable, args: tuple, attempt: int) -> Future:
+        if self._slots is None:
+            self._slots = threading.BoundedSemaphore(self.max_queue)
+
+        if not self._slots.acquire(timeout=self.task_timeout):
+            raise ForecastPoolBusy("Forecast workers are busy.")
+
+        try:
+            executor = self._get_executor()
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            # a worker died, start a new pool for this and future tasks
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            try:
+                executor = self._get_executor()
+                future = executor.submit(fn, *args)
+            except BaseException:
+                self._slots.release()
+                raise
+        except BaseException:
+            self._slots.release()
+            raise
+
+        self._tasks[future] = (executor, fn, args, attempt)
+        future.add_done_callback(lambda _: self._slots.release())
+
+        return future
+
+    def _recycle(self, executor: ProcessPoolExecutor):
+        with self._lock:
+            if executor in self._recycled:
+                return
+
+            self._recycled.add(executor)
+
+            if self._executor is executor:
+                self._executor = None
+
+        print("Restarting forecast pool, a task exceeded the timeout.")
+
+        # running tasks can not be cancelled, terminating their workers breaks the
+        # executor and fails all of its futures, which releases their slots
+        for process in list((executor._processes or {}).values()):
+            process.terminate()
+
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _abandon(self, futures: Iterable[Future]):
+        # queued tasks are cancelled, running ones are stopped by restarting the pool
+        for future in futures:
+            if not future.cancel() and not future.done():
+                self._recycle(self._tasks[future][0])
+
+    def _retry(self, future: Future) -> Optional[Future]:
+        # tasks that only failed because another task's workers were terminated run once more
+        executor, fn, args, attempt = self._tasks.get(future, (None, None, None, 1))
+
+        if attempt > 0 or executor not in self._recycled:
+            return None
+
+        return self._submit(fn, args, attempt + 1)
+
+    def result(self, future: Future):
+        """Waits for the result of a task at most FORECAST_TASK_TIMEOUT seconds
+
+        A task that does not finish in time is stopped by restarting the pool.
+
+        Args:
+            future (Future): future returned by submit
+
+        Raises:
+            TimeoutError: task did not finish in time
+
+        Returns:
+            object: result of the task
+        """
+
+        try:
+            return future.result(timeout=self.task_timeout)
+        except TimeoutError:
+            self._abandon([future])
+            raise
+        except BrokenProcessPool:
+            retried = self._retry(future)
+            if retried is None:
+                raise
+
+        return self.result(retried)
+
+    def starmap(self, fn: Callable, iterable: Iterable[tuple]) -> List:
+        """Runs a function for each argument tuple in the pool, like multiprocessing.Pool.starmap
+
+        Args:
+            fn (Callable): picklable function to run in a worker
+            iterable (Iterable[tuple]): argument tuples
+
+        Returns:
+            List: results in the order of the arguments
+        """
+
+        futures = []
+
+        try:
+            for args in iterable:
+                futures.append(self.submit(fn, *args))
+
+            return [self.result(future) for future in futures]
+
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+    def imap_unordered(
+        self, fn: Callable, iterable: Iterable[tuple]
+    ) -> Iterator[Tuple[int, object]]:
+        """Runs a function for each argument tuple in the pool and yields results as soon as they finish,
+        like multiprocessing.Pool.imap_unordered
+
+        Results that finish while later tasks wait for a free slot are yielded in between.
+        Closing the iterator cancels all tasks that have not started yet.
+
+        Args:
+            fn (Callable): picklable function to run in a worker
+            iterable (Iterable[tuple]): argument tuples
+
+        Raises:
+            TimeoutError: no task finished within FORECAST_TASK_TIMEOUT seconds
+
+        Yields:
+            Iterator[Tuple[int, object]]: position of the argument tuple, result of the task
+        """
+
+        pending: Dict[Future, int] = {}
+
+        def completed(timeout: float) -> Iterator[Tuple[int, object]]:
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            if not done and timeout:
+                self._abandon(pending)
+                raise TimeoutError()
+
+            for future in done:
+                i = pending.pop(future)
+
+                try:
+                    result = future.result()
+                except BrokenProcessPool:
+                    retried = self._retry(future)
+                    if retried is None:
+                        raise
+                    pending[retried] = i
+                    continue
+
+                yield i, result
+
+        try:
+            for i, args in enumerate(iterable):
+                if pending:
+                    yield from completed(0)
+
+                pending[self.submit(fn, *args)] = i
+
+            while pending:
+                yield from completed(self.task_timeout)
+
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def shutdown(self):
+        """Stops all workers, pending tasks are cancelled"""
+
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
@@ -0,0 +1,158 @@
+"""
+
+Zero-copy transfer of datasets to forecast workers
+
+The request process publishes each dataset once as an Arrow IPC file in
+shared memory (/dev/shm if available), sorted by country. Workers receive the
+file path together with the row range of a country and the columns they
+need, and read that range through a memory map instead of unpickling copies
+of every country's frames.
+
+"""
+
+import os
+import shutil
+import tempfile
+from typing import Dict, List, NamedTuple, Tuple
+
+import pandas as pd
+import pyarrow as pa
+
+from .batched import VarFit
+from .models import hw_es_fit_and_predict_multi, var_fit_and_predict_multi
+
+
+class FrameSlice(NamedTuple):
+    path: str
+    offset: int
+    length: int
+    columns: List[str]
+
+
+def _shared_memory_dir() -> str:
+    if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK):
+        return "/dev/shm"
+
+    return tempfile.gettempdir()
+
+
+class SharedFrames:
+    def __init__(self):
+        """
+        Memory-mapped Arrow files of the datasets used by a single request.
+        Files are removed when the context is left.
+        """
+
+        self.directory = tempfile.mkdtemp(
+            prefix="dt_society_frames_", dir=_shared_memory_dir()
+        )
+        self._n_published = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def publish(
+        self, df: pd.DataFrame, geo_column: str, columns: List[str]
+    ) -> Tuple[str, Dict[str, Tuple[int, int]]]:
+        """Writes the selected columns of a dataset to shared memory, rows grouped by country
+
+        Args:
+            df (pd.DataFrame): dataset
+            geo_column (str): name of the column with geo data
+            columns (List[str]): columns workers need to read
+
+        Returns:
+            Tuple[str, Dict[str, Tuple[int, int]]]: path of the file, (offset, length) of the rows of each country
+        """
+
+        df = df.sort_values(by=geo_column, kind="stable")
+
+        rows = {
+            country: (int(indices[0]), len(indices))
+            for country, indices in df.groupby(geo_column, sort=False).indices.items()
+        }
+
+        table = pa.Table.from_pandas(
+            df[list(dict.fromkeys(columns))], preserve_index=False
+        )
+
+        path = os.path.join(self.directory, f"{self._n_published}.arrow")
+        self._n_published += 1
+
+        with pa.OSFile(path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+        return path, rows
+
+    def close(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def read_slice(frame_slice: FrameSlice) -> pd.DataFrame:
+    """Reads the rows of a country from a published dataset
+
+    Args:
+        frame_slice (FrameSlice): path, row range and columns to read
+
+    Returns:
+        pd.DataFrame: selected rows and columns
+    """
+
+    table = pa.ipc.open_file(pa.memory_map(frame_slice.path)).read_all()
+
+    return (
+        table.slice(frame_slice.offset, frame_slice.length)
+        .select(frame_slice.columns)
+        .to_pandas()
+    )
+
+
+def fit_and_predict_shared(
+    model: str,
+    frame_slices: List[FrameSlice],
+    time_columns: List[str],
+    feature_columns: List[str],
+    max_lags: float,
+    periods: int,
+    frequency: str,
+    ic: str = "aic",
+    var_fit: VarFit = None,
+) -> pd.DataFrame:
+    """Reads the frames of a country from shared memory and forecasts them, runs inside a forecast worker
+
+    Args:
+        model (str): "var" or "hwes"
+        frame_slices (List[FrameSlice]): one slice per selected feature
+        time_columns (List[str]): selected time columns
+        feature_columns (List[str]): selected features
+        max_lags (float): max_lags of the VAR model or alpha of the HW model
+        periods (int): number of forecasts to perform
+        frequency (str): frequency of timestamps
+        ic (str, optional): information criterion selecting the VAR lag order. Defaults to "aic".
+        var_fit (VarFit, optional): previously fitted VAR model of the country. Defaults to None.
+
+    Returns:
+        pd.DataFrame: forecast data
+    """
+
+    dataframes = [read_slice(frame_slice) for frame_slice in frame_slices]
+
+    if model == "var":
+        return var_fit_and_predict_multi(
+            dataframes,
+            time_columns,
+            feature_columns,
+            max_lags,
+            periods,
+            frequency,
+            ic=ic,
+            var_fit=var_fit,
+        )
+
+    return hw_es_fit_and_predict_multi(
+        dataframes, time_columns, feature_columns, frequency, periods, max_lags
+    )
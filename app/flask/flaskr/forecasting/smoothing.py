@@ -2,81 +2,100 @@ import pandas as pd
 import numpy as np
 
 
-def centered_moving_average(D: pd.DataFrame, year_size):
+def _nanmean(values: np.ndarray, axis: int = 0) -> np.ndarray:
+    # mean ignoring NaN like pd.DataFrame.mean, NaN where no value is available
+    valid = ~np.isnan(values)
 
-    # hint: the function is set to work for even numbers of year_size!
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(valid, values, 0).sum(axis=axis) / valid.sum(axis=axis)
 
-    estimated_levels = pd.DataFrame()
 
-    D = D.iloc[0 : 4 * year_size, :]
-    for i in range(3 * year_size):
+def _centered_moving_average(values: np.ndarray, year_size: int) -> np.ndarray:
+    values = values[0 : 4 * year_size]
+    n_rows = values.shape[0]
 
-        series = (
-            D.iloc[i : i + year_size, :].mean()
-            + D.iloc[i + 1 : i + year_size + 1, :].mean()
-        ) / 2
-        estimated_levels = estimated_levels.append(series, ignore_index=True)
+    # window sums from cumulative sums, NaN are skipped as in pd.DataFrame.mean
+    valid = ~np.isnan(values)
+    zeros = np.zeros((1, values.shape[1]))
+    sums = np.concatenate([zeros, np.cumsum(np.where(valid, values, 0), axis=0)])
+    counts = np.concatenate([zeros, np.cumsum(valid, axis=0)])
 
-    return estimated_levels
+    def window_mean(starts):
+        ends = np.minimum(starts + year_size, n_rows)
+        starts = np.minimum(starts, n_rows)
 
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return (sums[ends] - sums[starts]) / (counts[ends] - counts[starts])
 
-def initialize(data: pd.DataFrame, year_size):
+    starts = np.arange(3 * year_size)
+
+    return (window_mean(starts) + window_mean(starts + 1)) / 2
+
+
+def centered_moving_average(D: pd.DataFrame, year_size):
+
+    # hint: the function is set to work for even numbers of year_size!
+
+    estimated_levels = _centered_moving_average(D.to_numpy(dtype="float64"), year_size)
+
+    return pd.DataFrame(estimated_levels, columns=D.columns)
+
+
+def _initialize(values: np.ndarray, year_size: int) -> tuple:
 
     # INITIALIZING L0, S0, AND T0:
 
     #   i) First, a centered "year_size"-month moving average is applied to the first four years of data. This yields
     #      3*year_size estimated levels.
 
-    estimated_levels = centered_moving_average(data, year_size)
+    estimated_levels = _centered_moving_average(values, year_size)
 
     #   ii)Then, We subtract the above values from X(year_size/2 + 1) ... X(year_size/2 + 3*year_size), and average
     #      the three amounts for each month, in order to get seasonal effects. Then we standardize seasonal effects
     #      to sum to zero.
 
-    X = data.iloc[int(year_size / 2) : int(year_size / 2 + 3 * year_size), :]
+    half_year = int(year_size / 2)
 
-    X.reset_index(drop=True, inplace=True)
+    X = np.full((3 * year_size, values.shape[1]), np.nan)
+    X_available = values[half_year : half_year + 3 * year_size]
+    X[: X_available.shape[0]] = X_available
 
-    temp = (
-        X.iloc[0 : int(3 * year_size), :]
-        - estimated_levels.iloc[0 : int(3 * year_size), :]
-    )
+    temp = X - estimated_levels
 
-    S0 = pd.DataFrame()
-
-    for i in range(year_size):
-        S0 = S0.append(
-            (
-                temp.iloc[i, :]
-                + temp.iloc[i + year_size, :]
-                + temp.iloc[i + 2 * year_size, :]
-            )
-            / 3,
-            ignore_index=True,
-        )
+    S0 = (
+        temp[0:year_size]
+        + temp[year_size : 2 * year_size]
+        + temp[2 * year_size : 3 * year_size]
+    ) / 3
 
-    temp = S0.iloc[int(year_size / 2) : year_size, :]
-    temp = temp.append(S0.iloc[0 : int(year_size / 2), :], ignore_index=True)
-    S0 = temp
-    temp = pd.DataFrame()
-    for i in range(year_size):
-        temp = temp.append(S0.iloc[i, :] - S0.mean(), ignore_index=True)
-    S0 = temp
+    S0 = np.roll(S0, -half_year, axis=0)
+    S0 = S0 - _nanmean(S0)
 
     #   iii)Now we estimate T0, based on the formula from the paper:
 
     T0 = (
-        estimated_levels.iloc[2 * year_size : 3 * year_size].mean()
-        - estimated_levels.iloc[year_size - 1 : 2 * year_size - 1].mean()
+        _nanmean(estimated_levels[2 * year_size : 3 * year_size])
+        - _nanmean(estimated_levels[year_size - 1 : 2 * year_size - 1])
     ) / year_size
 
     #   we set L0 to the first data values:
 
-    L0 = data.iloc[0, :]
+    L0 = values[0]
 
     return L0, T0, S0
 
 
+def initialize(data: pd.DataFrame, year_size):
+
+    L0, T0, S0 = _initialize(data.to_numpy(dtype="float64"), year_size)
+
+    return (
+        data.iloc[0, :],
+        pd.Series(T0, index=data.columns),
+        pd.DataFrame(S0, columns=data.columns),
+    )
+
+
 def multivariate_ES(
     data: pd.DataFrame, h_period: int, m: int, year_size: int, alpha: int
 ):
@@ -103,17 +122,12 @@ def multivariate_ES(
 
     S = []
     for i in range(inits[2].shape[0]):
-        ser = pd.Series(dtype="float64")
-        ser = ser.append(inits[2].iloc[i, :])
-        ser = ser.fillna(0)
-        S.append(ser)
+        S.append(inits[2].iloc[i, :].fillna(0))
 
     #     all of seasonal effects- it's just used for plotting the seasonal effects later:
     s = []
     for i in range(inits[2].shape[0]):
-        ser = pd.Series(dtype="float64")
-        ser = ser.append(inits[2].iloc[i, :])
-        s.append(ser)
+        s.append(inits[2].iloc[i, :])
 
     #     main loop for the calculations of values of level, trend and seasonality. The values in each step are saved in
     #     the corresponding lists L, T and S:
@@ -145,3 +159,52 @@ def multivariate_ES(
     #     The function will return L, T, s and the m-step-ahead forcast(s) respectively:
 
     return pd.DataFrame(L), pd.DataFrame(T), pd.DataFrame(s), mves
+
+
+def multivariate_es_forecast(
+    data: np.ndarray, periods: int, year_size: int, alpha: float
+) -> np.ndarray:
+    """Forecasts all horizons 1..periods with multivariate Holt-Winters exponential smoothing in a single pass
+
+    Level, trend and seasonal effects do not depend on the forecast horizon m, so one pass over
+    the history yields the same forecasts as calling multivariate_ES once for every m.
+
+    Args:
+        data (np.ndarray): history with one row per time step and one column per feature
+        periods (int): number of future time steps to forecast
+        year_size (int): the number of data points in each year
+        alpha (float): smoothing constant of the level, trend and seasonality matrices
+
+    Returns:
+        np.ndarray: forecasts with one row per horizon and one column per feature
+    """
+
+    data = np.asarray(data, dtype="float64")
+    h_period, n_features = data.shape
+
+    A = B = C = np.triu(np.full((year_size, year_size), alpha))
+    I = np.identity(year_size)
+
+    L0, T0, S0 = _initialize(data, year_size)
+
+    L = np.empty((h_period, n_features))
+    T = np.empty((h_period, n_features))
+    S = np.nan_to_num(S0, nan=0.0)
+
+    L[0] = L0
+    T[0] = T0
+
+    for i in range(h_period - 1):
+        L[i + 1] = A @ (data[i + 1] - S[i % year_size]) + (I - A) @ (L[i] + T[i])
+
+        T[i + 1] = B @ (L[i + 1] - L[i]) + (I - B) @ T[i]
+
+        S[(i + 1) % year_size] = C @ (data[i + 1] - L[i + 1]) + (
+            (I - C) @ S[i % year_size]
+        )
+
+        S -= S.mean(axis=0)
+
+    horizons = np.arange(1, periods + 1)[:, np.newaxis]
+
+    return L[-1] + horizons * T[-1] + S[(h_period - 1) % year_size]
@@ -1,16 +1,28 @@
-import io
 from flask import Flask, request, jsonify, make_response
 from flask_jwt_extended import get_jwt_identity, jwt_required
 import gridfs
 import time
-import pycountry
 
 from blueprints import graph, forecast
 from auth.session import get_session
-from extensions import mongo, cache, cors, session, jwt
+from extensions import (
+    mongo,
+    cache,
+    cors,
+    session,
+    jwt,
+    dataset_cache,
+    demo_catalogue,
+    forecast_jobs,
+    forecast_pool,
+    model_cache,
+)
+from preprocessing.codec import put_dataset, put_dataset_chunks
+from preprocessing.countries import get_country_name
 from preprocessing.parse import parse_dataset
 from preprocessing.dataset import DigitalTwinTimeSeries
-from preprocessing.filter import infer_feature_options
+from preprocessing.demo import demo_datasets
+from preprocessing.filter import FeatureOptionsCollector, get_feature_options
 from preprocessing.states import germany_federal
 
 # create and configure the app
@@ -19,6 +31,17 @@ app = Flask(__name__, instance_relative_config=True)
 app.config["PROPAGATE_EXCEPTIONS"] = True
 app.config["MONGO_URI"] = "mongodb://127.0.0.1:27017/dt_society_datasets"
 app.config["JWT_SECRET_KEY"] = "super-secret"
+app.config["DATASET_CODEC"] = "arrow"
+app.config["DATASET_COMPRESSION"] = "zstd"
+app.config["DATASET_CACHE_MAX_BYTES"] = 512 * 1024**2
+app.config["UPLOAD_CHUNK_ROWS"] = 50_000
+app.config["FORECAST_POOL_PROCESSES"] = 4
+app.config["FORECAST_POOL_MAX_QUEUE"] = 16
+app.config["FORECAST_TASK_TIMEOUT"] = 120
+app.config["FORECAST_JOB_WORKERS"] = 2
+app.config["VAR_INFORMATION_CRITERION"] = "aic"
+app.config["VAR_FIT_CACHE_TIMEOUT"] = 3600
+app.config["MODEL_CACHE_MAX_BYTES"] = 256 * 1024**2
 app.config.from_mapping(SECRET_KEY="dev")
 
 app.register_blueprint(graph.bp)
@@ -26,6 +49,11 @@ app.register_blueprint(forecast.bp)
 
 session.init_app(app)
 cache.init_app(app)
+dataset_cache.init_app(app)
+demo_catalogue.init_app(app)
+forecast_pool.init_app(app)
+model_cache.init_app(app)
+forecast_jobs.init_app(app)
 mongo.init_app(app)
 cors.init_app(app)
 jwt.init_app(app)
@@ -35,16 +63,6 @@ jwt.init_app(app)
 @jwt_required()
 def get_demo_datasets():
 
-    demo_data = {
-        "Demo 0": (
-            "arbeitslosenquote_eu.tsv",
-            "https://raw.githubusercontent.com/Sultanow/dt_society/dev/app/flask/flaskr/static/demodata/arbeitslosenquote_eu.tsv",
-        ),
-        "Demo 1": (
-            "bip_europa.tsv",
-            "https://raw.githubusercontent.com/Sultanow/dt_society/dev/app/flask/flaskr/static/demodata/bip_eu.tsv",
-        ),
-    }
     if mongo.db is None:
         return ("Database not available.", 500)
 
@@ -52,27 +70,26 @@ def get_demo_datasets():
 
     bucket = gridfs.GridFS(mongo.db, session)
 
-    for key in demo_data:
-        df = DigitalTwinTimeSeries(demo_data[key][1], filename=demo_data[key][0])
-
-        if bucket.exists({"filename": demo_data[key][0]}):
-            print(f"Dataset '{demo_data[key][0]}' is already in database.")
+    for key, demo in demo_datasets.items():
+        # checked first, demos already in the session are neither read nor parsed
+        if bucket.exists({"filename": demo.filename}):
+            print(f"Dataset '{demo.filename}' is already in database.")
+            continue
 
-        else:
-            file_id = hash(demo_data[key][0] + str(time.time()))
+        df, feature_options = demo_catalogue.load(key)
 
-            buffer = io.BytesIO()
-            df.data.to_json(buffer, orient="records")
-            buffer.seek(0)
+        file_id = hash(demo.filename + str(time.time()))
 
-            bucket.put(
-                buffer,
-                filename=demo_data[key][0],
-                id=str(file_id),
-                state="original",
-            )
+        put_dataset(
+            bucket,
+            df,
+            filename=demo.filename,
+            id=str(file_id),
+            state="original",
+            featureOptions=feature_options,
+        )
 
-            print(f"Added '{demo_data[key][0]}' to database.")
+        print(f"Added '{demo.filename}' to database.")
 
     return ("", 204)
 
@@ -95,25 +112,48 @@ def upload_dataset():
 
             session = get_jwt_identity()
 
-            df = DigitalTwinTimeSeries(
-                uploaded_file.stream, filename=uploaded_file.filename
-            )
-
-            if mongo.db is not None and df is not None:
+            if mongo.db is not None:
                 bucket = gridfs.GridFS(mongo.db, session)
 
                 file_id = hash(uploaded_file.filename + str(time.time()))
 
-                buffer = io.BytesIO()
-                df.data.to_json(buffer, orient="records")
-                buffer.seek(0)
+                feature_options = FeatureOptionsCollector()
+
+                try:
+                    put_dataset_chunks(
+                        bucket,
+                        feature_options.collect(
+                            DigitalTwinTimeSeries.iter_chunks(
+                                uploaded_file.stream,
+                                filename=uploaded_file.filename,
+                                chunk_rows=app.config["UPLOAD_CHUNK_ROWS"],
+                            )
+                        ),
+                        metadata=lambda: {
+                            "featureOptions": feature_options.get_feature_options()
+                        },
+                        filename=file_name,
+                        id=str(file_id),
+                        state="original",
+                    )
+                except ValueError as e:
+                    print(f"Could not store '{uploaded_file.filename}' in chunks: {e}")
+
+                    uploaded_file.stream.seek(0)
+
+                    df = DigitalTwinTimeSeries(
+                        uploaded_file.stream, filename=uploaded_file.filename
+                    )
+
+                    put_dataset(
+                        bucket,
+                        df.data,
+                        filename=file_name,
+                        id=str(file_id),
+                        state="original",
+                        featureOptions=get_feature_options(df.data),
+                    )
 
-                bucket.put(
-                    buffer,
-                    filename=file_name,
-                    id=str(file_id),
-                    state="original",
-                )
                 print(f"Added '{uploaded_file.filename}' to database.")
 
         except Exception as e:
@@ -134,30 +174,34 @@ def get_data():
 
     selection_options = []
 
-    datasets = collection.find({})
+    # processed copies share the id of their original, every dataset is listed once
+    datasets = collection.find(
+        {"state": "original"}, {"id": 1, "filename": 1, "featureOptions": 1}
+    )
 
     for dataset in datasets:
-        df, _ = parse_dataset(
-            geo_column=None,
-            dataset_id=dataset["id"],
-            session_id=session,
-            use_preprocessed=False,
-        )
-
-        df = df.fillna(0)
+        feature_options = dataset.get("featureOptions")
+
+        if feature_options is None:
+            # datasets stored before feature options were kept as file metadata
+            df, _ = parse_dataset(
+                geo_column=None,
+                dataset_id=dataset["id"],
+                session_id=session,
+                use_preprocessed=False,
+            )
 
-        possible_features, geo_col, initialColumns = infer_feature_options(df)
+            feature_options = get_feature_options(df)
 
-        if geo_col is None:
-            geo_col = "None"
+            collection.update_one(
+                {"_id": dataset["_id"]}, {"$set": {"featureOptions": feature_options}}
+            )
 
         selection_options.append(
             {
                 "id": dataset["id"],
-                "possibleFeatures": possible_features,
-                "geoSelected": geo_col,
                 "name": dataset["filename"],
-                "initialColumns": initialColumns,
+                **feature_options,
             }
         )
 
@@ -200,6 +244,8 @@ def update_dataset():
 
     geo_column = data["geoColumn"]
 
+    dataset_cache.invalidate(session, file_id)
+
     df, _ = parse_dataset(
         geo_column=geo_column,
         dataset_id=dataset["id"],
@@ -207,16 +253,18 @@ def update_dataset():
         use_preprocessed=False,
     )
 
-    df = df.fillna(0)
+    feature_options = get_feature_options(df)
+    feature_options["geoSelected"] = geo_column
 
-    possible_features, _, initialColumns = infer_feature_options(df)
+    collection.update_one(
+        {"id": file_id, "state": "original"},
+        {"$set": {"featureOptions": feature_options}},
+    )
 
     response_data = {
         "id": dataset["id"],
-        "possibleFeatures": possible_features,
-        "geoSelected": geo_column,
         "name": data["datasetName"],
-        "initialColumns": initialColumns,
+        **feature_options,
     }
 
     return response_data
@@ -264,20 +312,24 @@ def reshape_dataset():
     if processed is not None:
         print("Updating processed state of: \n", processed)
         bucket.delete(processed["_id"])
+        version = processed.get("version", 0) + 1
     else:
         print("File does not exist")
+        version = 1
 
-    buffer = io.BytesIO()
-    df.to_json(buffer, orient="records")
-    buffer.seek(0)
-
-    bucket.put(
-        buffer,
+    put_dataset(
+        bucket,
+        df,
         filename=file_name,
         id=str(file_id),
         state="processed",
+        version=version,
     )
 
+    # drop previous versions and warm the cache with the new processed dataset
+    dataset_cache.invalidate(session, file_id, "processed")
+    dataset_cache.set((session, file_id, "processed", version), df)
+
     feature_columns = [
         feature
         for feature in df.columns.to_list()
@@ -290,17 +342,12 @@ def reshape_dataset():
     if geo_column is not None:
         countries = df[geo_column].unique().tolist()
         if set(countries).isdisjoint(germany_federal.values()):
-            countries = map(
-                lambda country: pycountry.countries.get(alpha_3=country).name, countries
-            )
             scope = "global"
         else:
-            countries = map(
-                lambda country: pycountry.subdivisions.get(code=country).name,
-                countries,
-            )
             scope = "germany"
-        response_data["countries"] = list(countries)
+        response_data["countries"] = [
+            get_country_name(country) for country in countries
+        ]
         response_data["scope"] = scope
     response_data["reshape_column"] = reshape_column
 
@@ -337,6 +384,8 @@ def remove_dataset():
 
     bucket.delete(file_to_delete_original["_id"])
 
+    dataset_cache.invalidate(session, dataset_id)
+
     print(f"Successfully removed dataset '{dataset_id}'.")
 
     return ("", 204)
@@ -0,0 +1,147 @@
+"""
+
+On-disk LRU cache for parsed datasets
+
+Entries are Arrow IPC files in a local directory, so every worker process of
+the server reads the same cache. Files are laid out as
+<session>/<dataset>/<state>/<key>.arrow to allow invalidating all entries of
+a session, a dataset or one of its states at once.
+
+"""
+
+import json
+import os
+import tempfile
+from typing import Optional, Tuple
+
+import pandas as pd
+
+from .disk_cache import DiskLRU, digest
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+
+class DatasetCache:
+    def __init__(self, app=None):
+        """
+        Cache of parsed datasets shared by all processes on this machine
+
+        Args:
+            app (Flask, optional): application to read the configuration from. Defaults to None.
+        """
+
+        self._store = DiskLRU(".arrow")
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Reads DATASET_CACHE_DIR and DATASET_CACHE_MAX_BYTES from the app config
+
+        Args:
+            app (Flask): application
+        """
+
+        self._store.configure(
+            app.config.get(
+                "DATASET_CACHE_DIR",
+                os.path.join(tempfile.gettempdir(), "dt_society_cache"),
+            ),
+            app.config.get("DATASET_CACHE_MAX_BYTES", 512 * 1024**2),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return pa is not None and self._store.enabled
+
+    def _parts(
+        self, session_id: str, dataset_id: str = None, state: str = None
+    ) -> tuple:
+        parts = (digest(session_id),)
+
+        if dataset_id is not None:
+            parts += (digest(dataset_id),)
+
+            if state is not None:
+                parts += (state,)
+
+        return parts
+
+    def _path(self, key: tuple) -> str:
+        session_id, dataset_id, state, *_ = key
+
+        return self._store.path(self._parts(session_id, dataset_id, state), key)
+
+    def get(self, key: tuple) -> Optional[Tuple[pd.DataFrame, str]]:
+        """Looks up a parsed dataset
+
+        Args:
+            key (tuple): session id, dataset id, state ("original" or "processed"),
+                followed by the remaining parameters the dataset was parsed with
+
+        Returns:
+            Optional[Tuple[pd.DataFrame, str]]: dataset, reshape column or None on a miss
+        """
+
+        if not self.enabled:
+            return None
+
+        path = self._path(key)
+
+        try:
+            table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+        except (FileNotFoundError, pa.ArrowInvalid):
+            return None
+
+        self._store.touch(path)
+
+        reshape_column = json.loads(table.schema.metadata[b"reshape_column"])
+
+        return table.to_pandas(), reshape_column
+
+    def set(self, key: tuple, df: pd.DataFrame, reshape_column: str = None):
+        """Stores a parsed dataset and evicts the least recently used entries above the size limit
+
+        Args:
+            key (tuple): session id, dataset id, state ("original" or "processed"),
+                followed by the remaining parameters the dataset was parsed with
+            df (pd.DataFrame): parsed dataset
+            reshape_column (str, optional): reshape column returned along with the dataset. Defaults to None.
+        """
+
+        if not self.enabled:
+            return
+
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+        except (pa.ArrowException, TypeError, ValueError) as e:
+            print(f"Dataset '{key[1]}' can not be cached: {e}")
+            return
+
+        table = table.replace_schema_metadata(
+            {
+                **(table.schema.metadata or {}),
+                b"reshape_column": json.dumps(reshape_column).encode("utf-8"),
+            }
+        )
+
+        def write(path: str):
+            with pa.OSFile(path, "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+
+        self._store.write(self._path(key), write)
+
+    def invalidate(self, session_id: str, dataset_id: str = None, state: str = None):
+        """Removes all entries of a session, a dataset or a state of a dataset
+
+        Args:
+            session_id (str): id of the session
+            dataset_id (str, optional): id of the dataset. Defaults to all datasets of the session.
+            state (str, optional): state of the dataset. Defaults to all states.
+        """
+
+        self._store.invalidate(*self._parts(session_id, dataset_id, state))
@@ -0,0 +1,290 @@
+"""
+
+Serialisation of datasets stored in GridFS
+
+Every stored file carries the name of its codec in the "codec" field of its
+GridFS document. Files without that field were written before codecs existed
+and contain JSON records.
+
+"""
+
+import io
+from typing import Callable, Dict, Iterable, NamedTuple
+
+import gridfs
+import pandas as pd
+from flask import current_app
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+
+DEFAULT_CODEC = "arrow"
+LEGACY_CODEC = "json"
+
+ARROW_FILE_MAGIC = b"ARROW1"
+
+# compression of the record batches of arrow files
+DEFAULT_COMPRESSION = "zstd"
+
+
+class DatasetCodec(NamedTuple):
+    encode: Callable[[pd.DataFrame], bytes]
+    decode: Callable[[bytes], pd.DataFrame]
+
+
+codecs: Dict[str, DatasetCodec] = {}
+
+
+def register_codec(
+    name: str,
+    encode: Callable[[pd.DataFrame], bytes],
+    decode: Callable[[bytes], pd.DataFrame],
+):
+    """Registers a codec under the given name
+
+    Args:
+        name (str): name of the codec, stored with every file it encodes
+        encode (Callable[[pd.DataFrame], bytes]): serialises a dataframe
+        decode (Callable[[bytes], pd.DataFrame]): restores a dataframe
+    """
+
+    codecs[name] = DatasetCodec(encode, decode)
+
+
+def _encode_json(df: pd.DataFrame) -> bytes:
+    return df.to_json(orient="records").encode("utf-8")
+
+
+def _decode_json(raw: bytes) -> pd.DataFrame:
+    return pd.read_json(io.StringIO(raw.decode("utf-8")), orient="records")
+
+
+def _arrow_write_options() -> "pa.ipc.IpcWriteOptions":
+    # compressed record batches are decompressed transparently by every reader
+    compression = current_app.config.get("DATASET_COMPRESSION", DEFAULT_COMPRESSION)
+
+    if compression is not None and not pa.Codec.is_available(compression):
+        print(f"Compression '{compression}' is not available, storing uncompressed.")
+        compression = None
+
+    return pa.ipc.IpcWriteOptions(compression=compression)
+
+
+def _encode_arrow(df: pd.DataFrame) -> bytes:
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_file(sink, table.schema, options=_arrow_write_options()) as writer:
+        writer.write_table(table)
+
+    return sink.getvalue().to_pybytes()
+
+
+def _decode_arrow(raw: bytes) -> pd.DataFrame:
+    # datasets written chunk by chunk use the IPC stream format instead of the file format
+    if raw[: len(ARROW_FILE_MAGIC)] == ARROW_FILE_MAGIC:
+        reader = pa.ipc.open_file(pa.py_buffer(raw))
+    else:
+        reader = pa.ipc.open_stream(pa.py_buffer(raw))
+
+    return reader.read_all().to_pandas()
+
+
+def _encode_parquet(df: pd.DataFrame) -> bytes:
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, index=False)
+
+    return buffer.getvalue()
+
+
+def _decode_parquet(raw: bytes) -> pd.DataFrame:
+    return pd.read_parquet(io.BytesIO(raw))
+
+
+register_codec("json", _encode_json, _decode_json)
+
+if pa is not None:
+    register_codec("arrow", _encode_arrow, _decode_arrow)
+    register_codec("parquet", _encode_parquet, _decode_parquet)
+
+
+def get_codec_name(codec: str = None) -> str:
+    """Resolves the codec to use for new files
+
+    Args:
+        codec (str, optional): explicitly requested codec. Defaults to the DATASET_CODEC setting.
+
+    Returns:
+        str: name of a registered codec
+    """
+
+    if codec is None:
+        codec = current_app.config.get("DATASET_CODEC", DEFAULT_CODEC)
+
+    if codec not in codecs:
+        print(f"Codec '{codec}' is not available, using '{LEGACY_CODEC}'.")
+        codec = LEGACY_CODEC
+
+    return codec
+
+
+def encode_dataset(df: pd.DataFrame, codec: str = None) -> tuple:
+    """Serialises a dataframe
+
+    Columns are stored by their string names and the index is dropped, like in JSON records.
+    Dataframes the codec can not represent (e.g. columns of mixed types) are stored as JSON.
+
+    Args:
+        df (pd.DataFrame): dataset
+        codec (str, optional): name of the codec. Defaults to the DATASET_CODEC setting.
+
+    Returns:
+        tuple: serialised dataset, name of the codec that was used
+    """
+
+    codec = get_codec_name(codec)
+
+    df = df.reset_index(drop=True)
+    df.columns = df.columns.map(str)
+
+    try:
+        return codecs[codec].encode(df), codec
+    except Exception as e:
+        if codec == LEGACY_CODEC:
+            raise
+
+        print(f"Could not encode dataset as '{codec}': {e}")
+
+        return codecs[LEGACY_CODEC].encode(df), LEGACY_CODEC
+
+
+def decode_dataset(raw: bytes, codec: str = None) -> pd.DataFrame:
+    """Restores a serialised dataframe
+
+    Args:
+        raw (bytes): serialised dataset
+        codec (str, optional): name of the codec. Defaults to JSON records.
+
+    Returns:
+        pd.DataFrame: dataset
+    """
+
+    return codecs[codec or LEGACY_CODEC].decode(raw)
+
+
+def put_dataset(
+    bucket: gridfs.GridFS, df: pd.DataFrame, codec: str = None, **kwargs
+) -> object:
+    """Stores a dataframe in GridFS
+
+    Args:
+        bucket (gridfs.GridFS): GridFS bucket of the session
+        df (pd.DataFrame): dataset
+        codec (str, optional): name of the codec. Defaults to the DATASET_CODEC setting.
+        **kwargs: additional fields of the file document (e.g. id, filename, state)
+
+    Returns:
+        object: _id of the new file
+    """
+
+    raw, codec = encode_dataset(df, codec)
+
+    return bucket.put(raw, codec=codec, **kwargs)
+
+
+def put_dataset_chunks(
+    bucket: gridfs.GridFS,
+    chunks: Iterable[pd.DataFrame],
+    codec: str = None,
+    metadata: Callable[[], dict] = None,
+    **kwargs,
+) -> object:
+    """Stores a dataset chunk by chunk in GridFS
+
+    With the arrow codec every chunk is written to the GridFS file as a record
+    batch of an Arrow IPC stream as soon as it arrives, so the dataset is never
+    held in memory as a whole. Other codecs can not be appended to and collect
+    all chunks first.
+
+    Args:
+        bucket (gridfs.GridFS): GridFS bucket of the session
+        chunks (Iterable[pd.DataFrame]): chunks of the dataset with the same columns
+        codec (str, optional): name of the codec. Defaults to the DATASET_CODEC setting.
+        metadata (Callable[[], dict], optional): additional fields of the file document that
+            are only known once all chunks are read, e.g. feature options collected on the way.
+            Defaults to None.
+        **kwargs: additional fields of the file document (e.g. id, filename, state)
+
+    Raises:
+        ValueError: the dataset is empty or a chunk does not match the column types of the first one
+
+    Returns:
+        object: _id of the new file
+    """
+
+    codec = get_codec_name(codec)
+
+    if codec != "arrow":
+        df = pd.concat(list(chunks), ignore_index=True)
+
+        if metadata is not None:
+            kwargs.update(metadata())
+
+        return put_dataset(bucket, df, codec, **kwargs)
+
+    grid_in = bucket.new_file(codec=codec, **kwargs)
+    writer = None
+
+    try:
+        for chunk in chunks:
+            chunk = chunk.reset_index(drop=True)
+            chunk.columns = chunk.columns.map(str)
+
+            try:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+
+                if writer is None:
+                    schema = table.schema
+                    writer = pa.ipc.new_stream(
+                        grid_in, schema, options=_arrow_write_options()
+                    )
+                else:
+                    table = table.cast(schema)
+            except pa.ArrowException as e:
+                # e.g. a column with numbers in the first chunk and text in a later one
+                raise ValueError(f"Chunk does not match the dataset: {e}") from e
+
+            writer.write_table(table)
+
+        if writer is None:
+            raise ValueError("Dataset is empty.")
+
+        writer.close()
+
+        if metadata is not None:
+            # fields set before closing are written with the file document
+            for key, value in metadata().items():
+                setattr(grid_in, key, value)
+    except BaseException:
+        grid_in.abort()
+        raise
+
+    grid_in.close()
+
+    return grid_in._id
+
+
+def read_dataset(grid_out: gridfs.GridOut) -> pd.DataFrame:
+    """Reads a dataframe from a GridFS file
+
+    Args:
+        grid_out (gridfs.GridOut): file returned by GridFS.find_one/get
+
+    Returns:
+        pd.DataFrame: dataset
+    """
+
+    return decode_dataset(grid_out.read(), getattr(grid_out, "codec", None))
@@ -0,0 +1,128 @@
+"""
+
+Decompression of uploaded and downloaded dataset files
+
+Compressed files are decompressed while they are read, so a file is never
+held in memory decompressed as a whole. The compression is recognised by the
+extension of the file name, e.g. "une_rt_q.tsv.gz".
+
+"""
+
+import bz2
+import gzip
+import io
+import urllib.request
+import zipfile
+from contextlib import ExitStack, contextmanager
+from typing import Iterator, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+COMPRESSIONS = {".gz": "gzip", ".bz2": "bz2", ".zip": "zip", ".zst": "zstd"}
+
+
+class _RawStream(io.RawIOBase):
+    # file objects that are no io.IOBase, e.g. SpooledTemporaryFile before Python 3.11
+    def __init__(self, stream):
+        self._stream = stream
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._stream.read(len(buffer))
+        buffer[: len(data)] = data
+
+        return len(data)
+
+    def seekable(self) -> bool:
+        return True
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        return self._stream.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._stream.tell()
+
+
+def split_compression(filename: str) -> Tuple[str, Optional[str]]:
+    """Separates the compression extension from a file name
+
+    Args:
+        filename (str): name of the file, e.g. "une_rt_q.tsv.gz"
+
+    Returns:
+        Tuple[str, Optional[str]]: name of the decompressed file, compression or None if it is not compressed
+    """
+
+    for extension, compression in COMPRESSIONS.items():
+        if filename.lower().endswith(extension):
+            return filename[: -len(extension)], compression
+
+    return filename, None
+
+
+@contextmanager
+def open_dataset_file(
+    filepath_or_buffer, filename: str
+) -> Iterator[Tuple[object, str]]:
+    """Opens a dataset file as binary stream, compressed files are decompressed on the fly
+
+    Args:
+        filepath_or_buffer (Union[str, io.IOBase]): path, URL or file-like object
+        filename (str): name of the file
+
+    Raises:
+        ValueError: the file is compressed with an unsupported method
+
+    Yields:
+        Iterator[Tuple[object, str]]: binary stream, name of the decompressed file
+    """
+
+    filename, compression = split_compression(filename)
+
+    with ExitStack() as stack:
+        if isinstance(filepath_or_buffer, str):
+            if filepath_or_buffer.startswith(("http://", "https://")):
+                stream = stack.enter_context(urllib.request.urlopen(filepath_or_buffer))
+            else:
+                stream = stack.enter_context(open(filepath_or_buffer, "rb"))
+        elif isinstance(filepath_or_buffer, io.IOBase):
+            stream = filepath_or_buffer
+        else:
+            stream = io.BufferedReader(_RawStream(filepath_or_buffer))
+
+        if compression == "gzip":
+            stream = stack.enter_context(gzip.GzipFile(fileobj=stream, mode="rb"))
+
+        elif compression == "bz2":
+            stream = stack.enter_context(bz2.BZ2File(stream, mode="rb"))
+
+        elif compression == "zip":
+            if not stream.seekable():
+                stream = io.BytesIO(stream.read())
+
+            archive = stack.enter_context(zipfile.ZipFile(stream))
+            members = [info for info in archive.infolist() if not info.is_dir()]
+
+            if len(members) != 1:
+                raise ValueError("Zip archives must contain exactly one dataset file.")
+
+            if not filename.endswith((".tsv", ".csv")):
+                filename = members[0].filename
+
+            stream = stack.enter_context(archive.open(members[0]))
+
+        elif compression == "zstd":
+            if zstandard is None:
+                raise ValueError("Reading .zst files requires the zstandard package.")
+
+            stream = stack.enter_context(
+                zstandard.ZstdDecompressor().stream_reader(stream, closefd=False)
+            )
+
+        yield stream, filename
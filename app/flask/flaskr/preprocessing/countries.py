@@ -0,0 +1,134 @@
+"""
+
+Look-up tables for country and subdivision codes and names
+
+Built once on import instead of querying pycountry for every value of a
+dataset or every country of a response. Names are matched case-insensitively
+like pycountry does, fuzzy matching is only used for names that are in none
+of the tables.
+
+"""
+
+from functools import lru_cache
+from typing import Optional
+
+import pycountry
+
+from .states import germany_federal
+
+# codes used by Eurostat instead of ISO 3166-1 alpha-2
+eurostat_alpha_2 = {"UK": "GB", "EL": "GR"}
+
+country_names = {
+    **{subdivision.code: subdivision.name for subdivision in pycountry.subdivisions},
+    **{country.alpha_3: country.name for country in pycountry.countries},
+}
+
+alpha_3_codes = {country.alpha_3 for country in pycountry.countries}
+
+alpha_2_to_alpha_3 = {
+    country.alpha_2: country.alpha_3 for country in pycountry.countries
+}
+alpha_2_to_alpha_3.update(
+    {
+        eurostat_code: alpha_2_to_alpha_3[alpha_2]
+        for eurostat_code, alpha_2 in eurostat_alpha_2.items()
+    }
+)
+
+
+def _index_names() -> dict:
+    names = {}
+
+    for country in pycountry.countries:
+        # official and common names must not shadow the name of another country
+        for attribute in ("official_name", "common_name", "name"):
+            name = getattr(country, attribute, None)
+            if name is not None:
+                names[name.lower()] = country.alpha_3
+
+    names.update({name.lower(): code for name, code in germany_federal.items()})
+
+    return names
+
+
+name_to_code = _index_names()
+
+
+def get_country_name(code: str) -> str:
+    """Full name of a country (ISO 3166-1 alpha-3) or subdivision (ISO 3166-2)
+
+    Args:
+        code (str): alpha-3 code of a country or code of a subdivision such as DE-BY
+
+    Returns:
+        str: name of the country or subdivision, the code itself if it is unknown
+    """
+
+    return country_names.get(code, code)
+
+
+def get_country_code(name: str) -> Optional[str]:
+    """Code of a country or german federal state by its name
+
+    Args:
+        name (str): name, official name or common name of a country or name of a german federal state
+
+    Returns:
+        Optional[str]: alpha-3 code of the country or code of the state, None if the name is unknown
+    """
+
+    return name_to_code.get(name.lower())
+
+
+def is_country(value: str) -> bool:
+    """Checks if a value is an alpha-2 or alpha-3 code or the name of a country or german federal state
+
+    Args:
+        value (str): value of a geo column candidate
+
+    Returns:
+        bool: whether the value identifies a country or not
+    """
+
+    if len(value) == 2:
+        return value.upper() in alpha_2_to_alpha_3
+    if len(value) == 3:
+        return value.upper() in alpha_3_codes
+    if len(value) > 3:
+        return value.lower() in name_to_code
+
+    return False
+
+
+@lru_cache(maxsize=1024)
+def _search_fuzzy(name: str) -> Optional[str]:
+    try:
+        return pycountry.countries.search_fuzzy(name)[0].alpha_3
+    except LookupError:
+        return None
+
+
+def resolve_country(value: str, from_iso2: bool = False) -> Optional[str]:
+    """Resolves a value of a geo column to the code of a country or german federal state
+
+    Args:
+        value (str): alpha-2 code or name of a country or name of a german federal state
+        from_iso2 (bool, optional): whether the value is an alpha-2 code. Defaults to False.
+
+    Returns:
+        Optional[str]: alpha-3 code of the country or code of the state, None if it is unknown
+    """
+
+    # names with a qualifier such as "Kosovo, under UNSCR 1244/99" are looked up without it
+    name = value.split(",")[0]
+
+    if from_iso2:
+        code = alpha_2_to_alpha_3.get(value.upper())
+    else:
+        code = get_country_code(value) or get_country_code(name)
+
+    if code is None:
+        code = _search_fuzzy(name)
+
+    return code
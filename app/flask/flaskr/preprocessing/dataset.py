@@ -1,7 +1,54 @@
+import io
+from contextlib import contextmanager
+from typing import Iterator
 import numpy as np
 import pandas as pd
-import pycountry
-from .states import germany_federal
+from .compression import open_dataset_file
+from .countries import resolve_country
+from .eurostat import (
+    is_eurostat_header,
+    iter_eurostat_tsv,
+    parse_eurostat_tsv,
+    read_text,
+)
+
+# rows per chunk when a dataset file is read in chunks
+CHUNK_ROWS = 50_000
+
+
+@contextmanager
+def _open_text(stream) -> Iterator[io.TextIOBase]:
+    text = io.TextIOWrapper(stream, encoding="utf-8")
+    try:
+        yield text
+    finally:
+        # keep the underlying file open for its owner
+        text.detach()
+
+
+def _read_chunks(path, filename: str, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    with open_dataset_file(path, filename) as (stream, filename):
+        if not filename.endswith(".tsv"):
+            with pd.read_csv(stream, sep=None, chunksize=chunk_rows) as reader:
+                yield from reader
+            return
+
+        with _open_text(stream) as text:
+            header = text.readline()
+
+            if is_eurostat_header(header):
+                yield from iter_eurostat_tsv(header, text, chunk_rows)
+                return
+
+            if text.seekable():
+                text.seek(0)
+                source = text
+            else:
+                # e.g. zstandard streams can not be rewound
+                source = io.StringIO(header + text.read())
+
+            with pd.read_table(source, chunksize=chunk_rows) as reader:
+                yield from reader
 
 
 class DigitalTwinTimeSeries:
@@ -16,7 +63,7 @@ class DigitalTwinTimeSeries:
         Preprocesses time series data for Digital Twin of Society
 
         Args:
-            path (str): path to the dataset (URL, file path or pd.Dataframe as JSON).
+            path (str): path to the dataset (URL, file path, pd.DataFrame or pd.Dataframe as JSON).
             sep (str, optional): value of separator in file. Defaults to "\t".
             geo_col (str, optional): value of the column with country data. Defaults to None.
             filename (str, optional): name of the dataset file. Defaults to None.
@@ -37,15 +84,44 @@ class DigitalTwinTimeSeries:
             pd.DataFrame: Preprocessed dataset
         """
 
-        if self.sep == "dict":
+        if isinstance(path, pd.DataFrame):
+            data = path
+
+        elif self.sep == "dict":
             data = pd.read_json(path, orient="records")
 
         else:
             if filename is not None:
-                if filename.endswith(".tsv"):
-                    data = pd.read_table(path)
-                else:
-                    data = pd.read_csv(path, sep=None)
+                with open_dataset_file(path, filename) as (stream, filename):
+                    if filename.endswith(".tsv"):
+                        text = read_text(stream)
+
+                        if is_eurostat_header(text.partition("\n")[0]):
+                            data, _ = parse_eurostat_tsv(text)
+                        else:
+                            data = pd.read_table(io.StringIO(text))
+                    else:
+                        data = pd.read_csv(stream, sep=None)
+
+        data = self._fix_columns(data)
+
+        if self.geo_col != None:
+            data = self._format_country_codes(data, self.geo_col)
+
+        data = self._drop_redundant_columns(data)
+
+        return data
+
+    @staticmethod
+    def _fix_columns(data: pd.DataFrame) -> pd.DataFrame:
+        """Splits fused columns, cleans their numerical values and drops unnamed columns
+
+        Args:
+            data (pd.DataFrame): Dataset or chunk of a dataset
+
+        Returns:
+            pd.DataFrame: Dataset with fixed columns
+        """
 
         columns = data.columns.tolist()
 
@@ -87,18 +163,49 @@ class DigitalTwinTimeSeries:
         if unnamed_cols_i:
             data = data.drop(data.columns[unnamed_cols_i], axis=1)
 
-        if self.geo_col != None:
-            data = self._format_country_codes(data)
+        return data
 
-        data = self._drop_redundant_columns(data)
+    @classmethod
+    def iter_chunks(
+        cls,
+        path: str,
+        filename: str,
+        geo_col: str = None,
+        chunk_rows: int = CHUNK_ROWS,
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Reads and preprocesses a dataset file chunk by chunk, so only one chunk
+        is held in memory at a time
 
-        return data
+        Columns that contain the same value throughout the dataset can not be
+        recognised in a single chunk and are kept, they are dropped once the
+        stored dataset is parsed.
 
-    def _format_country_codes(self, data: pd.DataFrame) -> pd.DataFrame:
+        Args:
+            path (str): file path or file-like object of the dataset
+            filename (str): name of the dataset file, compressed files end with .gz, .bz2, .zip or .zst
+            geo_col (str, optional): value of the column with country data. Defaults to None.
+            chunk_rows (int, optional): number of rows per chunk. Defaults to CHUNK_ROWS.
+
+        Yields:
+            Iterator[pd.DataFrame]: preprocessed chunks
+        """
+
+        for chunk in _read_chunks(path, filename, chunk_rows):
+            chunk = cls._fix_columns(chunk)
+
+            if geo_col != None:
+                chunk = cls._format_country_codes(chunk, geo_col)
+
+            yield chunk
+
+    @staticmethod
+    def _format_country_codes(data: pd.DataFrame, geo_col: str) -> pd.DataFrame:
         """Check for valid/invalid country codes and convert to ISO-3
 
         Args:
             data (pd.DataFrame): Dataset
+            geo_col (str): value of the column with country data
 
         Returns:
             pd.DataFrame: Dataset with adjusted country codes
@@ -106,40 +213,29 @@ class DigitalTwinTimeSeries:
 
         def get_iso3(country_id: str, from_iso2: bool):
 
-            country_id_split = country_id.split(",")[0]
-            if from_iso2:
-                country = pycountry.countries.get(alpha_2=country_id)
-            else:
-                if country_id in germany_federal.keys():
-
-                    return germany_federal[country_id]
-                else:
-                    country = pycountry.countries.get(name=country_id_split)
+            country_code = resolve_country(country_id, from_iso2=from_iso2)
 
-            if country is None:
-                try:
-                    country = pycountry.countries.search_fuzzy(country_id_split)[0]
-                except:
-                    unknown_country_code = "UNK"
-                    print(f"{country_id} is unknown")
-                    return unknown_country_code
+            if country_code is None:
+                unknown_country_code = "UNK"
+                print(f"{country_id} is unknown")
+                return unknown_country_code
 
-            return country.alpha_3
+            return country_code
 
-        assert self.geo_col in data.columns, "No 'geo' column found in dataset."
+        assert geo_col in data.columns, "No 'geo' column found in dataset."
 
-        len_counts = data[self.geo_col].map(len).value_counts()
+        len_counts = data[geo_col].map(len).value_counts()
 
         highest_unique_count = len_counts.iloc[0]
         most_occuring_len = len_counts[len_counts == highest_unique_count].index[0]
 
-        geo_ids = data[self.geo_col].unique().tolist()
+        geo_ids = data[geo_col].unique().tolist()
 
-        if (data[self.geo_col].str.isupper()).all():
+        if (data[geo_col].str.isupper()).all():
             # ISO-2 to ISO-3
             if most_occuring_len == 2:
                 # non ISO-2 lengths should be removed if they occur as well
-                data = data.drop(data[data[self.geo_col].str.len() != 2].index)
+                data = data.drop(data[data[geo_col].str.len() != 2].index)
 
                 geo_codes = {
                     geo_id: get_iso3(geo_id, from_iso2=True) for geo_id in geo_ids
@@ -149,9 +245,9 @@ class DigitalTwinTimeSeries:
                 geo_id: get_iso3(geo_id, from_iso2=False) for geo_id in geo_ids
             }
 
-        data[self.geo_col] = data[self.geo_col].replace(geo_codes)
+        data[geo_col] = data[geo_col].replace(geo_codes)
 
-        data = data[data[self.geo_col] != "UNK"]
+        data = data[data[geo_col] != "UNK"]
 
         assert not data.empty, "Column did not contain correct country codes."
 
@@ -170,7 +266,7 @@ class DigitalTwinTimeSeries:
             if len(data[column].unique()) == 1:
                 redundant_columns.append(column)
 
-        data = data.drop(columns=redundant_columns, axis=1)
+        data = data.drop(columns=redundant_columns)
 
         return data
 
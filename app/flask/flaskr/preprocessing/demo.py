@@ -0,0 +1,158 @@
+"""
+
+Catalogue of the demo datasets
+
+Demo datasets are read from the files bundled in static/demodata (or
+downloaded once if a file is missing), preprocessed once and kept as Arrow
+IPC files named after the hash of their source, so loading a demo is a
+memory-mapped read instead of downloading and parsing the TSV again.
+
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from typing import Dict, NamedTuple, Tuple
+
+import pandas as pd
+
+from .dataset import DigitalTwinTimeSeries
+from .disk_cache import write_atomic
+from .filter import get_feature_options
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+
+class DemoDataset(NamedTuple):
+    filename: str
+    path: str
+    url: str
+
+
+demo_datasets: Dict[str, DemoDataset] = {
+    "Demo 0": DemoDataset(
+        filename="arbeitslosenquote_eu.tsv",
+        path="arbeitslosenquote_eu.tsv",
+        url="https://raw.githubusercontent.com/Sultanow/dt_society/dev/app/flask/flaskr/static/demodata/arbeitslosenquote_eu.tsv",
+    ),
+    "Demo 1": DemoDataset(
+        filename="bip_europa.tsv",
+        path="bip_eu.tsv",
+        url="https://raw.githubusercontent.com/Sultanow/dt_society/dev/app/flask/flaskr/static/demodata/bip_eu.tsv",
+    ),
+}
+
+
+class DemoCatalogue:
+    def __init__(self, app=None):
+        """
+        Preprocessed demo datasets shared by all processes on this machine
+
+        Args:
+            app (Flask, optional): application to read the configuration from. Defaults to None.
+        """
+
+        self.data_dir: str = None
+        self.directory: str = None
+
+        # datasets preprocessed by this process if pyarrow is not available
+        self._datasets: Dict[str, Tuple[pd.DataFrame, dict]] = {}
+        self._digests: Dict[tuple, str] = {}
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Reads DEMO_DATA_DIR and DEMO_CACHE_DIR from the app config
+
+        Args:
+            app (Flask): application
+        """
+
+        self.data_dir = app.config.get(
+            "DEMO_DATA_DIR", os.path.join(app.root_path, "static", "demodata")
+        )
+        self.directory = app.config.get(
+            "DEMO_CACHE_DIR", os.path.join(tempfile.gettempdir(), "dt_society_demo")
+        )
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _source(self, demo: DemoDataset) -> Tuple[str, str]:
+        path = os.path.join(self.data_dir, demo.path)
+
+        try:
+            key = (path, os.stat(path).st_mtime_ns)
+        except FileNotFoundError:
+            return demo.url, hashlib.sha1(demo.url.encode("utf-8")).hexdigest()
+
+        if key not in self._digests:
+            with open(path, "rb") as file:
+                self._digests[key] = hashlib.sha1(file.read()).hexdigest()
+
+        return path, self._digests[key]
+
+    def load(self, name: str) -> Tuple[pd.DataFrame, dict]:
+        """Loads a preprocessed demo dataset, preprocessing it on first use
+
+        Args:
+            name (str): name of the demo dataset, e.g. "Demo 0"
+
+        Returns:
+            Tuple[pd.DataFrame, dict]: dataset, feature options
+        """
+
+        demo = demo_datasets[name]
+        source, digest = self._source(demo)
+
+        if pa is None:
+            if digest not in self._datasets:
+                self._datasets[digest] = self._preprocess(demo, source)
+
+            return self._datasets[digest]
+
+        path = os.path.join(self.directory, digest + ".arrow")
+
+        try:
+            table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+        except (FileNotFoundError, pa.ArrowInvalid):
+            df, feature_options = self._preprocess(demo, source)
+            self._write(path, df, feature_options)
+
+            return df, feature_options
+
+        feature_options = json.loads(table.schema.metadata[b"feature_options"])
+
+        return table.to_pandas(), feature_options
+
+    def _preprocess(self, demo: DemoDataset, source: str) -> Tuple[pd.DataFrame, dict]:
+        print(f"Preprocessing demo dataset '{demo.filename}'.")
+
+        df = DigitalTwinTimeSeries(source, filename=demo.filename).data
+
+        return df, get_feature_options(df)
+
+    def _write(self, path: str, df: pd.DataFrame, feature_options: dict):
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+        except (pa.ArrowException, TypeError, ValueError) as e:
+            print(f"Demo dataset '{path}' can not be stored: {e}")
+            return
+
+        table = table.replace_schema_metadata(
+            {
+                **(table.schema.metadata or {}),
+                b"feature_options": json.dumps(feature_options).encode("utf-8"),
+            }
+        )
+
+        def write(tmp_path: str):
+            with pa.OSFile(tmp_path, "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+
+        write_atomic(path, write)
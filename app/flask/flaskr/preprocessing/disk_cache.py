@@ -0,0 +1,165 @@
+"""
+
+Least recently used file store in a local directory
+
+Shared by the caches of parsed datasets and fitted models. Every entry is
+one file, so all worker processes of the server share the cache. Reading an
+entry updates its modification time, and the oldest entries are removed once
+the files exceed the size limit.
+
+"""
+
+import hashlib
+import os
+import shutil
+from typing import Callable
+
+
+def digest(value) -> str:
+    """Stable file name for a key
+
+    Args:
+        value: key, any value with a deterministic repr (e.g. tuples of strings and numbers)
+
+    Returns:
+        str: hex digest of the key
+    """
+
+    return hashlib.sha1(repr(value).encode("utf-8")).hexdigest()
+
+
+def write_atomic(path: str, write: Callable[[str], None]) -> bool:
+    """Writes a file through a temporary file, so readers in other processes never see partial files
+
+    Args:
+        path (str): path of the file
+        write (Callable[[str], None]): writes the content to the path it is given
+
+    Returns:
+        bool: whether the file was written
+    """
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        # e.g. the directory was invalidated concurrently
+        print(f"'{path}' could not be written: {e}")
+
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+        return False
+
+    return True
+
+
+class DiskLRU:
+    def __init__(self, suffix: str):
+        """
+        Files in a directory, evicted by least recent use above a size limit
+
+        Args:
+            suffix (str): extension of the entries, e.g. ".arrow"
+        """
+
+        self.suffix = suffix
+        self.directory: str = None
+        self.max_bytes: int = 0
+
+    def configure(self, directory: str, max_bytes: int):
+        """Sets the directory and size limit of the entries
+
+        Args:
+            directory (str): directory of the entries, created if it does not exist
+            max_bytes (int): size limit of all entries, 0 disables the cache
+        """
+
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None and self.max_bytes > 0
+
+    def path(self, parts: tuple, key) -> str:
+        """Path of an entry
+
+        Args:
+            parts (tuple): subdirectories of the entry, to invalidate groups of entries at once
+            key: key of the entry
+
+        Returns:
+            str: path of the entry
+        """
+
+        return os.path.join(self.directory, *parts, digest(key) + self.suffix)
+
+    def touch(self, path: str):
+        """Marks an entry as recently used
+
+        Args:
+            path (str): path of the entry
+        """
+
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+    def write(self, path: str, write: Callable[[str], None]):
+        """Stores an entry and evicts the least recently used entries above the size limit
+
+        Args:
+            path (str): path of the entry
+            write (Callable[[str], None]): writes the entry to the path it is given
+        """
+
+        if write_atomic(path, write):
+            self.evict()
+
+    def invalidate(self, *parts: str):
+        """Removes all entries below a subdirectory
+
+        Args:
+            *parts (str): subdirectory of the entries to remove
+        """
+
+        if self.directory is None or not parts:
+            return
+
+        shutil.rmtree(os.path.join(self.directory, *parts), ignore_errors=True)
+
+    def evict(self):
+        """Removes the least recently used entries until all entries fit the size limit"""
+
+        entries = []
+
+        for root, _, files in os.walk(self.directory):
+            for file in files:
+                if not file.endswith(self.suffix):
+                    continue
+                path = os.path.join(root, file)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total_bytes = sum(size for _, size, _ in entries)
+
+        for _, size, path in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_bytes -= size
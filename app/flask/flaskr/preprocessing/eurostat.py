@@ -0,0 +1,251 @@
+"""
+
+Reader for Eurostat TSV files
+
+Eurostat tables have a fused first column ("unit,sex,geo\\time") and one
+column per period. Every cell holds a value and its flags separated by a
+space, e.g. "12.3 p", "7.3 " or ": " for a missing value. Instead of
+stripping the flags with regular expressions cell by cell, the separating
+spaces are turned into tabs so pandas' C parser reads values and flags as
+alternating columns in a single pass.
+
+"""
+
+import io
+import itertools
+import urllib.request
+from typing import Iterable, Iterator, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+MISSING_VALUE = ":"
+FLAG_SEPARATOR = " "
+
+
+def read_text(
+    filepath_or_buffer: Union[str, io.IOBase], encoding: str = "utf-8"
+) -> str:
+    """Reads a whole file
+
+    Args:
+        filepath_or_buffer (Union[str, io.IOBase]): path, URL or file-like object
+        encoding (str, optional): encoding of the file. Defaults to "utf-8".
+
+    Returns:
+        str: content of the file
+    """
+
+    if hasattr(filepath_or_buffer, "read"):
+        content = filepath_or_buffer.read()
+    elif filepath_or_buffer.startswith(("http://", "https://")):
+        with urllib.request.urlopen(filepath_or_buffer) as response:
+            content = response.read()
+    else:
+        with open(filepath_or_buffer, "rb") as file:
+            content = file.read()
+
+    if isinstance(content, bytes):
+        content = content.decode(encoding)
+
+    return content.replace("\r\n", "\n")
+
+
+def is_eurostat_header(header: str) -> bool:
+    """Checks if the header line of a TSV file has the fused dimension column of Eurostat tables
+
+    Args:
+        header (str): first line of the file
+
+    Returns:
+        bool: whether the file is a Eurostat table or not
+    """
+
+    return "," in header.split("\t", 1)[0]
+
+
+def parse_eurostat_tsv(
+    text: str, keep_flags: bool = False, dtype: np.dtype = np.float64
+) -> Tuple[pd.DataFrame, Optional[pd.Series]]:
+    """
+    Parses a Eurostat table into one column per dimension followed by one
+    numerical column per period, missing values (":") are set to 0
+
+    Args:
+        text (str): content of the TSV file
+        keep_flags (bool, optional): whether to return the flags of the values. Defaults to False.
+        dtype (np.dtype, optional): type of the values. Defaults to np.float64.
+
+    Returns:
+        Tuple[pd.DataFrame, Optional[pd.Series]]: dataset, categorical flags of all flagged
+            values indexed by row and period if keep_flags is set
+    """
+
+    header, _, body = text.partition("\n")
+
+    header_cells = header.split("\t")
+    dimensions = header_cells[0].split(",")
+    periods = header_cells[1:]
+
+    try:
+        keys, values, flags = _parse_cells_fast(body, len(periods), keep_flags)
+    except (pd.errors.ParserError, ValueError):
+        # keys or cells with spaces of their own
+        keys, values, flags = _parse_cells(body, len(periods), keep_flags)
+
+    data = keys.str.split(",", expand=True)
+    data.columns = dimensions
+
+    values = values.astype(dtype)
+    values.columns = periods
+    data = pd.concat([data, values], axis=1)
+
+    if not keep_flags:
+        return data, None
+
+    flags.columns = periods
+    flags = flags.stack()
+    flags = flags[flags != ""].astype("category")
+
+    return data, flags
+
+
+def _parse_cells_fast(
+    body: str, n_periods: int, keep_flags: bool
+) -> Tuple[pd.Series, pd.DataFrame, Optional[pd.DataFrame]]:
+    # every cell needs exactly one separator, which is then used as column delimiter
+    lines = body.split("\n")
+
+    for i, line in enumerate(lines):
+        if FLAG_SEPARATOR in line.partition("\t")[0]:
+            raise ValueError("Dimension key with a flag separator.")
+
+        if line.count(FLAG_SEPARATOR) != line.count("\t"):
+            lines[i] = _add_missing_separators(line)
+
+    body = "\n".join(lines)
+
+    # missing values are set to 0, cells missing at the end of short lines stay NaN
+    body = body.replace("\t" + MISSING_VALUE + FLAG_SEPARATOR, "\t0" + FLAG_SEPARATOR)
+    body = body.replace(FLAG_SEPARATOR, "\t")
+
+    value_columns = list(range(1, 2 * n_periods + 1, 2))
+    flag_columns = list(range(2, 2 * n_periods + 2, 2))
+
+    cells = pd.read_csv(
+        io.StringIO(body),
+        sep="\t",
+        header=None,
+        names=range(2 * n_periods + 1),
+        usecols=None if keep_flags else [0] + value_columns,
+        dtype={0: str, **{column: str for column in flag_columns}},
+        keep_default_na=False,
+        na_values={column: [""] for column in value_columns},
+    )
+
+    values = cells[value_columns]
+
+    if not all(pd.api.types.is_numeric_dtype(dtype) for dtype in values.dtypes):
+        values = values.apply(pd.to_numeric, errors="coerce")
+
+    return (
+        cells[0],
+        values.set_axis(range(n_periods), axis=1),
+        cells[flag_columns].fillna("") if keep_flags else None,
+    )
+
+
+def _add_missing_separators(line: str) -> str:
+    key, *cells = line.split("\t")
+
+    cells = [
+        cell if FLAG_SEPARATOR in cell else cell + FLAG_SEPARATOR for cell in cells
+    ]
+    line = "\t".join([key, *cells])
+
+    if line.count(FLAG_SEPARATOR) != line.count("\t"):
+        raise ValueError("Cells with more than one flag separator.")
+
+    return line
+
+
+def _parse_cells(
+    body: str, n_periods: int, keep_flags: bool
+) -> Tuple[pd.Series, pd.DataFrame, Optional[pd.DataFrame]]:
+    cells = pd.read_csv(
+        io.StringIO(body),
+        sep="\t",
+        header=None,
+        names=range(n_periods + 1),
+        dtype=str,
+        keep_default_na=False,
+    )
+
+    values = {}
+    flags = {}
+
+    for column in range(1, n_periods + 1):
+        value_and_flag = cells[column].str.strip().str.partition(FLAG_SEPARATOR)
+        value = value_and_flag[0].str.rstrip("abcdefghijklmnopqrstuvwxyz")
+        values[column - 1] = pd.to_numeric(
+            value.replace(MISSING_VALUE, "0"), errors="coerce"
+        )
+        flags[column - 1] = value_and_flag[2].str.strip()
+
+    return (
+        cells[0],
+        pd.DataFrame(values),
+        pd.DataFrame(flags) if keep_flags else None,
+    )
+
+
+def read_eurostat_tsv(
+    filepath_or_buffer: Union[str, io.IOBase],
+    keep_flags: bool = False,
+    dtype: np.dtype = np.float64,
+    encoding: str = "utf-8",
+) -> Tuple[pd.DataFrame, Optional[pd.Series]]:
+    """Reads a Eurostat table, see parse_eurostat_tsv
+
+    Args:
+        filepath_or_buffer (Union[str, io.IOBase]): path, URL or file-like object
+        keep_flags (bool, optional): whether to return the flags of the values. Defaults to False.
+        dtype (np.dtype, optional): type of the values. Defaults to np.float64.
+        encoding (str, optional): encoding of the file. Defaults to "utf-8".
+
+    Returns:
+        Tuple[pd.DataFrame, Optional[pd.Series]]: dataset, flags of all flagged values if keep_flags is set
+    """
+
+    return parse_eurostat_tsv(
+        read_text(filepath_or_buffer, encoding), keep_flags=keep_flags, dtype=dtype
+    )
+
+
+def iter_eurostat_tsv(
+    header: str, lines: Iterable[str], chunk_rows: int, dtype: np.dtype = np.float64
+) -> Iterator[pd.DataFrame]:
+    """Parses a Eurostat table in chunks of lines, see parse_eurostat_tsv
+
+    Args:
+        header (str): first line of the file
+        lines (Iterable[str]): remaining lines of the file, e.g. an open text file
+        chunk_rows (int): number of lines per chunk
+        dtype (np.dtype, optional): type of the values. Defaults to np.float64.
+
+    Yields:
+        Iterator[pd.DataFrame]: parsed chunks
+    """
+
+    lines = iter(lines)
+    header = header.rstrip("\r\n") + "\n"
+
+    while True:
+        chunk = list(itertools.islice(lines, chunk_rows))
+
+        if not chunk:
+            return
+
+        data, _ = parse_eurostat_tsv(header + "".join(chunk), dtype=dtype)
+
+        yield data
@@ -1,82 +1,156 @@
-from dateutil import parser
+from functools import lru_cache
+import numpy as np
 import pandas as pd
-import pycountry
-from .states import germany_federal
-from typing import List, Tuple
+from . import countries
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional, Tuple
 
+# pandas >= 2.0 infers one format from the first value and coerces every value
+# that does not match it, "mixed" restores parsing each value on its own
+_MIXED_FORMAT = {"format": "mixed"} if int(pd.__version__.split(".")[0]) >= 2 else {}
 
-def find_geo_column(dataframe: pd.DataFrame, column: str)-> bool:
+# share of country values from which a column is considered the geo column
+GEO_MATCH_RATIO = 0.6
+
+# maximum number of unique values of a categorical feature column
+MAX_CATEGORIES = 15
+
+
+def find_geo_column(dataframe: pd.DataFrame, column: str) -> bool:
     """
-    Checks a column for country information 
+    Checks a column for country information
     (ISO-3, ISO-2, english country names or german federal states)
 
     Args:
         dataframe (pd.DataFrame): dataset
         column (str): selected column to check in
-        
+
     Returns:
         bool: whether the column has country information or not
     """
 
-    negative_matches = 0
-
-    for value in dataframe[column].sample(n=10):
-        print(value)
-        if isinstance(value, str):
-            if len(value) == 2:
-                is_country = pycountry.countries.get(alpha_2=value) != None
-            elif len(value) == 3:
-                is_country = pycountry.countries.get(alpha_3=value) != None
-            elif len(value) > 3:
-                is_country = (
-                    pycountry.countries.get(name=value) != None
-                    or value in germany_federal
-                )
-            elif len(value) < 2:
-                is_country = False
-                
-            if is_country is False:
-                negative_matches += 1
-
-                
-        else:
-            negative_matches += 1
-            
-        if negative_matches > 4:
-                    return False
-                    
-                
+    return _is_geo_column(column, dataframe[column].value_counts(dropna=False))
+
+
+def _is_geo_column(column: str, counts: pd.Series) -> bool:
+    return _is_geo_match(column, _count_country_values(counts), int(counts.sum()))
+
+
+def _count_country_values(counts: pd.Series) -> int:
+    # every distinct value is only looked up once, weighted by how often it occurs
+    return sum(
+        count
+        for value, count in counts.items()
+        if isinstance(value, str) and countries.is_country(value)
+    )
+
+
+def _is_geo_match(column: str, country_values: int, n_values: int) -> bool:
+    if n_values == 0 or country_values < GEO_MATCH_RATIO * n_values:
+        return False
+
     print(f"{column} is geo column")
 
     return True
 
 
-def is_datetime(value: str)-> bool:
-    """Checks if a string has a datetime format
+def is_datetime(values: pd.Series) -> np.ndarray:
+    """Checks which values of a series are strings in a datetime format
 
     Args:
-        value (str): value
+        values (pd.Series): values
 
     Returns:
-        bool: whether the value is datetime or not
+        np.ndarray: whether each value is datetime or not
     """
 
-    try:
-        is_date = bool(parser.parse(value))
-        print(f"{value} has dates")
-    except:
-        is_date = False
+    is_string = (values.map(type) == str).to_numpy()
+
+    is_date = np.zeros(len(values), dtype=bool)
+
+    if not is_string.any():
+        return is_date
+
+    parsed = pd.to_datetime(
+        values[is_string], errors="coerce", utc=True, **_MIXED_FORMAT
+    )
+
+    is_date[is_string] = parsed.notna().to_numpy()
 
     return is_date
 
 
+@lru_cache(maxsize=128)
+def _headers_are_datetime(columns: Tuple[str]) -> Tuple[bool]:
+    # all headers are parsed at once, datasets are classified again on every update
+    return tuple(is_datetime(pd.Series(columns, dtype=object)))
+
+
+class _ColumnSummary(NamedTuple):
+    # values that are country names or codes, number of values
+    country_values: int
+    n_values: int
+    # distinct values in order of appearance, None if there are more than MAX_CATEGORIES
+    categories: Optional[list]
+
+
+def _select_features(
+    columns: List[str],
+    is_float: List[bool],
+    first_row: Optional[list],
+    summarize: Callable[[int], _ColumnSummary],
+) -> Tuple[List[str], str, List[str]]:
+    geo_col = None
+    feature_candidates = []
+
+    # find candidates for feature indicators in columns
+    date_in_column = _headers_are_datetime(tuple(columns))
+
+    # find candidates for feature indicators in rows
+    row_columns = [
+        i
+        for i, (is_date, is_float_column) in enumerate(zip(date_in_column, is_float))
+        if not is_date and not is_float_column
+    ]
+
+    if first_row is not None:
+        date_in_row = is_datetime(
+            pd.Series([first_row[i] for i in row_columns], dtype=object)
+        )
+    else:
+        date_in_row = np.zeros(len(row_columns), dtype=bool)
+
+    row_columns = {i for i, is_date in zip(row_columns, date_in_row) if not is_date}
+
+    for i, feature in enumerate(columns):
+        if date_in_column[i]:
+            continue
+
+        feature_candidates.append(feature)
+
+        if i not in row_columns:
+            continue
+
+        summary = summarize(i)
+
+        if _is_geo_match(feature, summary.country_values, summary.n_values):
+            geo_col = feature
+
+        if summary.categories is not None:
+            feature_candidates.extend(summary.categories)
+
+    if geo_col in feature_candidates:
+        feature_candidates.remove(geo_col)
+
+    return feature_candidates, geo_col, columns
+
+
 def infer_feature_options(dataframe: pd.DataFrame) -> Tuple[List[str], str, List[str]]:
     """
     Infer possible options for selectable features and column with geo data
-    
+
     Features in columns:
     - can not be datetime or float
-    
+
     Features in rows:
     - can not be datetime or float
     - for integers and strings, unique count must be less than 15 to be considered a categorical feature
@@ -87,50 +161,201 @@ def infer_feature_options(dataframe: pd.DataFrame) -> Tuple[List[str], str, List
     Returns:
         Tuple[List[str], str]: list of selectable features, column with geo data
     """
-    
-    columns = dataframe.columns.to_list()
-    columns = [c.strip() for c in columns]
-    geo_col = None
-    feature_candidates = []
-    
-    for feature in columns:
-        # find candidates for feature indidicators in columns
-        date_in_column = is_datetime(feature)
-
-        if not date_in_column:
-            feature_candidates.append(feature)
-        else:
-            continue
 
-        # find candidates for feature indidicators in rows
-        if dataframe[feature].dtype not in (
-            "float64",
-            "float",
-            "float32",
-        ):
+    columns = [c.strip() for c in dataframe.columns.to_list()]
+    is_float = [pd.api.types.is_float_dtype(dtype) for dtype in dataframe.dtypes]
 
-            print(f"{feature} has no floats")
-            date_in_row = is_datetime(dataframe[feature][0])
+    first_row = None
 
-            if not date_in_row:
-                is_geo_column = find_geo_column(dataframe, feature)
+    if len(dataframe) > 0:
+        first_row = [dataframe.iat[0, i] for i in range(len(columns))]
 
-                if is_geo_column is True:
-                    geo_col = feature
+    def summarize(i: int) -> _ColumnSummary:
+        values = dataframe.iloc[:, i]
+        counts = values.value_counts(dropna=False)
 
-                # if feature == geo_col:
-                #     continue
+        return _ColumnSummary(
+            _count_country_values(counts),
+            len(values),
+            values.unique().tolist() if len(counts) <= MAX_CATEGORIES else None,
+        )
 
-                features_in_rows = dataframe[feature].unique().tolist()
+    return _select_features(columns, is_float, first_row, summarize)
 
-                if len(features_in_rows) <= 15:
-                    feature_candidates.extend(features_in_rows)
-        else:
-            print(f"{feature} has floats")
-            
-    if geo_col in feature_candidates:
-                feature_candidates.remove(geo_col)
-                
-    return feature_candidates, geo_col, columns
-            
-    
\ No newline at end of file
+
+def _format_feature_options(
+    possible_features: List[str], geo_col: str, initial_columns: List[str]
+) -> dict:
+    return {
+        "possibleFeatures": possible_features,
+        "geoSelected": geo_col if geo_col is not None else "None",
+        "initialColumns": initial_columns,
+    }
+
+
+def get_feature_options(dataframe: pd.DataFrame) -> dict:
+    """
+    Infer feature options of a dataset in the format stored with its GridFS file
+    and returned by the /data/ endpoints
+
+    Args:
+        dataframe (pd.DataFrame): dataset
+
+    Returns:
+        dict: possibleFeatures, geoSelected ("None" if no geo column was found), initialColumns
+    """
+
+    return _format_feature_options(*infer_feature_options(dataframe.fillna(0)))
+
+
+# states of a column in FeatureOptionsCollector._constant besides its single value
+_NO_VALUE = object()
+_VARYING = object()
+
+
+class FeatureOptionsCollector:
+    def __init__(self):
+        """
+        Infers the feature options of a dataset from its chunks, with the same result
+        as get_feature_options on the parsed dataset
+
+        Only a summary of every column is kept, so memory does not grow with the
+        number of rows: the header, the first row, the types of every column, counts
+        of its values and country values and up to MAX_CATEGORIES distinct values.
+        """
+
+        self._columns: List[str] = None
+        self._first_row: Optional[list] = None
+        # a column is float like in the whole dataset if it has floats but no text
+        self._has_float: List[bool] = []
+        self._has_text: List[bool] = []
+        self._country_values: List[int] = []
+        self._n_values: List[int] = []
+        self._categories: List[Optional[dict]] = []
+        # parsing drops columns with a single value, see DigitalTwinTimeSeries._drop_redundant_columns
+        self._constant: list = []
+
+    def collect(self, chunks: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        """Passes chunks through and summarises them, e.g. on their way into put_dataset_chunks
+
+        Args:
+            chunks (Iterable[pd.DataFrame]): chunks of the dataset with the same columns
+
+        Yields:
+            Iterator[pd.DataFrame]: the same chunks
+        """
+
+        for chunk in chunks:
+            self.update(chunk)
+            yield chunk
+
+    def update(self, chunk: pd.DataFrame):
+        """Adds a chunk to the summary
+
+        Args:
+            chunk (pd.DataFrame): chunk of the dataset
+        """
+
+        if self._columns is None:
+            self._columns = chunk.columns.to_list()
+
+            n_columns = len(self._columns)
+            self._has_float = [False] * n_columns
+            self._has_text = [False] * n_columns
+            self._country_values = [0] * n_columns
+            self._n_values = [0] * n_columns
+            self._categories = [{} for _ in range(n_columns)]
+            self._constant = [_NO_VALUE] * n_columns
+
+        if len(chunk) == 0:
+            return
+
+        # as get_feature_options passes the dataset
+        filled = chunk.fillna(0)
+
+        if self._first_row is None:
+            self._first_row = [filled.iat[0, i] for i in range(len(self._columns))]
+
+        for i in range(len(self._columns)):
+            column = chunk.iloc[:, i]
+            self._update_constant(i, column.unique())
+            self._n_values[i] += len(column)
+
+            if column.isna().all():
+                # e.g. a sparse column, read as floats whatever the type of its other values,
+                # the dataset holds them as missing values of its column
+                self._has_float[i] = True
+                self._add_categories(i, [0])
+                continue
+
+            values = filled.iloc[:, i]
+
+            if pd.api.types.is_float_dtype(column.dtype):
+                self._has_float[i] = True
+            elif not pd.api.types.is_numeric_dtype(column.dtype):
+                self._has_text[i] = True
+                counts = values.value_counts(dropna=False)
+                self._country_values[i] += _count_country_values(counts)
+
+            self._add_categories(i, values.unique().tolist())
+
+    def _add_categories(self, i: int, values: list):
+        categories = self._categories[i]
+
+        if categories is None:
+            return
+
+        categories.update(dict.fromkeys(values))
+
+        if len(categories) > MAX_CATEGORIES:
+            self._categories[i] = None
+
+    def _update_constant(self, i: int, distinct: np.ndarray):
+        value = self._constant[i]
+
+        if value is _VARYING or len(distinct) == 0:
+            return
+
+        if len(distinct) > 1:
+            self._constant[i] = _VARYING
+        elif value is _NO_VALUE:
+            self._constant[i] = distinct[0]
+        elif not (value == distinct[0] or (pd.isna(value) and pd.isna(distinct[0]))):
+            self._constant[i] = _VARYING
+
+    def get_feature_options(self) -> dict:
+        """Feature options of all chunks added so far, see get_feature_options
+
+        Returns:
+            dict: possibleFeatures, geoSelected ("None" if no geo column was found), initialColumns
+        """
+
+        kept = [
+            i
+            for i, value in enumerate(self._constant)
+            if value is _VARYING or value is _NO_VALUE
+        ]
+
+        first_row = None
+
+        if self._first_row is not None:
+            first_row = [self._first_row[i] for i in kept]
+
+        def summarize(j: int) -> _ColumnSummary:
+            i = kept[j]
+            categories = self._categories[i]
+
+            return _ColumnSummary(
+                self._country_values[i],
+                self._n_values[i],
+                list(categories) if categories is not None else None,
+            )
+
+        return _format_feature_options(
+            *_select_features(
+                [self._columns[i].strip() for i in kept],
+                [self._has_float[i] and not self._has_text[i] for i in kept],
+                first_row,
+                summarize,
+            )
+        )
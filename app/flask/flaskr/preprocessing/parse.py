@@ -3,11 +3,11 @@ from typing import Tuple
 import gridfs
 import pandas as pd
 
+from .codec import read_dataset
 from .dataset import DigitalTwinTimeSeries
-from extensions import cache, mongo
+from extensions import cache, dataset_cache, mongo
 
 
-@cache.memoize(timeout=90)
 def parse_dataset(
     geo_column: str,
     dataset_id: str,
@@ -31,20 +31,82 @@ def parse_dataset(
         Tuple[pd.DataFrame, str]: Processed dataset, value of inferred reshape column
     """
 
+    if use_preprocessed:
+        key = (
+            session_id,
+            dataset_id,
+            "processed",
+            get_processed_version(session_id, dataset_id),
+        )
+    else:
+        key = (
+            session_id,
+            dataset_id,
+            "original",
+            geo_column,
+            reshape_column,
+            selected_feature if reshape_column is None else None,
+        )
+
+    cached = dataset_cache.get(key)
+
+    if cached is not None:
+        return cached
+
+    df, reshape_column = _parse_dataset(
+        geo_column,
+        dataset_id,
+        session_id,
+        use_preprocessed,
+        reshape_column,
+        selected_feature,
+    )
+
+    dataset_cache.set(key, df, reshape_column)
+
+    return df, reshape_column
+
+
+def get_processed_version(session_id: str, dataset_id: str) -> int:
+    """
+    Version of the processed state of a dataset, incremented on every reshape
+
+    Args:
+        session_id (str): id of the session
+        dataset_id (str): id of dataset in database
+
+    Returns:
+        int: version of the processed dataset (0 if it has never been versioned)
+    """
+
+    processed = mongo.db[session_id + ".files"].find_one(
+        {"id": dataset_id, "state": "processed"}, {"version": 1}
+    )
+
+    if processed is None:
+        return 0
+
+    return processed.get("version", 0)
+
+
+def _parse_dataset(
+    geo_column: str,
+    dataset_id: str,
+    session_id: str,
+    use_preprocessed: bool,
+    reshape_column: str,
+    selected_feature: str,
+) -> Tuple[pd.DataFrame, str]:
+
     bucket = gridfs.GridFS(mongo.db, session_id)
 
     if use_preprocessed:
         selected_df = bucket.find_one({"id": dataset_id, "state": "processed"})
-        return (
-            pd.read_json(selected_df.read().decode("utf-8"), orient="records"),
-            None,
-        )
+        return read_dataset(selected_df), None
 
     else:
-        selected_df = (
+        selected_df = read_dataset(
             bucket.find_one({"id": dataset_id, "state": "original"})
-            .read()
-            .decode("utf-8")
         )
 
     df = DigitalTwinTimeSeries(selected_df, geo_col=geo_column, sep="dict")
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# modules of the app are imported relative to flaskr, like main.py does
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "flaskr"))
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+from statsmodels.tsa.api import VAR
+from statsmodels.tsa.stattools import adfuller
+
+from forecasting.batched import (
+    VarFit,
+    adf_pvalues,
+    fit_var,
+    forecast_var,
+    max_var_order,
+    select_var_order,
+)
+
+SHORT_PANELS = [(10, 3), (12, 4), (14, 3), (15, 3), (20, 5), (40, 2)]
+
+
+@pytest.mark.parametrize("n_steps, n_features", SHORT_PANELS)
+def test_max_var_order_matches_statsmodels(n_steps, n_features):
+    series = np.random.default_rng(0).normal(size=(n_steps, n_features))
+    max_order = max_var_order(100, n_steps, n_features)
+
+    VAR(series).select_order(maxlags=max_order)
+
+    if max_order > 1:
+        with pytest.raises(ValueError, match="maxlags is too large"):
+            VAR(series).select_order(maxlags=max_order + 1)
+
+
+@pytest.mark.parametrize("ic", ["aic", "bic"])
+@pytest.mark.parametrize("n_steps, n_features", SHORT_PANELS)
+def test_select_var_order_matches_statsmodels(n_steps, n_features, ic):
+    rng = np.random.default_rng(n_steps * n_features)
+    diff = rng.normal(size=(8, n_steps, n_features))
+
+    orders = select_var_order(diff, 5, ic)
+    max_order = max_var_order(5, n_steps, n_features)
+
+    for country, order in zip(diff, orders):
+        # order 0 is not a candidate here, the models always have at least one lag
+        ics = VAR(country).select_order(maxlags=max_order).ics[ic][1:]
+
+        assert np.isfinite(ics).all()
+        assert order == np.argmin(ics) + 1
+
+
+def test_select_var_order_does_not_pick_singular_order():
+    # 15 annual steps differenced once, 3 features and maxLags=5 as sent by the map
+    diff = np.random.default_rng(1).normal(size=(20, 14, 3))
+
+    assert select_var_order(diff, 5).max() <= 2
+
+
+@pytest.mark.filterwarnings("ignore:adfuller:FutureWarning")
+@pytest.mark.parametrize("nobs", [8, 10, 14, 20, 40, 120])
+def test_adf_pvalues_match_adfuller(nobs):
+    rng = np.random.default_rng(nobs)
+    # stationary noise, random walks and trending series
+    series = np.concatenate(
+        [
+            rng.normal(size=(4, nobs)),
+            rng.normal(size=(4, nobs)).cumsum(axis=1),
+            rng.normal(size=(4, nobs)) + np.linspace(0, 5, nobs),
+        ]
+    )
+
+    np.testing.assert_allclose(
+        adf_pvalues(series), [adfuller(x)[1] for x in series], rtol=1e-6, atol=1e-10
+    )
+
+
+def test_adf_pvalues_reject_constant_series():
+    with pytest.raises(ValueError):
+        adf_pvalues(np.ones((2, 20)))
+
+
+@pytest.mark.parametrize("n_steps, n_features", SHORT_PANELS)
+def test_fit_and_forecast_var_match_statsmodels(n_steps, n_features):
+    rng = np.random.default_rng(n_steps + n_features)
+    diff = rng.normal(size=(6, n_steps, n_features))
+    max_order = max_var_order(5, n_steps, n_features)
+    orders = np.arange(6) % max_order + 1
+
+    for country, order, params in zip(diff, orders, fit_var(diff, orders)):
+        results = VAR(country).fit(order)
+
+        np.testing.assert_allclose(params, results.params, rtol=1e-6, atol=1e-8)
+        np.testing.assert_allclose(
+            forecast_var(country, VarFit(order, params, None), 4),
+            results.forecast(country[-order:], 4),
+            rtol=1e-6,
+            atol=1e-8,
+        )
@@ -0,0 +1,289 @@
+import gzip
+import io
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from flask import Flask
+
+from preprocessing.codec import (
+    decode_dataset,
+    encode_dataset,
+    put_dataset,
+    put_dataset_chunks,
+    read_dataset,
+)
+from preprocessing.dataset import DigitalTwinTimeSeries
+from preprocessing.eurostat import parse_eurostat_tsv
+from preprocessing.filter import FeatureOptionsCollector, get_feature_options
+
+pa = pytest.importorskip("pyarrow")
+
+DEMO_DIR = os.path.join(os.path.dirname(__file__), "..", "flaskr", "static", "demodata")
+
+
+class GridFile(io.BytesIO):
+    # the parts of GridIn and GridOut the codec uses
+    ATTRIBUTES = ("bucket", "fields", "_id", "aborted")
+
+    def __init__(self, bucket, **fields):
+        super().__init__()
+        self.bucket = bucket
+        self.fields = fields
+        self._id = len(bucket.files)
+        self.aborted = False
+
+    def __getattr__(self, name):
+        try:
+            return self.fields[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __setattr__(self, name, value):
+        # like GridIn, other attributes are fields of the file document
+        if name in self.ATTRIBUTES:
+            super().__setattr__(name, value)
+        else:
+            self.fields[name] = value
+
+    def abort(self):
+        self.aborted = True
+
+    def close(self):
+        if not self.closed and not self.aborted:
+            self.bucket.files.append((self.fields, self.getvalue()))
+        super().close()
+
+
+class Bucket:
+    # in-memory replacement of the GridFS bucket of a session
+    def __init__(self):
+        self.files = []
+
+    def new_file(self, **fields) -> GridFile:
+        return GridFile(self, **fields)
+
+    def put(self, data: bytes, **fields):
+        grid_in = self.new_file(**fields)
+        grid_in.write(data)
+        grid_in.close()
+
+        return grid_in._id
+
+    def find_one(self, query: dict) -> GridFile:
+        for fields, data in self.files:
+            if all(fields.get(key) == value for key, value in query.items()):
+                grid_out = GridFile(self, **fields)
+                grid_out.write(data)
+                grid_out.seek(0)
+                return grid_out
+
+
+@pytest.fixture(autouse=True)
+def app_context():
+    app = Flask(__name__)
+    app.config["DATASET_CODEC"] = "arrow"
+
+    with app.app_context():
+        yield app
+
+
+@pytest.fixture
+def dataset() -> pd.DataFrame:
+    with open(os.path.join(DEMO_DIR, "bip_eu.tsv"), encoding="utf-8") as file:
+        df, _ = parse_eurostat_tsv(file.read())
+
+    return df
+
+
+@pytest.mark.parametrize("codec", ["json", "arrow", "parquet"])
+def test_codecs_round_trip(dataset, codec):
+    raw, used_codec = encode_dataset(dataset, codec)
+
+    assert used_codec == codec
+    pd.testing.assert_frame_equal(
+        decode_dataset(raw, codec), dataset, check_dtype=False
+    )
+
+
+@pytest.mark.parametrize("compression", ["zstd", "lz4", None])
+def test_arrow_matches_legacy_json(app_context, dataset, compression):
+    app_context.config["DATASET_COMPRESSION"] = compression
+
+    arrow = decode_dataset(*encode_dataset(dataset, "arrow"))
+    legacy = decode_dataset(encode_dataset(dataset, "json")[0])
+
+    pd.testing.assert_frame_equal(arrow, legacy, check_dtype=False)
+
+
+def test_unencodable_dataset_falls_back_to_json():
+    df = pd.DataFrame({"mixed": [1, "a", 2.5], 2020: [1.0, 2.0, 3.0]})
+
+    raw, codec = encode_dataset(df, "arrow")
+
+    assert codec == "json"
+    assert decode_dataset(raw, codec).columns.tolist() == ["mixed", "2020"]
+
+
+def test_stored_dataset_round_trip(dataset):
+    bucket = Bucket()
+
+    put_dataset(bucket, dataset, id="1", state="original")
+    stored = bucket.find_one({"id": "1"})
+
+    assert stored.codec == "arrow"
+    pd.testing.assert_frame_equal(read_dataset(stored), dataset, check_dtype=False)
+
+
+def test_files_without_codec_are_read_as_json(dataset):
+    bucket = Bucket()
+    bucket.put(dataset.to_json(orient="records").encode("utf-8"), id="1")
+
+    pd.testing.assert_frame_equal(
+        read_dataset(bucket.find_one({"id": "1"})), dataset, check_dtype=False
+    )
+
+
+def _upload(filename: str, compress: bool = False):
+    with open(os.path.join(DEMO_DIR, filename), "rb") as file:
+        content = file.read()
+
+    if compress:
+        return io.BytesIO(gzip.compress(content)), filename + ".gz"
+
+    return io.BytesIO(content), filename
+
+
+@pytest.mark.parametrize("compress", [False, True])
+@pytest.mark.parametrize("filename", ["bip_eu.tsv", "arbeitslosenquote_eu.tsv"])
+def test_chunked_upload_matches_whole_file(filename, compress):
+    bucket = Bucket()
+    stream, upload_name = _upload(filename, compress)
+
+    put_dataset_chunks(
+        bucket,
+        DigitalTwinTimeSeries.iter_chunks(stream, upload_name, chunk_rows=7),
+        id="1",
+        state="original",
+    )
+
+    with open(os.path.join(DEMO_DIR, filename), encoding="utf-8") as file:
+        expected, _ = parse_eurostat_tsv(file.read())
+
+    stored = bucket.find_one({"id": "1", "state": "original"})
+
+    assert stored.codec == "arrow"
+    pd.testing.assert_frame_equal(read_dataset(stored), expected, check_dtype=False)
+
+
+def test_chunked_upload_with_other_codec_matches_put_dataset(dataset):
+    chunks = [dataset.iloc[i : i + 10] for i in range(0, len(dataset), 10)]
+
+    chunked, whole = Bucket(), Bucket()
+    put_dataset_chunks(chunked, chunks, codec="parquet", id="1")
+    put_dataset(whole, dataset, codec="parquet", id="1")
+
+    pd.testing.assert_frame_equal(
+        read_dataset(chunked.find_one({"id": "1"})),
+        read_dataset(whole.find_one({"id": "1"})),
+    )
+
+
+def test_mismatching_chunk_aborts_the_file():
+    bucket = Bucket()
+    chunks = [
+        pd.DataFrame({"geo": ["DE"], "2020": [1.0]}),
+        pd.DataFrame({"geo": ["FR"], "2020": ["n/a"]}),
+    ]
+
+    with pytest.raises(ValueError):
+        put_dataset_chunks(bucket, chunks, id="1")
+
+    assert bucket.files == []
+
+
+def test_empty_upload_is_rejected():
+    with pytest.raises(ValueError):
+        put_dataset_chunks(Bucket(), iter([]), id="1")
+
+
+def test_chunked_csv_upload_matches_whole_file():
+    df = pd.DataFrame(
+        {
+            "country": np.repeat(["Germany", "France", "Italy"], 20),
+            "year": np.tile(np.arange(2000, 2020), 3),
+            "value": np.arange(60) * 0.5,
+        }
+    )
+    bucket = Bucket()
+
+    put_dataset_chunks(
+        bucket,
+        DigitalTwinTimeSeries.iter_chunks(
+            io.BytesIO(df.to_csv(index=False).encode("utf-8")),
+            "dataset.csv",
+            geo_col="country",
+            chunk_rows=8,
+        ),
+        id="1",
+    )
+
+    expected = df.assign(country=np.repeat(["DEU", "FRA", "ITA"], 20))
+
+    pd.testing.assert_frame_equal(
+        read_dataset(bucket.find_one({"id": "1"})), expected, check_dtype=False
+    )
+
+
+def _sparse_csv() -> io.BytesIO:
+    n_rows = 40
+    df = pd.DataFrame(
+        {
+            "country": np.tile(["Germany", "France", "Italy", "Spain"], 10),
+            # more categories than a feature can have, at most a few per chunk
+            "sector": [f"sector {i // 2}" for i in range(n_rows)],
+            "unit": ["EUR"] * n_rows,
+            # text that is missing in whole chunks
+            "note": ["revised"] * 10 + [None] * 30,
+            # integers of some chunks and floats of others
+            "value": [*range(20), *np.arange(20) + 0.5],
+            "2020": np.arange(n_rows) * 1.5,
+        }
+    )
+
+    return io.BytesIO(df.to_csv(index=False).encode("utf-8"))
+
+
+@pytest.mark.parametrize("codec", ["arrow", "parquet"])
+@pytest.mark.parametrize("chunk_rows", [1, 7, 1000])
+@pytest.mark.parametrize(
+    "upload",
+    [
+        lambda: _upload("bip_eu.tsv"),
+        lambda: _upload("arbeitslosenquote_eu.tsv", compress=True),
+        lambda: (_sparse_csv(), "sparse.csv"),
+    ],
+    ids=["tsv", "tsv.gz", "csv"],
+)
+def test_chunked_feature_options_match_whole_file(upload, chunk_rows, codec):
+    bucket = Bucket()
+    stream, upload_name = upload()
+    feature_options = FeatureOptionsCollector()
+
+    put_dataset_chunks(
+        bucket,
+        feature_options.collect(
+            DigitalTwinTimeSeries.iter_chunks(
+                stream, upload_name, chunk_rows=chunk_rows
+            )
+        ),
+        codec=codec,
+        metadata=lambda: {"featureOptions": feature_options.get_feature_options()},
+        id="1",
+    )
+
+    stream.seek(0)
+    df = DigitalTwinTimeSeries(stream, filename=upload_name)
+
+    assert bucket.find_one({"id": "1"}).featureOptions == get_feature_options(df.data)
@@ -0,0 +1,92 @@
+import os
+
+import pandas as pd
+import pytest
+
+from preprocessing.cache import DatasetCache
+from preprocessing.disk_cache import DiskLRU
+
+
+def _write_bytes(size):
+    def write(path):
+        with open(path, "wb") as file:
+            file.write(b"x" * size)
+
+    return write
+
+
+def test_evicts_least_recently_used_entries(tmp_path):
+    store = DiskLRU(".bin")
+    store.configure(str(tmp_path), 300)
+
+    paths = [store.path(("session",), i) for i in range(3)]
+
+    for i, path in enumerate(paths):
+        store.write(path, _write_bytes(100))
+        os.utime(path, (i, i))
+
+    # reading the oldest entry makes the second one the least recently used
+    store.touch(paths[0])
+    store.write(store.path(("session",), 3), _write_bytes(100))
+
+    assert os.path.exists(paths[0])
+    assert not os.path.exists(paths[1])
+    assert os.path.exists(paths[2])
+
+
+def test_failed_write_leaves_no_partial_file(tmp_path):
+    store = DiskLRU(".bin")
+    store.configure(str(tmp_path), 1000)
+
+    path = store.path(("session",), "key")
+
+    def write(tmp):
+        with open(tmp, "wb") as file:
+            file.write(b"partial")
+        raise OSError("disk full")
+
+    store.write(path, write)
+
+    assert not os.path.exists(path)
+    assert os.listdir(os.path.dirname(path)) == []
+
+
+def test_invalidate_removes_only_the_given_group(tmp_path):
+    store = DiskLRU(".bin")
+    store.configure(str(tmp_path), 1000)
+
+    kept = store.path(("a", "x"), 1)
+    removed = store.path(("a", "y"), 1)
+    store.write(kept, _write_bytes(1))
+    store.write(removed, _write_bytes(1))
+
+    store.invalidate("a", "y")
+    store.invalidate()
+
+    assert os.path.exists(kept)
+    assert not os.path.exists(removed)
+
+
+def test_dataset_cache_round_trip(tmp_path):
+    pytest.importorskip("pyarrow")
+
+    class App:
+        config = {"DATASET_CACHE_DIR": str(tmp_path)}
+
+    cache = DatasetCache(App())
+    key = ("session", "dataset", "original", 1)
+    df = pd.DataFrame({"GEO": ["DEU", "FRA"], "2020": [1.0, 2.0]})
+
+    assert cache.get(key) is None
+
+    cache.set(key, df, "Time")
+    cached, reshape_column = cache.get(key)
+
+    pd.testing.assert_frame_equal(cached, df, check_dtype=False)
+    assert reshape_column == "Time"
+
+    cache.invalidate("session", "dataset", "processed")
+    assert cache.get(key) is not None
+
+    cache.invalidate("session")
+    assert cache.get(key) is None
@@ -0,0 +1,101 @@
+import glob
+import io
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from preprocessing.dataset import DigitalTwinTimeSeries
+from preprocessing.eurostat import (
+    _parse_cells,
+    _parse_cells_fast,
+    iter_eurostat_tsv,
+    parse_eurostat_tsv,
+)
+
+FLASKR_DIR = os.path.join(os.path.dirname(__file__), "..", "flaskr")
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "..", "data")
+
+# the baseline splits the fused column into a fragmented frame
+pytestmark = pytest.mark.filterwarnings("ignore::pandas.errors.PerformanceWarning")
+
+TSV_FILES = sorted(
+    glob.glob(os.path.join(FLASKR_DIR, "static", "demodata", "*.tsv"))
+    + glob.glob(os.path.join(DATA_DIR, "*.tsv"))
+)
+
+
+def read_eurostat_baseline(text: str) -> pd.DataFrame:
+    # generic path before the dedicated reader: read as text, split the fused
+    # column and strip the flags with regular expressions
+    data = DigitalTwinTimeSeries._fix_columns(
+        pd.read_table(io.StringIO(text), dtype=object)
+    )
+
+    n_dimensions = len(text.partition("\t")[0].split(","))
+
+    return data.astype({column: "float64" for column in data.columns[n_dimensions:]})
+
+
+@pytest.fixture(params=TSV_FILES, ids=os.path.basename)
+def text(request):
+    with open(request.param, encoding="utf-8") as file:
+        return file.read()
+
+
+def test_parse_matches_baseline(text):
+    data, flags = parse_eurostat_tsv(text)
+
+    assert flags is None
+    pd.testing.assert_frame_equal(data, read_eurostat_baseline(text), check_dtype=False)
+
+
+def test_fallback_parse_matches_fast_parse(text):
+    header, _, body = text.partition("\n")
+    n_periods = len(header.split("\t")) - 1
+
+    fast = _parse_cells_fast(body, n_periods, keep_flags=True)
+    fallback = _parse_cells(body, n_periods, keep_flags=True)
+
+    pd.testing.assert_series_equal(fast[0], fallback[0])
+    pd.testing.assert_frame_equal(fast[1], fallback[1], check_dtype=False)
+    # flag columns are labelled by the caller
+    np.testing.assert_array_equal(fast[2].to_numpy(), fallback[2].to_numpy())
+
+
+def test_chunks_match_whole_file(text):
+    header, _, body = text.partition("\n")
+    lines = io.StringIO(body)
+
+    chunks = list(iter_eurostat_tsv(header, lines, chunk_rows=7))
+
+    pd.testing.assert_frame_equal(
+        pd.concat(chunks, ignore_index=True),
+        parse_eurostat_tsv(text)[0],
+        check_dtype=False,
+    )
+
+
+def test_flags_and_short_lines():
+    text = (
+        "unit,geo\\time\t2019 \t2020 \t2021 \n"
+        "PC,DE\t1.5 \t: \t2.5 p\n"
+        "PC,FR\t3.0 e\t4.0 \n"
+        "PC,IT\t5\t6.5 b\t: c\n"
+    )
+
+    data, flags = parse_eurostat_tsv(text, keep_flags=True)
+
+    assert data.columns.tolist() == ["unit", "geo\\time", "2019 ", "2020 ", "2021 "]
+    np.testing.assert_array_equal(
+        data.iloc[:, 2:].to_numpy(),
+        [[1.5, 0.0, 2.5], [3.0, 4.0, np.nan], [5.0, 6.5, 0.0]],
+    )
+    assert flags.to_dict() == {
+        (0, "2021 "): "p",
+        (1, "2019 "): "e",
+        (2, "2020 "): "b",
+        (2, "2021 "): "c",
+    }
+    pd.testing.assert_frame_equal(data, read_eurostat_baseline(text), check_dtype=False)
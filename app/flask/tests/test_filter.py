@@ -0,0 +1,122 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from dateutil import parser
+
+from preprocessing import countries
+from preprocessing.eurostat import parse_eurostat_tsv
+from preprocessing.filter import get_feature_options, infer_feature_options
+
+FLASKR_DIR = os.path.join(os.path.dirname(__file__), "..", "flaskr")
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "..", "data")
+
+# datasets whose geo column is unambiguous, the former check sampled ten random values
+EUROSTAT_FILES = [
+    os.path.join(FLASKR_DIR, "static", "demodata", "bip_eu.tsv"),
+    os.path.join(FLASKR_DIR, "static", "demodata", "arbeitslosenquote_eu.tsv"),
+    os.path.join(DATA_DIR, "armutsquote_erwerbst.tsv"),
+]
+CSV_FILES = [
+    os.path.join(DATA_DIR, "Winter_Olympic_Medals_y.csv"),
+    os.path.join(DATA_DIR, "broadband_data_y.csv"),
+    os.path.join(DATA_DIR, "data.csv"),
+    os.path.join(DATA_DIR, "income_per_person_gdppercapita_ppp_inflation_adjusted.csv"),
+]
+
+
+def _is_datetime_baseline(value) -> bool:
+    try:
+        return bool(parser.parse(value))
+    except Exception:
+        return False
+
+
+def _find_geo_column_baseline(dataframe: pd.DataFrame, column: str) -> bool:
+    negative_matches = 0
+
+    for value in dataframe[column].sample(n=10, random_state=0):
+        if not isinstance(value, str) or countries.is_country(value) is False:
+            negative_matches += 1
+
+        if negative_matches > 4:
+            return False
+
+    return True
+
+
+def infer_feature_options_baseline(dataframe: pd.DataFrame):
+    # value-by-value implementation before vectorising, without its prints
+    columns = [c.strip() for c in dataframe.columns.to_list()]
+    geo_col = None
+    feature_candidates = []
+
+    for feature in columns:
+        if _is_datetime_baseline(feature):
+            continue
+
+        feature_candidates.append(feature)
+
+        if dataframe[feature].dtype in ("float64", "float", "float32"):
+            continue
+
+        if _is_datetime_baseline(dataframe[feature][0]):
+            continue
+
+        if _find_geo_column_baseline(dataframe, feature):
+            geo_col = feature
+
+        features_in_rows = dataframe[feature].unique().tolist()
+
+        if len(features_in_rows) <= 15:
+            feature_candidates.extend(features_in_rows)
+
+    if geo_col in feature_candidates:
+        feature_candidates.remove(geo_col)
+
+    return feature_candidates, geo_col, columns
+
+
+def _read(path: str) -> pd.DataFrame:
+    if not os.path.exists(path):
+        pytest.skip(f"{path} is not available")
+
+    if path.endswith(".tsv"):
+        with open(path, encoding="utf-8") as file:
+            df, _ = parse_eurostat_tsv(file.read())
+    else:
+        df = pd.read_csv(path, sep=None, engine="python")
+
+    # as get_feature_options passes the dataset
+    return df.fillna(0)
+
+
+@pytest.mark.parametrize("path", EUROSTAT_FILES + CSV_FILES, ids=os.path.basename)
+def test_infer_feature_options_matches_baseline(path):
+    df = _read(path)
+
+    assert infer_feature_options(df) == infer_feature_options_baseline(df)
+
+
+def test_infer_feature_options_of_long_format_matches_baseline():
+    df = pd.DataFrame(
+        {
+            "Time": pd.date_range("2000", periods=40, freq="MS").strftime("%Y-%m-%d"),
+            "GEO": ["DEU", "FRA", "ITA", "ESP"] * 10,
+            "indicator": ["a", "b"] * 20,
+            "value": np.arange(40.0),
+        }
+    )
+
+    assert infer_feature_options(df) == infer_feature_options_baseline(df)
+
+
+def test_get_feature_options_without_geo_column():
+    df = pd.DataFrame({"2020": [1.0, np.nan], "2021": [2.0, 3.0]})
+
+    assert get_feature_options(df) == {
+        "possibleFeatures": [],
+        "geoSelected": "None",
+        "initialColumns": ["2020", "2021"],
+    }
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("flask_jwt_extended")
+pytest.importorskip("flask_pymongo")
+
+from blueprints.graph import _group_by_country
+
+
+def _group_by_country_baseline(df, geo_column, time_column, feature_column):
+    df = df[df[geo_column].notna()]
+    countries = df[geo_column].unique().tolist()
+
+    return (
+        countries,
+        [df[df[geo_column] == c][time_column].to_list() for c in countries],
+        [df[df[geo_column] == c][feature_column].to_list() for c in countries],
+    )
+
+
+@pytest.mark.parametrize(
+    "geo",
+    [
+        ["DEU", "FRA", "DEU", "ITA", "FRA", "DEU"],
+        ["DEU", None, "FRA", "DEU", np.nan, "FRA"],
+        [None, None, None, None, None, None],
+    ],
+)
+def test_group_by_country_matches_baseline(geo):
+    df = pd.DataFrame(
+        {"GEO": geo, "Time": range(2000, 2006), "value": np.arange(6) * 1.5}
+    )
+
+    assert _group_by_country(df, "GEO", "Time", "value") == (
+        _group_by_country_baseline(df, "GEO", "Time", "value")
+    )
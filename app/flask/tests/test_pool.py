@@ -0,0 +1,59 @@
+import time
+from concurrent.futures import TimeoutError
+
+import pytest
+
+from forecasting import pool as pool_module
+from forecasting.pool import ForecastPool
+
+
+def _sleep(seconds: float) -> float:
+    time.sleep(seconds)
+    return seconds
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    # restarted pools must be ready within the short timeouts of the tests
+    monkeypatch.setattr(pool_module, "WARM_MODULES", ())
+
+    pool = ForecastPool()
+    pool.processes = 2
+    pool.max_queue = 2
+    pool.task_timeout = 1
+    pool.start_method = "fork"
+
+    yield pool
+
+    pool.shutdown()
+
+
+def test_result_stops_hung_task(pool):
+    future = pool.submit(_sleep, 60)
+
+    with pytest.raises(TimeoutError):
+        pool.result(future)
+
+    # the worker was terminated and both slots are free again
+    assert pool.starmap(_sleep, [(0,), (0,)]) == [0, 0]
+
+
+def test_tasks_of_restarted_pool_run_again(pool):
+    pool.task_timeout = 2
+
+    hung = pool.submit(_sleep, 60)
+    other = pool.submit(_sleep, 1.5)
+
+    time.sleep(0.5)
+
+    with pytest.raises(TimeoutError):
+        pool.result(hung)
+
+    assert pool.result(other) == 1.5
+
+
+def test_imap_unordered_stops_hung_tasks(pool):
+    with pytest.raises(TimeoutError):
+        list(pool.imap_unordered(_sleep, [(0,), (60,)]))
+
+    assert sorted(pool.imap_unordered(_sleep, [(0,), (0,)])) == [(0, 0), (1, 0)]
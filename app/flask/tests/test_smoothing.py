@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from forecasting.smoothing import (
+    centered_moving_average,
+    initialize,
+    multivariate_ES,
+    multivariate_es_forecast,
+)
+
+# year_size (number of features), rows of history, the last ones are shorter than four years
+HISTORIES = [(2, 40), (3, 30), (4, 40), (12, 120), (4, 10), (3, 7), (2, 3), (4, 1)]
+
+
+def centered_moving_average_rows(D: pd.DataFrame, year_size):
+    # row-by-row implementation before the array rewrite, DataFrame.append replaced by pd.concat
+
+    estimated_levels = pd.DataFrame()
+
+    D = D.iloc[0 : 4 * year_size, :]
+    for i in range(3 * year_size):
+        series = (
+            D.iloc[i : i + year_size, :].mean()
+            + D.iloc[i + 1 : i + year_size + 1, :].mean()
+        ) / 2
+        estimated_levels = pd.concat(
+            [estimated_levels, series.to_frame().T], ignore_index=True
+        )
+
+    return estimated_levels
+
+
+def initialize_rows(data: pd.DataFrame, year_size):
+    # row-by-row implementation before the array rewrite, DataFrame.append replaced by pd.concat
+
+    estimated_levels = centered_moving_average_rows(data, year_size)
+
+    X = data.iloc[int(year_size / 2) : int(year_size / 2 + 3 * year_size), :]
+    X = X.reset_index(drop=True)
+
+    temp = (
+        X.iloc[0 : int(3 * year_size), :]
+        - estimated_levels.iloc[0 : int(3 * year_size), :]
+    )
+
+    S0 = pd.DataFrame()
+    for i in range(year_size):
+        row = (
+            temp.iloc[i, :]
+            + temp.iloc[i + year_size, :]
+            + temp.iloc[i + 2 * year_size, :]
+        ) / 3
+        S0 = pd.concat([S0, row.to_frame().T], ignore_index=True)
+
+    S0 = pd.concat(
+        [
+            S0.iloc[int(year_size / 2) : year_size, :],
+            S0.iloc[0 : int(year_size / 2), :],
+        ],
+        ignore_index=True,
+    )
+    S0 = pd.concat(
+        [(S0.iloc[i, :] - S0.mean()).to_frame().T for i in range(year_size)],
+        ignore_index=True,
+    )
+
+    T0 = (
+        estimated_levels.iloc[2 * year_size : 3 * year_size].mean()
+        - estimated_levels.iloc[year_size - 1 : 2 * year_size - 1].mean()
+    ) / year_size
+
+    L0 = data.iloc[0, :]
+
+    return L0, T0, S0
+
+
+def _history(year_size, n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    trend = np.arange(n_rows)[:, np.newaxis]
+
+    return pd.DataFrame(
+        100 + 0.5 * trend + rng.normal(scale=10, size=(n_rows, year_size))
+    )
+
+
+def _assert_close(expected, actual):
+    np.testing.assert_allclose(
+        np.asarray(actual, dtype="float64"),
+        np.asarray(expected, dtype="float64"),
+        rtol=1e-9,
+        atol=1e-9,
+        equal_nan=True,
+    )
+
+
+@pytest.mark.parametrize("year_size, n_rows", HISTORIES)
+def test_centered_moving_average_matches_rows(year_size, n_rows):
+    data = _history(year_size, n_rows)
+
+    _assert_close(
+        centered_moving_average_rows(data, year_size),
+        centered_moving_average(data, year_size),
+    )
+
+
+@pytest.mark.parametrize("year_size, n_rows", HISTORIES)
+def test_initialize_matches_rows(year_size, n_rows):
+    data = _history(year_size, n_rows)
+
+    for expected, actual in zip(
+        initialize_rows(data, year_size), initialize(data, year_size)
+    ):
+        _assert_close(expected, actual)
+
+
+def test_initialize_skips_missing_values_like_pandas():
+    data = _history(4, 20)
+    data.iloc[[1, 5, 6], [0, 2]] = np.nan
+
+    for expected, actual in zip(initialize_rows(data, 4), initialize(data, 4)):
+        _assert_close(expected, actual)
+
+
+@pytest.mark.parametrize("year_size, n_rows", HISTORIES)
+def test_forecast_matches_one_pass_per_horizon(year_size, n_rows):
+    data = _history(year_size, n_rows)
+    periods = 5
+
+    expected = [
+        multivariate_ES(data, n_rows, m, year_size, 0.3)[3].to_numpy()
+        for m in range(1, periods + 1)
+    ]
+
+    _assert_close(
+        expected, multivariate_es_forecast(data.to_numpy(), periods, year_size, 0.3)
+    )
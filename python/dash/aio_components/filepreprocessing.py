@@ -367,6 +367,7 @@ class FilePreProcessingAIO(dbc.AccordionItem):
         Input(ids.preset_upload(MATCH), "contents"),
         Input("reset-button", "n_clicks"),
         Input(ids.demo_id(MATCH), "children"),
+        State(ids.store(MATCH), "data"),
         prevent_initial_call=True,
     )
     def preprocess_data(
@@ -381,6 +382,7 @@ class FilePreProcessingAIO(dbc.AccordionItem):
         preset_file: str,
         reset_button_n_clicks: int,
         demo_id: str,
+        dataset_store: dict,
     ) -> tuple:
         """Handles the preprocessing of an uploaded dataset. In demo mode, a predefined dataset is loaded instead.
 
@@ -396,6 +398,7 @@ class FilePreProcessingAIO(dbc.AccordionItem):
             preset_file (str): file with predetermined columns to be selected
             reset_button_n_clicks (int): number of clicks for reset button
             demo_id (str): id of demo dataset to use in demo mode
+            dataset_store (dict): handle and version of the current dataset
 
         Returns:
             tuple:
@@ -412,6 +415,7 @@ class FilePreProcessingAIO(dbc.AccordionItem):
             demo_button_n_clicks,
             f"Demo {str(demo_id)}",
             preset_file,
+            dataset_store,
         )
 
     @callback(
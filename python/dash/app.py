@@ -41,6 +41,7 @@ from helpers.models import (
     hw_es_fit_and_predict_multi,
     prophet_fit_and_predict_n,
 )
+from helpers.geojson import geojsons
 from helpers.layout import (
     preprocess_dataset,
     get_year_and_country_options_stats,
@@ -51,6 +52,7 @@ from helpers.layout import (
 )
 
 from preprocessing.parse import merge_dataframes_multi
+from preprocessing.registry import datasets
 
 external_stylesheets = [
     {
@@ -62,9 +64,29 @@ app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP] + external_styl
 
 app.config.suppress_callback_exceptions = True
 
-df = pd.read_table(
-    "https://ec.europa.eu/eurostat/estat-navtree-portlet-prod/BulkDownloadListing?file=data/tec00001.tsv.gz"
-)
+# read and simplify the bundled geometries once instead of on every map update
+geojsons.preload()
+
+
+def load_dataset(store: dict) -> pd.DataFrame:
+    """Looks up the parsed dataset referenced by a dataset store
+
+    Args:
+        store (dict): handle and version of the dataset
+
+    Raises:
+        exceptions.PreventUpdate: the dataset is no longer held by this process
+
+    Returns:
+        pd.DataFrame: dataset
+    """
+
+    try:
+        return datasets.get(store)
+    except KeyError:
+        print(f"Dataset {store['handle']} is not available anymore")
+        raise exceptions.PreventUpdate
+
 
 app.layout = html.Div(
     [
@@ -1670,11 +1692,11 @@ def add_file(
         "data",
     ),
 )
-def update_selector_visibility(dataframes: List[str]):
+def update_selector_visibility(dataframes: List[dict]):
     """Updates the dataset visibility toggle
 
     Args:
-        dataframes (List[str]): All available datasets
+        dataframes (List[dict]): handles of all available datasets
 
     Returns:
         tuple: style properties for visibility selector
@@ -1722,13 +1744,13 @@ def update_selector_visibility(dataframes: List[str]):
     ),
 )
 def update_country_dropdown_comparison(
-    dataframes: List[str],
+    dataframes: List[dict],
     geo_dropdowns: List[str],
 ):
     """Fills the dropdown in correlation section with countries that occur in both datasets
 
     Args:
-        dataframes (List[str]): All available dataframes
+        dataframes (List[dict]): handles of all available dataframes
         geo_dropdowns (List[str]): Selected geo-column values
 
     Raises:
@@ -1742,7 +1764,7 @@ def update_country_dropdown_comparison(
         countries_per_df = []
 
         for i, df in enumerate(dataframes):
-            countries = pd.read_json(df)[geo_dropdowns[i]].unique()
+            countries = load_dataset(df)[geo_dropdowns[i]].unique()
             countries_per_df.append(set(countries))
 
         country_intersection = list(set.intersection(*countries_per_df))
@@ -1766,7 +1788,7 @@ def update_country_dropdown_comparison(
         countries_per_df = []
         for i, (df, geo) in enumerate(zip(dataframes, geo_dropdowns)):
             if df is not None and geo is not None:
-                countries = pd.read_json(df)[geo_dropdowns[i]].unique()
+                countries = load_dataset(df)[geo_dropdowns[i]].unique()
                 countries_per_df.append(set(countries))
 
         country_union = list(set.union(*countries_per_df))
@@ -1827,7 +1849,7 @@ def update_country_dropdown_comparison(
 )
 def update_year_and_country_dropdown_stats(
     selected_dataset: int,
-    dataframes: List[str],
+    dataframes: List[dict],
     time_dropdowns: List[str],
     geo_dropdowns: List[str],
 ) -> tuple:
@@ -1835,7 +1857,7 @@ def update_year_and_country_dropdown_stats(
 
     Args:
         selected_dataset (int): id of the selected dataset
-        dataframes (List[str]): available dataframes
+        dataframes (List[dict]): handles of the available dataframes
         time_dropdowns (List[str]): Selected time-column values
         geo_dropdowns (List[str]): Selected geo-column values
 
@@ -1852,7 +1874,7 @@ def update_year_and_country_dropdown_stats(
 
     if time_column and geo_column and data:
 
-        df = pd.read_json(data)
+        df = load_dataset(data)
 
         return get_year_and_country_options_stats(
             df, geo_column=geo_column, time_column=time_column
@@ -1886,7 +1908,7 @@ def update_year_and_country_dropdown_stats(
 def update_table_content(
     selected_dataset: int,
     visibility_checklist: List[str],
-    dataframes: List[str],
+    dataframes: List[dict],
     separators: List[str],
 ) -> pd.DataFrame:
     """Fills table section with data from the selected dataset
@@ -1894,7 +1916,7 @@ def update_table_content(
     Args:
         selected_dataset (int): value of selected dataset
         visibility_checklist (List[str]): list of displayed sections
-        dataframes (List[str]): available dataframes
+        dataframes (List[dict]): handles of the available dataframes
         separators (List[str]): selected seperators for each dataset
 
     Raises:
@@ -1909,7 +1931,7 @@ def update_table_content(
 
     if (data and sep) and "Table" in visibility_checklist:
 
-        df = pd.read_json(data).round(2).to_dict("records")
+        df = load_dataset(data).round(2).to_dict("records")
 
         table_div_style = {
             "backroundColor": "#232323",
@@ -1986,7 +2008,7 @@ def update_stats(
     country_dropdown_stats: str,
     year_range: List[int],
     visibility_checklist: List[str],
-    dataframes: List[str],
+    dataframes: List[dict],
     feature_dropdowns: List[str],
     time_dropdowns: List[str],
     geo_dropdowns: List[str],
@@ -2003,7 +2025,7 @@ def update_stats(
         country_dropdown_stats (str): selected country for growth stat
         year_range (List[int]): time span set in slider
         visibility_checklist (List[str]): current visible sections
-        dataframes (List[str]): available dataframes
+        dataframes (List[dict]): handles of the available dataframes
         feature_dropdowns (List[str]): selected feature columns
         time_dropdowns (List[str]): selected time columns
         geo_dropdowns (List[str]): selected geo columns
@@ -2021,7 +2043,7 @@ def update_stats(
         time_column and feature_column and geo_column and data
     ) and "Stats" in visibility_checklist:
 
-        df = pd.read_json(data)
+        df = load_dataset(data)
 
         year = year_dropdown_stats
 
@@ -2114,7 +2136,7 @@ def update_line_plot(
     timeline_children: List[Component],
     selected_dataset: int,
     visibility_checklist: List[str],
-    dataframes: List[str],
+    dataframes: List[dict],
     feature_dropdowns: List[str],
     time_dropdowns: List[str],
     geo_dropdowns: List[str],
@@ -2125,7 +2147,7 @@ def update_line_plot(
         timeline_children (List[Component]): container of timeline figure
         selected_dataset (int): id of selected dataset
         visibility_checklist (List[str]): current visible sections
-        dataframes (List[str]): available dataframes
+        dataframes (List[dict]): handles of the available dataframes
         feature_dropdowns (List[str]): selected feature columns
         time_dropdowns (List[str]): selected time columns
         geo_dropdowns (List[str]): selected geo columns
@@ -2143,7 +2165,7 @@ def update_line_plot(
         time_column and feature_column and geo_column and data
     ) and "Timeline" in visibility_checklist:
 
-        df = pd.read_json(data)
+        df = load_dataset(data)
 
         fig = create_multi_line_plot(
             df,
@@ -2162,7 +2184,7 @@ def update_line_plot(
 
     elif data and time_column == "none":
 
-        df = pd.read_json(data)
+        df = load_dataset(data)
         fig = create_multi_line_plot(df)
 
         timeline_children.clear()
@@ -2223,7 +2245,7 @@ def update_choropleth(
     map_children: List[Component],
     selected_dataset: int,
     visiblity_checklist: List[str],
-    dataframes: List[str],
+    dataframes: List[dict],
     feature_dropdowns: List[str],
     time_dropdowns: List[str],
     geo_dropdowns: List[str],
@@ -2235,7 +2257,7 @@ def update_choropleth(
         map_children (List[Component]): container of map figure
         selected_dataset (int): id of selected dataset
         visiblity_checklist (List[str]): current visible sections
-        dataframes (List[str]): available dataframes
+        dataframes (List[dict]): handles of the available dataframes
         feature_dropdowns (List[str]): selected features
         time_dropdowns (List[str]): selected time columns
         geo_dropdowns (List[str]): selected geo columns
@@ -2254,7 +2276,7 @@ def update_choropleth(
         time_column and feature_column and geo_column and data
     ) and "Map" in visiblity_checklist:
 
-        df = pd.read_json(data)
+        df = load_dataset(data)
 
         # mapbox choropleth disabled for now
         #
@@ -2341,7 +2363,7 @@ def update_max_country_compare(
     selected_country: str,
     comparison_children: List[Component],
     visibility_checklist: List[str],
-    dataframes: List[str],
+    dataframes: List[dict],
     feature_dropdowns: List[str],
     time_dropdowns: List[str],
     geo_dropdowns: List[str],
@@ -2353,7 +2375,7 @@ def update_max_country_compare(
         selected_country (str): value of selected country
         comparison_children (List[Component]): container of correlation line plot
         visibility_checklist (List[str]): current visible sections
-        dataframes (List[str]): available dataframes
+        dataframes (List[dict]): handles of the available dataframes
         feature_dropdowns (List[str]): selected features
         time_dropdowns (List[str]): selected time columns
         geo_dropdowns (List[str]): selected geo columns
@@ -2372,7 +2394,7 @@ def update_max_country_compare(
         dfs = []
 
         for i, data in enumerate(dataframes):
-            df = pd.read_json(data)
+            df = load_dataset(data)
             df_by_country = df[df[geo_dropdowns[i]] == selected_country]
 
             dfs.append(df_by_country)
@@ -2455,7 +2477,7 @@ def update_max_country_compare(
 def update_heatmap(
     selected_country: str,
     visibility_checklist: List[str],
-    dataframes: List[str],
+    dataframes: List[dict],
     feature_dropdowns: List[str],
     time_dropdowns: List[str],
     geo_dropdowns: List[str],
@@ -2468,7 +2490,7 @@ def update_heatmap(
     Args:
         selected_country (str): value of selected country
         visibility_checklist (List[str]): current visible sections
-        dataframes (List[str]): available dataframes
+        dataframes (List[dict]): handles of the available dataframes
         feature_dropdowns (List[str]): selected feature columns
         time_dropdowns (List[str]): selected time columns
         geo_dropdowns (List[str]): selected geo columns
@@ -2502,7 +2524,7 @@ def update_heatmap(
 
             for i, data in enumerate(dataframes):
                 if data is not None and geo_dropdowns[i] is not None:
-                    df = pd.read_json(data)
+                    df = load_dataset(data)
 
                     if selected_country in df[geo_dropdowns[i]].unique():
                         df_by_country = df[df[geo_dropdowns[i]] == selected_country]
@@ -2528,7 +2550,7 @@ def update_heatmap(
             available_features = []
             for i, data in enumerate(dataframes):
                 if data is not None and geo_dropdowns[i] is not None:
-                    df = pd.read_json(data)
+                    df = load_dataset(data)
 
                     if selected_country in df[geo_dropdowns[i]].unique():
                         available_features.append(
@@ -2577,7 +2599,7 @@ def update_heatmap(
 def update_forecast_slider(
     selected_dataset: int,
     frequency_dropdown: str,
-    dataframes: List[str],
+    dataframes: List[dict],
     time_dropdowns: List[str],
 ) -> tuple:
     """Updates the forecast slider marks to match time stamps in selected dataset
@@ -2585,7 +2607,7 @@ def update_forecast_slider(
     Args:
         selected_dataset (int): id of selected dataset
         frequency_dropdown (str): selected frequency
-        dataframes (List[str]): available dataframes
+        dataframes (List[dict]): handles of the available dataframes
         time_dropdowns (List[str]): selected time columns
 
     Raises:
@@ -2600,7 +2622,7 @@ def update_forecast_slider(
 
     if time_column and data and frequency_dropdown:
 
-        df = pd.read_json(data)
+        df = load_dataset(data)
 
         marks = get_time_marks(df, time_column, frequency_dropdown)
 
@@ -2667,7 +2689,7 @@ def update_forecast(
     frequency_dropdown: str,
     model_dropdown: str,
     visibility_checklist: List[str],
-    dataframes: List[str],
+    dataframes: List[dict],
     feature_dropdowns: List[str],
     time_dropdowns: List[str],
     geo_dropdowns: List[str],
@@ -2682,7 +2704,7 @@ def update_forecast(
         frequency_dropdown (str): selected time frequency
         model_dropdown (str): selected forecasting model
         visibility_checklist (List[str]): current visible sections
-        dataframes (List[str]): available dataframes
+        dataframes (List[dict]): handles of the available dataframes
         feature_dropdowns (List[str]): selected features
         time_dropdowns (List[str]): selected time columns
         geo_dropdowns (List[str]): selected geo columns
@@ -2705,7 +2727,7 @@ def update_forecast(
         and model_dropdown
     ) and "Forecast" in visibility_checklist:
 
-        df = pd.read_json(data)
+        df = load_dataset(data)
 
         if not forecast_slider_value:
             forecast_slider_value = 1
@@ -2851,7 +2873,7 @@ def update_multivariate_forecast(
     forecast_data_selector_options: List[dict | str],
     selected_dataset: int,
     visibility_checklist: List[str],
-    dataframes: List[str],
+    dataframes: List[dict],
     feature_dropdowns: List[str],
     time_dropdowns: List[str],
     geo_dropdowns: List[str],
@@ -2871,7 +2893,7 @@ def update_multivariate_forecast(
         forecast_data_selector_options (List[dict | str]): selector options for dependent dataset (Prophet)
         selected_dataset (int): id of selected dataset (Prophet)
         visibility_checklist (List[str]): current visible sections
-        dataframes (List[str]): available dataframes
+        dataframes (List[dict]): handles of the available dataframes
         feature_dropdowns (List[str]): selected feature columns
         time_dropdowns (List[str]): selected time columns
         geo_dropdowns (List[str]): selected geo columns
@@ -2895,7 +2917,7 @@ def update_multivariate_forecast(
 
         filtered_dfs = []
         for i, df in enumerate(dataframes):
-            df = pd.read_json(df)
+            df = load_dataset(df)
             filtered_df = df[df[geo_dropdowns[i]] == selected_country][
                 [time_dropdowns[i], feature_dropdowns[i]]
             ]
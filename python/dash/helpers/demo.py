@@ -0,0 +1,103 @@
+"""
+
+Catalogue of the demo datasets
+
+Demo datasets are read from the files bundled in the data directory of the
+repository. Datasets without a bundled file are downloaded and decompressed
+once into a cache directory, named after the hash of their URL. Files are
+memory-mapped and their encoded content is kept in memory, so clicking the
+demo button again neither downloads nor reads anything.
+
+"""
+
+import base64
+import gzip
+import hashlib
+import mmap
+import os
+import tempfile
+import threading
+import urllib.request
+from typing import Dict, NamedTuple, Tuple
+
+DATA_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))),
+    "data",
+)
+
+CACHE_DIR = os.path.join(tempfile.gettempdir(), "dt_society_demo")
+
+
+class DemoDataset(NamedTuple):
+    filename: str
+    path: str
+    url: str
+
+
+demo_datasets: Dict[str, DemoDataset] = {
+    "Demo 0": DemoDataset(
+        filename="arbeitslosenquote_eu.tsv",
+        path="arbeitslosenquote_jaehrlich_eu.tsv",
+        url="https://ec.europa.eu/eurostat/estat-navtree-portlet-prod/BulkDownloadListing?file=data/tipsun20.tsv.gz",
+    ),
+    "Demo 1": DemoDataset(
+        filename="bip_europa.tsv",
+        path="bip_jaehrlich_eu.tsv",
+        url="https://ec.europa.eu/eurostat/estat-navtree-portlet-prod/BulkDownloadListing?file=data/tec00001.tsv.gz",
+    ),
+}
+
+# encoded contents by path and modification time
+_contents: Dict[tuple, str] = {}
+_lock = threading.Lock()
+
+
+def _download(demo: DemoDataset) -> str:
+    path = os.path.join(
+        CACHE_DIR, hashlib.sha1(demo.url.encode("utf-8")).hexdigest() + ".tsv"
+    )
+
+    if os.path.exists(path):
+        return path
+
+    print(f"Downloading demo dataset '{demo.filename}'.")
+
+    content = gzip.decompress(urllib.request.urlopen(demo.url).read())
+
+    # write to a temporary file first, other processes must never see partial files
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(content)
+    os.replace(tmp_path, path)
+
+    return path
+
+
+def load_demo_dataset(name: str) -> Tuple[str, str]:
+    """Loads the content of a demo dataset as the upload component provides it
+
+    Args:
+        name (str): name of the demo dataset, e.g. "Demo 0"
+
+    Returns:
+        Tuple[str, str]: file name, base64 encoded content
+    """
+
+    demo = demo_datasets[name]
+
+    path = os.path.join(DATA_DIR, demo.path)
+
+    if not os.path.exists(path):
+        path = _download(demo)
+
+    key = (path, os.stat(path).st_mtime_ns)
+
+    with _lock:
+        if key not in _contents:
+            with open(path, "rb") as file, mmap.mmap(
+                file.fileno(), 0, access=mmap.ACCESS_READ
+            ) as content:
+                _contents[key] = base64.b64encode(content).decode("utf-8")
+
+        return demo.filename, _contents[key]
@@ -0,0 +1,321 @@
+"""
+
+Registry of the GeoJSON geometries used by the choropleth maps
+
+Geometries are read once from the bundled assets (or downloaded once if a
+scope has no bundled file), simplified for a few zoom levels and kept in
+memory. Maps only embed the features of the countries or states present in
+their dataset.
+
+"""
+
+import json
+import os
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional
+from urllib.request import urlopen
+
+import numpy as np
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "assets")
+
+# Douglas-Peucker tolerances in degrees, 0 keeps the original geometry
+TOLERANCES = (0.0, 0.005, 0.02, 0.05)
+
+
+class GeoJsonScope(NamedTuple):
+    path: Optional[str]
+    url: str
+    featureid: str
+    zoom: float
+    center: Dict[str, float]
+
+
+scopes: Dict[str, GeoJsonScope] = {
+    "global": GeoJsonScope(
+        path="countries.geojson",
+        url="https://datahub.io/core/geo-countries/r/countries.geojson",
+        featureid="properties.ISO_A3",
+        zoom=1,
+        center={"lat": 56.5, "lon": 11},
+    ),
+    "europe": GeoJsonScope(
+        path="europe.geojson",
+        url="https://raw.githubusercontent.com/leakyMirror/map-of-europe/master/GeoJSON/europe.geojson",
+        featureid="properties.ISO3",
+        zoom=2.5,
+        center={"lat": 53, "lon": 11},
+    ),
+    "germany": GeoJsonScope(
+        path="3_mittel.geo.json",
+        url="https://raw.githubusercontent.com/isellsoap/deutschlandGeoJSON/main/2_bundeslaender/3_mittel.geo.json",
+        featureid="properties.id",
+        zoom=4.4,
+        center={"lat": 51.3, "lon": 10},
+    ),
+}
+
+
+def simplify_line(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """Simplifies a line with the Douglas-Peucker algorithm
+
+    Args:
+        points (np.ndarray): coordinates of shape (n, 2)
+        tolerance (float): maximum distance of removed points to the simplified line
+
+    Returns:
+        np.ndarray: coordinates of the kept points, first and last point are always kept
+    """
+
+    n_points = len(points)
+
+    if tolerance <= 0 or n_points < 3:
+        return points
+
+    keep = np.zeros(n_points, dtype=bool)
+    keep[[0, -1]] = True
+
+    stack = [(0, n_points - 1)]
+
+    while stack:
+        start, end = stack.pop()
+
+        if end - start < 2:
+            continue
+
+        segment = points[end] - points[start]
+        offsets = points[start + 1 : end] - points[start]
+        length = np.hypot(*segment)
+
+        if length == 0:
+            # closed rings start and end on the same point
+            distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        else:
+            distances = (
+                np.abs(segment[0] * offsets[:, 1] - segment[1] * offsets[:, 0]) / length
+            )
+
+        farthest = int(np.argmax(distances))
+
+        if distances[farthest] > tolerance:
+            split = start + 1 + farthest
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+
+    return points[keep]
+
+
+def _simplify_polygon(rings: List[list], tolerance: float) -> Optional[List[list]]:
+    simplified = []
+
+    for i, ring in enumerate(rings):
+        points = simplify_line(np.asarray(ring, dtype=float), tolerance)
+
+        if len(points) < 4:
+            if i == 0:
+                # the outline vanished at this tolerance, so does the polygon
+                return None
+            continue
+
+        simplified.append(points.tolist())
+
+    return simplified
+
+
+def simplify_geometry(geometry: dict, tolerance: float) -> dict:
+    """Simplifies a Polygon or MultiPolygon geometry
+
+    Polygons smaller than the tolerance are dropped, unless the geometry would vanish entirely.
+
+    Args:
+        geometry (dict): GeoJSON geometry
+        tolerance (float): Douglas-Peucker tolerance in degrees
+
+    Returns:
+        dict: simplified geometry
+    """
+
+    if tolerance <= 0 or geometry["type"] not in ("Polygon", "MultiPolygon"):
+        return geometry
+
+    if geometry["type"] == "Polygon":
+        polygons = [geometry["coordinates"]]
+    else:
+        polygons = geometry["coordinates"]
+
+    simplified = [_simplify_polygon(polygon, tolerance) for polygon in polygons]
+    simplified = [polygon for polygon in simplified if polygon is not None]
+
+    if not simplified:
+        return geometry
+
+    return {"type": "MultiPolygon", "coordinates": simplified}
+
+
+def get_feature_id(feature: dict, featureid: str):
+    """Looks up the id of a feature by a plotly featureidkey such as "properties.ISO3"
+
+    Args:
+        feature (dict): GeoJSON feature
+        featureid (str): path of the id in the feature
+
+    Returns:
+        id of the feature or None if it has none
+    """
+
+    value = feature
+
+    for key in featureid.split("."):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+
+    return value
+
+
+def tolerance_for_zoom(zoom: float) -> float:
+    """Picks the coarsest tolerance that stays below the size of a pixel at a mapbox zoom level
+
+    Args:
+        zoom (float): mapbox zoom level
+
+    Returns:
+        float: tolerance in degrees
+    """
+
+    # a 512 pixel wide tile covers 360 degrees at zoom level 0
+    pixel_degrees = 360 / (512 * 2**zoom)
+
+    return max(tolerance for tolerance in TOLERANCES if tolerance <= pixel_degrees)
+
+
+class GeoJsonRegistry:
+    def __init__(self, scopes: Dict[str, GeoJsonScope]):
+        """
+        In-memory store of simplified GeoJSON feature collections per scope
+
+        Args:
+            scopes (Dict[str, GeoJsonScope]): sources and map settings of the scopes
+        """
+
+        self.scopes = scopes
+
+        # scope -> tolerance -> feature id -> feature
+        self._features: Dict[str, Dict[float, Dict[object, dict]]] = {}
+        self._trimmed: Dict[tuple, dict] = {}
+        self._lock = threading.Lock()
+
+    def preload(self, scopes: Iterable[str] = None):
+        """Loads and simplifies the scopes with bundled files, e.g. on startup
+
+        Args:
+            scopes (Iterable[str], optional): scopes to load. Defaults to all scopes with a bundled file.
+        """
+
+        if scopes is None:
+            scopes = [name for name, scope in self.scopes.items() if scope.path]
+
+        for scope in scopes:
+            self._get_features(scope)
+
+    def _read(self, scope: GeoJsonScope) -> dict:
+        if scope.path is not None:
+            path = os.path.join(ASSETS_DIR, scope.path)
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as file:
+                    return json.load(file)
+
+        with urlopen(scope.url) as response:
+            return json.load(response)
+
+    def _get_features(self, scope: str) -> Dict[float, Dict[object, dict]]:
+        with self._lock:
+            if scope not in self._features:
+                settings = self.scopes[scope]
+                collection = self._read(settings)
+
+                features = {}
+                for feature in collection["features"]:
+                    feature_id = get_feature_id(feature, settings.featureid)
+                    if feature_id is not None:
+                        features[feature_id] = feature
+
+                self._features[scope] = {
+                    tolerance: {
+                        feature_id: {
+                            **feature,
+                            "geometry": simplify_geometry(
+                                feature["geometry"], tolerance
+                            ),
+                        }
+                        for feature_id, feature in features.items()
+                    }
+                    for tolerance in TOLERANCES
+                }
+
+            return self._features[scope]
+
+    def get(self, scope: str, zoom: float = None) -> dict:
+        """Feature collection of all features of a scope
+
+        Args:
+            scope (str): "global", "europe" or "germany"
+            zoom (float, optional): mapbox zoom level the geometries are simplified for.
+                Defaults to the initial zoom level of the scope.
+
+        Returns:
+            dict: GeoJSON feature collection, must not be modified
+        """
+
+        return self.get_trimmed(scope, None, zoom)
+
+    def get_trimmed(
+        self, scope: str, feature_ids: Optional[Iterable] = None, zoom: float = None
+    ) -> dict:
+        """Feature collection with only the features a dataset has values for
+
+        Args:
+            scope (str): "global", "europe" or "germany"
+            feature_ids (Optional[Iterable]): ids of the features to keep (e.g. ISO-3 codes), None keeps all
+            zoom (float, optional): mapbox zoom level the geometries are simplified for.
+                Defaults to the initial zoom level of the scope.
+
+        Returns:
+            dict: GeoJSON feature collection, must not be modified
+        """
+
+        if zoom is None:
+            zoom = self.scopes[scope].zoom
+
+        tolerance = tolerance_for_zoom(zoom)
+
+        if feature_ids is not None:
+            feature_ids = frozenset(feature_ids)
+
+        key = (scope, tolerance, feature_ids)
+
+        trimmed = self._trimmed.get(key)
+
+        if trimmed is None:
+            features = self._get_features(scope)[tolerance]
+
+            trimmed = {
+                "type": "FeatureCollection",
+                "features": [
+                    feature
+                    for feature_id, feature in features.items()
+                    if feature_ids is None or feature_id in feature_ids
+                ],
+            }
+
+            with self._lock:
+                # datasets rarely change, the number of distinct selections stays small
+                if len(self._trimmed) >= 128:
+                    self._trimmed.clear()
+                self._trimmed[key] = trimmed
+
+        return trimmed
+
+
+geojsons = GeoJsonRegistry(scopes)
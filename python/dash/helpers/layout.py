@@ -1,7 +1,5 @@
-import gzip
 import base64
 from math import floor, log
-import urllib
 from dash import (
     no_update,
     html,
@@ -14,7 +12,9 @@ import pandas as pd
 import time
 from typing import List
 
+from helpers.demo import load_demo_dataset
 from preprocessing.parse import parse_dataset
+from preprocessing.registry import datasets
 
 
 def preprocess_dataset(
@@ -28,6 +28,7 @@ def preprocess_dataset(
     demo_button_n_clicks: int,
     demo_dataset_n: str,
     preset_file: str = None,
+    dataset_store: dict = None,
 ) -> tuple:
     """Preprocesses an uploaded file
 
@@ -42,6 +43,7 @@ def preprocess_dataset(
         demo_button_n_clicks (int): number of demo button clicks
         demo_dataset_n (str): value of selected demo dataset
         preset_file (str, optional): content of imported preset file. Defaults to None.
+        dataset_store (dict, optional): handle and version of the current dataset. Defaults to None.
 
     Returns:
         tuple: _description_
@@ -85,23 +87,8 @@ def preprocess_dataset(
         feature_column_value = no_update
 
     if "demo-button" in changed_item:
-        # demo datasets (can be further extended)
-        demo_data = {
-            "Demo 0": (
-                "arbeitslosenquote_eu.tsv",
-                "https://ec.europa.eu/eurostat/estat-navtree-portlet-prod/BulkDownloadListing?file=data/tipsun20.tsv.gz",
-            ),
-            "Demo 1": (
-                "bip_europa.tsv",
-                "https://ec.europa.eu/eurostat/estat-navtree-portlet-prod/BulkDownloadListing?file=data/tec00001.tsv.gz",
-            ),
-        }
-        file_name = demo_data[demo_dataset_n][0]
-        df_url = demo_data[demo_dataset_n][1]
-
-        content = urllib.request.urlopen(df_url).read()
-        content = gzip.decompress(content)
-        file_content = base64.b64encode(content).decode("utf-8")
+        # bundled or cached locally, see helpers/demo.py
+        file_name, file_content = load_demo_dataset(demo_dataset_n)
         delimiter_value = "\t"
 
     if delimiter_value:
@@ -125,6 +112,11 @@ def preprocess_dataset(
                 reshape_col=reshape_column_value,
             )
 
+            # the store only references the dataset, which stays in this process
+            df = datasets.put(
+                df, handle=dataset_store["handle"] if dataset_store else None
+            )
+
         except Exception as e:
 
             if "too many values to unpack" in str(e):
@@ -6,11 +6,10 @@ import pandas as pd
 import plotly.express as px
 from plotly.subplots import make_subplots
 
-from urllib.request import urlopen
-import json
-
 from typing import List
 
+from helpers.geojson import geojsons
+
 theme = "plotly_dark"
 
 
@@ -84,15 +83,12 @@ def create_choropleth_plot(
     Returns:
         go.Figure: Choropleth plot
     """
-    with urlopen(
-        "https://raw.githubusercontent.com/leakyMirror/map-of-europe/master/GeoJSON/europe.geojson"
-    ) as response:
-        countries = json.load(response)
+    countries = geojsons.get_trimmed("europe", data[geo_column].unique(), zoom=2.5)
 
     fig = px.choropleth_mapbox(
         data,
         locations=geo_column,
-        featureidkey="properties.ISO3",
+        featureidkey=geojsons.scopes["europe"].featureid,
         color=feature_column,
         geojson=countries,
         zoom=2.5,
@@ -186,41 +182,26 @@ def create_choropleth_slider_plot(
     if np.issubdtype(np.datetime64, data[time_column]):
         data[time_column] = data[time_column].dt.strftime("%b-%d")
 
-    first_year = data[time_column].unique()[0]
+    settings = geojsons.scopes[scope]
 
-    geojsons = {
-        "global": {
-            "url": "https://datahub.io/core/geo-countries/r/countries.geojson",
-            "featureid": "properties.ISO_A3",
-            "zoom": 1,
-            "center": {"lat": 56.5, "lon": 11},
-        },
-        "europe": {
-            "url": "https://raw.githubusercontent.com/leakyMirror/map-of-europe/master/GeoJSON/europe.geojson",
-            "path": "/assets/custom.geo-3.json",
-            "featureid": "properties.ISO3",
-            # "featureid": "properties.adm0_iso",
-            "zoom": 2.5,
-            "center": {"lat": 53, "lon": 11},
-        },
-        "germany": {
-            "url": "https://raw.githubusercontent.com/isellsoap/deutschlandGeoJSON/main/2_bundeslaender/3_mittel.geo.json",
-            "path": "/assets/3_mittel.geo.json",
-            "featureid": "properties.id",
-            "zoom": 4.4,
-            "center": {"lat": 51.3, "lon": 10},
-        },
-    }
+    # only the features of the locations in the dataset, simplified for the initial zoom level
+    countries = geojsons.get_trimmed(scope, data[geo_column].unique(), settings.zoom)
+
+    # one group per time step in order of appearance instead of a mask per step
+    frames = [
+        (time, group[geo_column].to_numpy(), group[feature_column].to_numpy())
+        for time, group in data.groupby(time_column, sort=False)
+    ]
 
-    with urlopen(geojsons[scope]["url"]) as response:
-        countries = json.load(response)
+    _, first_locations, first_values = frames[0]
 
+    # the geometry is only sent with the base trace, frames update locations and values
     data_dict = dict(
         type="choroplethmapbox",
-        locations=data[data[time_column] == first_year][geo_column],
+        locations=first_locations,
         geojson=countries,
-        featureidkey=geojsons[scope]["featureid"],
-        z=data[data[time_column] == first_year][feature_column],
+        featureidkey=settings.featureid,
+        z=first_values,
         zmin=0,
         zmax=data[feature_column].max(),
         colorscale="Magma",
@@ -232,19 +213,12 @@ def create_choropleth_slider_plot(
 
     fig_dict["data"].append(data_dict)
 
-    for time in data[time_column].unique():
-
-        df_per_year = data[data[time_column] == time]
+    for time, locations, values in frames:
 
         fig_dict["frames"].append(
             dict(
-                data=dict(
-                    type="choroplethmapbox",
-                    locations=df_per_year[geo_column],
-                    featureidkey=geojsons[scope]["featureid"],
-                    geojson=countries,
-                    z=df_per_year[feature_column],
-                ),
+                data=[dict(type="choroplethmapbox", locations=locations, z=values)],
+                traces=[0],
                 name=str(time),
             )
         )
@@ -268,8 +242,8 @@ def create_choropleth_slider_plot(
     fig_choropleth = go.Figure(fig_dict)
     fig_choropleth.update_mapboxes(
         style="carto-positron",
-        zoom=geojsons[scope]["zoom"],
-        center=geojsons[scope]["center"],
+        zoom=settings.zoom,
+        center=settings.center,
     )
 
     fig_choropleth.update_layout(template=theme)
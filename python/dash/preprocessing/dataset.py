@@ -4,6 +4,9 @@ import pycountry
 import re
 from typing import Tuple, List, Dict
 import gzip
+import io
+
+from .eurostat import is_eurostat_header, parse_eurostat_tsv, read_text
 
 
 class DigitalTwinTimeSeries:
@@ -19,7 +22,7 @@ class DigitalTwinTimeSeries:
         Preprocesses and stores time series data
 
         Args:
-            path (str): path or URL to dataset
+            path (str, optional): path or URL to dataset, data is left empty without path or df. Defaults to None.
             sep (str): seperator value in dataset
             to_iso3 (bool, optional): converts country codes to Alpha-3. Defaults to True.
             df (pd.DataFrame, optional): Processed pandas dataframe. Defaults to None.
@@ -29,7 +32,10 @@ class DigitalTwinTimeSeries:
         self.geo_col: str = geo_col
         self.sep: str = sep
         self.to_iso3: bool = to_iso3
-        self.data: pd.DataFrame = self._preprocess(path) if df is None else df
+        self.data: pd.DataFrame = df
+
+        if df is None and path is not None:
+            self.data = self._preprocess(path)
 
     def _preprocess(self, path: str) -> pd.DataFrame:
         """Preprocesses dataframe into required format
@@ -41,7 +47,27 @@ class DigitalTwinTimeSeries:
             pd.DataFrame: Reshaped preprocessed dataset
         """
 
-        data = pd.read_csv(path, encoding="ISO-8859–1", sep=self.sep)
+        return self.normalise(self.read(path))
+
+    def read(self, path: str) -> pd.DataFrame:
+        """Reads a dataset and splits fused columns, independent of the geo column
+
+        Args:
+            path (str): path, URL or file-like object of the dataset
+
+        Returns:
+            pd.DataFrame: dataset with one column per dimension and period
+        """
+
+        if self.sep == "\t":
+            text = read_text(path, encoding="ISO-8859-1")
+
+            if is_eurostat_header(text.partition("\n")[0]):
+                data, _ = parse_eurostat_tsv(text, dtype=np.float32)
+            else:
+                data = pd.read_csv(io.StringIO(text), sep=self.sep)
+        else:
+            data = pd.read_csv(path, encoding="ISO-8859–1", sep=self.sep)
 
         columns = data.columns.tolist()
 
@@ -83,6 +109,18 @@ class DigitalTwinTimeSeries:
         if unnamed_cols_i:
             data = data.drop(data.columns[unnamed_cols_i], axis=1)
 
+        return data
+
+    def normalise(self, data: pd.DataFrame) -> pd.DataFrame:
+        """Converts the geo column to ISO-3 codes and drops constant columns
+
+        Args:
+            data (pd.DataFrame): dataset as returned by read, modified in place
+
+        Returns:
+            pd.DataFrame: preprocessed dataset
+        """
+
         if self.geo_col != "None":
             data = self._format_country_codes(data)
 
@@ -1,45 +1,88 @@
 from typing import Tuple
 import base64
+import hashlib
 import io
+import threading
+from collections import OrderedDict
 import pandas as pd
-from typing import List
+from typing import Callable, List
 
 from .dataset import DigitalTwinTimeSeries
 
+# intermediate frames kept per upload and setting, e.g. raw, geo-normalised and reshaped
+MAX_CACHED_FRAMES = 16
+
+_frames: "OrderedDict[tuple, pd.DataFrame]" = OrderedDict()
+_frames_lock = threading.Lock()
+
+
+def _cached(key: tuple, compute: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+    with _frames_lock:
+        if key in _frames:
+            _frames.move_to_end(key)
+            return _frames[key]
+
+    # computed outside of the lock, failures (e.g. wrong geo column) are not cached
+    frame = compute()
+
+    with _frames_lock:
+        _frames[key] = frame
+
+        while len(_frames) > MAX_CACHED_FRAMES:
+            _frames.popitem(last=False)
+
+    return frame
+
 
 def parse_dataset(
     contents: str,
     geo_col: str = None,
     separator: str = "\t",
     reshape_col: str = None,
-) -> Tuple[str, list]:
+) -> Tuple[pd.DataFrame, list, list]:
     """Parses a dataset and converts it into dataframe
 
+    The raw, geo-normalised and reshaped frames are cached by the hash of the
+    upload, so changing e.g. only the reshape column does not read the file again.
+
     Args:
         contents (str): Uploaded dataset
-        get_countries (bool, optional): Returns all countries present in the dataset. Defaults to False.
+        geo_col (str, optional): name of the geo column, "None" if there is none. Defaults to None.
+        separator (str, optional): separator of the columns. Defaults to "\t".
+        reshape_col (str, optional): column to reshape on. Defaults to None.
 
     Returns:
-        Tuple[str, list]: tuple of converted dataset and available indicator columns
+        Tuple[pd.DataFrame, list, list]: converted dataset (shared with the cache, must not be
+            modified), available indicator columns, columns before reshaping
     """
 
-    decoded = base64.b64decode(contents)
+    digest = hashlib.blake2b(contents.encode(), digest_size=16).hexdigest()
+
+    series = DigitalTwinTimeSeries(geo_col=geo_col, sep=separator)
+
+    raw = _cached(
+        (digest, separator),
+        lambda: series.read(io.StringIO(base64.b64decode(contents).decode("utf-8"))),
+    )
 
-    df = DigitalTwinTimeSeries(
-        io.StringIO(decoded.decode("utf-8")), geo_col=geo_col, sep=separator
+    # normalising modifies the frame, the cached raw frame is kept as read
+    series.data = _cached(
+        (digest, separator, geo_col), lambda: series.normalise(raw.copy())
     )
 
-    columns_pre_reshape = df.data.columns.to_list()
+    columns_pre_reshape = series.data.columns.to_list()
 
     if reshape_col is not None:
-        df = df.reshape_wide_to_long(value_id_column=reshape_col)
+        df = _cached(
+            (digest, separator, geo_col, reshape_col),
+            lambda: series.reshape_wide_to_long(value_id_column=reshape_col),
+        )
     else:
-        df = df.data
+        df = series.data
 
     columns = df.columns.to_list()
-    df_json = df.to_json()
 
-    return df_json, columns, columns_pre_reshape
+    return df, columns, columns_pre_reshape
 
 
 def merge_dataframes(dataframe_1, dataframe_2, time_column_1, time_column_2):
@@ -0,0 +1,112 @@
+"""
+
+Server-side registry of the parsed datasets
+
+The dataset stores of the upload components only hold a handle and a
+version, the DataFrames stay in this process. Callbacks look them up
+instead of sending the whole dataset to the browser as JSON and parsing it
+again in every callback.
+
+"""
+
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Optional
+
+import pandas as pd
+
+# datasets kept in memory, older ones have to be uploaded again
+MAX_DATASETS = 32
+
+
+class DatasetRegistry:
+    def __init__(self, max_datasets: int = MAX_DATASETS):
+        """
+        LRU cache of parsed datasets by handle and version
+
+        Args:
+            max_datasets (int, optional): number of datasets kept in memory. Defaults to MAX_DATASETS.
+        """
+
+        self.max_datasets = max_datasets
+
+        self._datasets: "OrderedDict[tuple, pd.DataFrame]" = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def put(self, dataframe: pd.DataFrame, handle: Optional[str] = None) -> dict:
+        """Registers a parsed dataset, a new version replaces the previous one of the same handle
+
+        Args:
+            dataframe (pd.DataFrame): parsed dataset
+            handle (Optional[str], optional): handle of the dataset that is replaced. Defaults to a new handle.
+
+        Returns:
+            dict: content of the dataset store, handle and version of the dataset
+        """
+
+        if handle is None:
+            handle = uuid.uuid4().hex
+
+        dataframe = _infer_numeric_columns(dataframe)
+
+        with self._lock:
+            version = self._versions.get(handle, 0) + 1
+            self._versions[handle] = version
+
+            self._datasets.pop((handle, version - 1), None)
+            self._datasets[(handle, version)] = dataframe
+
+            while len(self._datasets) > self.max_datasets:
+                (evicted, _), _ = self._datasets.popitem(last=False)
+                self._versions.pop(evicted, None)
+
+        return {"handle": handle, "version": version}
+
+    def get(self, store: dict) -> pd.DataFrame:
+        """Looks up the dataset of a dataset store
+
+        Args:
+            store (dict): content of the dataset store
+
+        Raises:
+            KeyError: the dataset was evicted or registered by another process
+
+        Returns:
+            pd.DataFrame: copy of the dataset, callbacks may modify it
+        """
+
+        key = (store["handle"], store["version"])
+
+        with self._lock:
+            dataframe = self._datasets[key]
+            self._datasets.move_to_end(key)
+
+        return dataframe.copy()
+
+    def __contains__(self, store: dict) -> bool:
+        return (
+            store is not None
+            and (store.get("handle"), store.get("version")) in self._datasets
+        )
+
+
+def _infer_numeric_columns(dataframe: pd.DataFrame) -> pd.DataFrame:
+    # callbacks expect numeric strings as numbers (e.g. years of the reshaped time
+    # column) like pd.read_json returned them when the stores held JSON
+    dataframe = dataframe.copy(deep=False)
+
+    for i, dtype in enumerate(dataframe.dtypes):
+        if dtype != object:
+            continue
+
+        try:
+            dataframe.isetitem(i, pd.to_numeric(dataframe.iloc[:, i]))
+        except (ValueError, TypeError):
+            pass
+
+    return dataframe
+
+
+datasets = DatasetRegistry()